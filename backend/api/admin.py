@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import APIConfiguration, InterviewAssistant, PhoneNumber, InterviewCall, ScheduledCall, Campaign
+from .models import APIConfiguration, InterviewAssistant, PhoneNumber, InterviewCall, ScheduledCall, Campaign, WebhookEvent, PostCallJob
 
 @admin.register(Campaign)
 class CampaignAdmin(admin.ModelAdmin):
@@ -92,3 +92,18 @@ class InterviewCallAdmin(admin.ModelAdmin):
     
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('user', 'assistant', 'phone_number')
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'event_type', 'vapi_call_id', 'shard', 'status', 'attempts', 'received_at', 'processed_at']
+    list_filter = ['status', 'event_type', 'shard', 'received_at']
+    search_fields = ['vapi_call_id', 'event_type']
+    readonly_fields = ['received_at', 'processed_at', 'locked_by', 'locked_at']
+
+@admin.register(PostCallJob)
+class PostCallJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'call', 'status', 'attempts', 'next_attempt_at', 'finished_at']
+    list_filter = ['kind', 'status', 'created_at']
+    search_fields = ['call__vapi_call_id']
+    readonly_fields = ['created_at', 'finished_at', 'locked_by', 'locked_at']
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        # Registers the ScheduledCall signal handlers that wake the scheduler
+        from api import scheduler  # noqa: F401
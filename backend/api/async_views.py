@@ -0,0 +1,169 @@
+"""
+Async versions of the provider-proxy endpoints (phone numbers, make call,
+call detail), for deployments running under ASGI:
+
+    gunicorn backend.asgi:application -k uvicorn.workers.UvicornWorker
+
+These views spend most of their time waiting on Vapi. Here the wait is an
+awaited AsyncVapiClient request, so one worker process can hold hundreds
+of upstream requests open at once instead of one per thread. The
+validation, ORM and serializer work is shared with the sync views in
+api.views and runs through sync_to_async. Responses match the sync views.
+
+urls.py routes to these views when ASYNC_PROVIDER_VIEWS is enabled.
+"""
+
+import json
+import logging
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET, require_POST
+from rest_framework import exceptions, status
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from .log_utils import log_payload
+from .models import APIConfiguration
+from .vapi_client import AsyncVapiClient, VapiAPIError
+from .views import (
+    CallDetailView,
+    MakeCallView,
+    ProxyRequestError,
+    VapiPhoneNumbersView,
+    vapi_error_body,
+)
+
+logger = logging.getLogger(__name__)
+
+VAPI_NOT_CONFIGURED = "Vapi API key not configured"
+
+
+def json_response(data, status_code=status.HTTP_200_OK):
+    return JsonResponse(data, status=status_code, encoder=DjangoJSONEncoder, safe=False)
+
+
+def _authenticate(request):
+    """JWT-authenticate like the DRF views do; returns the user or a 401 response"""
+    authenticator = JWTAuthentication()
+    try:
+        result = authenticator.authenticate(request)
+    except exceptions.AuthenticationFailed as e:
+        detail = e.detail if isinstance(e.detail, dict) else {"detail": e.detail}
+        response = json_response(detail, status.HTTP_401_UNAUTHORIZED)
+    else:
+        if result is not None:
+            return result[0]
+        response = json_response(
+            {"detail": "Authentication credentials were not provided."}, status.HTTP_401_UNAUTHORIZED
+        )
+    response["WWW-Authenticate"] = authenticator.authenticate_header(request)
+    return response
+
+
+def _vapi_key(user):
+    """The user's Vapi key, or None when it is not configured"""
+    config = APIConfiguration.objects.filter(user=user).first()
+    if config is None or not config.is_vapi_configured:
+        return None
+    return config.vapi_api_key
+
+
+async def _user_and_key(request, not_configured_message=VAPI_NOT_CONFIGURED):
+    """Authenticated user and Vapi key, or an error response in place of the key"""
+    user = await sync_to_async(_authenticate)(request)
+    if isinstance(user, JsonResponse):
+        return None, user
+    vapi_key = await sync_to_async(_vapi_key)(user)
+    if vapi_key is None:
+        return user, json_response({"error": not_configured_message}, status.HTTP_400_BAD_REQUEST)
+    return user, vapi_key
+
+
+def _request_data(request):
+    if request.content_type == "application/json":
+        return json.loads(request.body or b"{}")
+    return request.POST
+
+
+def _upstream_error(e, action, prefix="Vapi API error"):
+    logger.error("Error %s: %s", action, e)
+    if isinstance(e, VapiAPIError):
+        response = json_response(*vapi_error_body(e, prefix))
+        if isinstance(e.response_data, dict) and e.response_data.get("retryAfter"):
+            response["Retry-After"] = str(e.response_data["retryAfter"])
+        return response
+    return json_response({"error": f"Vapi API error: {e}"}, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@csrf_exempt
+@require_GET
+async def phone_numbers_view(request):
+    user, vapi_key = await _user_and_key(request)
+    if isinstance(vapi_key, JsonResponse):
+        return vapi_key
+    try:
+        phone_numbers = await AsyncVapiClient(vapi_key).list_phone_numbers(use_cache=True)
+        enriched_phone_numbers = await sync_to_async(VapiPhoneNumbersView().sync_phone_numbers)(
+            user, phone_numbers
+        )
+        return json_response({"success": True, "phone_numbers": enriched_phone_numbers})
+    except (VapiAPIError, httpx.HTTPError) as e:
+        return _upstream_error(e, "fetching phone numbers")
+    except Exception as e:
+        logger.error("Error fetching phone numbers: %s", e)
+        return json_response({"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@csrf_exempt
+@require_POST
+async def make_call_view(request):
+    user, vapi_key = await _user_and_key(
+        request, "Vapi API key not configured. Please set it in the API Configuration section."
+    )
+    if isinstance(vapi_key, JsonResponse):
+        return vapi_key
+    view = MakeCallView()
+    try:
+        try:
+            prepared = await sync_to_async(view.prepare_call)(user, _request_data(request))
+        except ProxyRequestError as e:
+            return json_response(e.body, e.status_code)
+        except ValueError:
+            return json_response({"error": "Invalid JSON body"}, status.HTTP_400_BAD_REQUEST)
+
+        log_payload(logger, "vapi", "Make call payload", prepared["payload"])
+        response_data = await AsyncVapiClient(vapi_key).create_call(prepared["payload"])
+        log_payload(logger, "vapi", "Vapi call API response", response_data)
+
+        return json_response(await sync_to_async(view.record_call)(user, prepared, response_data))
+    except (VapiAPIError, httpx.HTTPError) as e:
+        return _upstream_error(e, "making Vapi call", "Vapi call API error")
+    except Exception as e:
+        logger.error("Error making call: %s", e)
+        return json_response({"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@csrf_exempt
+@require_GET
+async def call_detail_view(request, call_id):
+    user, vapi_key = await _user_and_key(request)
+    if isinstance(vapi_key, JsonResponse):
+        return vapi_key
+    view = CallDetailView()
+    try:
+        response_data = await sync_to_async(view.cached_response)(user, call_id, vapi_key)
+        if response_data is not None:
+            return json_response(response_data)
+
+        logger.debug("Fetching call details for call ID: %s", call_id)
+        call_data = await AsyncVapiClient(vapi_key).get_call(call_id)
+        log_payload(logger, "vapi", "Vapi call data", call_data)
+        return json_response(await sync_to_async(view.build_response)(user, call_id, call_data))
+    except (VapiAPIError, httpx.HTTPError) as e:
+        return _upstream_error(e, "fetching call details")
+    except Exception as e:
+        logger.error("Error fetching call details: %s", e)
+        return json_response({"error": str(e)}, status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,102 @@
+"""
+Hot cache of webhook call routing.
+
+A live call produces hundreds of webhook events. The first event for a call
+does the joined InterviewCall lookup and validate_call_ownership; the result
+is remembered here as the call's primary key plus an ownership fingerprint
+(Vapi assistant id, Vapi phone number id, user id). Later events whose
+payload matches the fingerprint skip both the join and the validation.
+
+The in-process LRU can be backed by Django's cache framework
+(CALL_ROUTE_CACHE_SHARED) so workers share entries when a shared backend
+such as Redis is configured. Entries are dropped once the call ends.
+"""
+
+import logging
+import threading
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = "call-route:"
+
+
+class CallRoute(namedtuple("CallRoute", "call_id vapi_assistant_id vapi_phone_number_id user_id")):
+    __slots__ = ()
+
+    @classmethod
+    def for_call(cls, call):
+        return cls(
+            call.pk,
+            call.assistant.vapi_assistant_id,
+            call.phone_number.vapi_phone_number_id,
+            call.user_id,
+        )
+
+    def matches(self, call_data):
+        """Same checks as validate_call_ownership, against the cached fingerprint"""
+        if call_data.get("assistantId") != self.vapi_assistant_id:
+            return False
+        phone_number_id = call_data.get("phoneNumberId")
+        return not phone_number_id or phone_number_id == self.vapi_phone_number_id
+
+
+class CallRouteCache:
+    def __init__(self, max_entries=5000, shared=False, shared_timeout=3600):
+        self.max_entries = max_entries
+        self.shared = shared
+        self.shared_timeout = shared_timeout
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, vapi_call_id):
+        with self._lock:
+            route = self._entries.get(vapi_call_id)
+            if route is not None:
+                self._entries.move_to_end(vapi_call_id)
+                return route
+
+        if self.shared:
+            try:
+                value = cache.get(CACHE_KEY_PREFIX + vapi_call_id)
+            except Exception as e:
+                logger.warning("Shared call route cache unavailable: %s", e)
+                value = None
+            if value is not None:
+                route = CallRoute(*value)
+                self._remember(vapi_call_id, route)
+                return route
+        return None
+
+    def put(self, vapi_call_id, route):
+        self._remember(vapi_call_id, route)
+        if self.shared:
+            try:
+                cache.set(CACHE_KEY_PREFIX + vapi_call_id, tuple(route), self.shared_timeout)
+            except Exception as e:
+                logger.warning("Shared call route cache unavailable: %s", e)
+
+    def invalidate(self, vapi_call_id):
+        with self._lock:
+            self._entries.pop(vapi_call_id, None)
+        if self.shared:
+            try:
+                cache.delete(CACHE_KEY_PREFIX + vapi_call_id)
+            except Exception as e:
+                logger.warning("Shared call route cache unavailable: %s", e)
+
+    def _remember(self, vapi_call_id, route):
+        with self._lock:
+            self._entries[vapi_call_id] = route
+            self._entries.move_to_end(vapi_call_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+call_route_cache = CallRouteCache(
+    max_entries=settings.CALL_ROUTE_CACHE_SIZE,
+    shared=settings.CALL_ROUTE_CACHE_SHARED,
+)
@@ -0,0 +1,84 @@
+"""
+Short-lived cache of Vapi call data for the call detail endpoint.
+
+Ended calls are answered from InterviewCall.raw_call_data and never reach
+this cache (see CallDetailView.cached_response). Calls still in progress
+are cached here per user and call for CALL_DETAIL_CACHE_TTL seconds. After
+that, until CALL_DETAIL_STALE_TTL, the stale copy is served while a single
+background thread per call refreshes it from Vapi.
+
+Entries live in Django's cache framework, so they are per process with the
+default local-memory backend and shared when a backend such as Redis is
+configured.
+"""
+
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY_PREFIX = "call-detail:"
+
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def _cache_key(user_id, call_id):
+    return f"{CACHE_KEY_PREFIX}{user_id}:{call_id}"
+
+
+def get(user_id, call_id):
+    """(call_data, fresh) for a cached call, or (None, False)"""
+    try:
+        entry = cache.get(_cache_key(user_id, call_id))
+    except Exception as e:
+        logger.warning("Call detail cache unavailable: %s", e)
+        return None, False
+    if entry is None:
+        return None, False
+    return entry["data"], time.time() - entry["fetched_at"] < settings.CALL_DETAIL_CACHE_TTL
+
+
+def put(user_id, call_id, call_data):
+    try:
+        cache.set(
+            _cache_key(user_id, call_id),
+            {"data": call_data, "fetched_at": time.time()},
+            settings.CALL_DETAIL_STALE_TTL,
+        )
+    except Exception as e:
+        logger.warning("Call detail cache unavailable: %s", e)
+
+
+def invalidate(user_id, call_id):
+    try:
+        cache.delete(_cache_key(user_id, call_id))
+    except Exception as e:
+        logger.warning("Call detail cache unavailable: %s", e)
+
+
+def refresh_in_background(user_id, call_id, refresh):
+    """Run refresh() on a background thread unless one is already running for this call"""
+    key = _cache_key(user_id, call_id)
+    with _refreshing_lock:
+        if key in _refreshing:
+            return False
+        _refreshing.add(key)
+
+    def run():
+        try:
+            refresh()
+        except Exception as e:
+            logger.warning("Background refresh of call %s failed: %s", call_id, e)
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard(key)
+            connections.close_all()
+
+    threading.Thread(target=run, name=f"call-refresh-{call_id}", daemon=True).start()
+    return True
@@ -0,0 +1,660 @@
+"""
+Concurrent dispatch of due scheduled calls.
+
+DispatchEngine starts scheduled calls on a bounded worker pool instead of
+one after another, while capping how many calls are live at once:
+
+- per PhoneNumber (DISPATCH_MAX_PER_NUMBER)
+- per Vapi account (DISPATCH_MAX_PER_ACCOUNT); users configured with the
+  same API key share one account
+
+A call counts against both caps from the moment it is handed to a worker.
+Once started, it keeps counting while its InterviewCall is queued, ringing
+or in progress. Rows older than DISPATCH_ACTIVE_WINDOW minutes are ignored,
+because a call whose end-of-call webhook never arrived would otherwise hold
+a slot forever. A call over a cap is deferred: it stays scheduled, and a
+later run starts it once live calls end. Starts are paced to
+DISPATCH_MAX_STARTS_PER_SECOND across all workers.
+
+Live counts are read from the database when a batch starts (refresh()).
+Two processes dispatching at the same time can therefore overshoot a cap
+by the calls the other one has in flight.
+
+Dispatchers (the scheduler daemon, the execute command, the Celery task and
+the execute endpoint) may run side by side. They take calls with
+claim_scheduled_calls(), which moves them to in_progress under a lease
+(lease_owner, lease_expires_at) in one atomic step: SELECT ... FOR UPDATE
+SKIP LOCKED where the database supports it, a conditional UPDATE otherwise.
+A call whose lease expired before it got an InterviewCall (its dispatcher
+died) can be claimed again. A LeaseKeeper renews the leases of a batch
+while it is worked, since a batch held back by the caps can take longer
+than DISPATCH_LEASE_SECONDS to drain. Calls that were claimed but not
+started go back with release_scheduled_calls().
+
+ScheduledCallExecutor starts one claimed call: it builds the Vapi payload,
+creates the call and records the outcome. dispatch_due_calls() ties
+claiming, the engine and the executor together for the execute command,
+the Celery task and the execute endpoint. Status changes are batched: the
+claim moves every claimed call to in_progress and counts the attempt in a
+single UPDATE, and failures are written together in one transaction by
+flush(). A started call is marked completed in the same transaction that
+creates its InterviewCall, so a call with an InterviewCall is never left
+claimable. Both writes are fenced on the lease: they only apply while the
+row is still in_progress under the dispatcher's lease_owner, so a
+dispatcher whose lease was taken over cannot overwrite the new owner's
+outcome. Dropped writes are logged and counted in
+scheduled_call_lease_lost. Vapi keys are read once per batch (prime()) instead of once per
+call.
+
+Failed attempts go through a retry policy. A failure where the call
+provably was not placed is retried: a 429, a connect that timed out or was
+refused, or a rejection by the local circuit breaker or bulkhead. The call
+goes back to scheduled with next_attempt_at pushed back by an exponential
+delay with jitter, so a burst of failures does not come back as another
+burst. Other failures, and calls that have used SCHEDULED_CALL_MAX_ATTEMPTS,
+end as failed. That includes 5xx answers and connections dropped after the
+request was sent, since Vapi may have created the call before they
+happened and a retry would phone the candidate twice. scheduled_time keeps
+the time the user asked for.
+"""
+
+import hashlib
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from api.metrics import metrics
+from api.models import APIConfiguration, InterviewCall, ScheduledCall
+from api.post_call_jobs import RetryPolicy, retry_delay
+from api.resilience import ProviderUnavailable
+from api.scheduler import notify_schedule_changed
+from api.vapi_client import VapiClient, connect_failed
+
+logger = logging.getLogger(__name__)
+
+LIVE_CALL_STATUSES = ("queued", "ringing", "in-progress")
+
+DispatchOutcome = namedtuple("DispatchOutcome", "results deferred")
+
+
+def dispatcher_id():
+    """Identifies this process in ScheduledCall.lease_owner"""
+    return f"{socket.gethostname()}:{os.getpid()}"[:48]
+
+
+def claimable_scheduled_calls(now=None):
+    """Due scheduled calls, and started ones whose dispatcher's lease expired"""
+    now = now or timezone.now()
+    return ScheduledCall.objects.filter(
+        Q(status="scheduled", next_attempt_at__lte=now)
+        | Q(status="in_progress", lease_expires_at__lt=now, actual_call__isnull=True)
+    )
+
+
+def claim_scheduled_calls(ids=None, user_id=None, limit=None, lease_seconds=None):
+    """
+    Claim claimable calls for this process, oldest first, and return them
+    with their related rows loaded. Only ids / user_id are considered when
+    given; at most `limit` calls are claimed (None or 0 for all).
+    """
+    now = timezone.now()
+    candidates = claimable_scheduled_calls(now)
+    if ids is not None:
+        candidates = candidates.filter(id__in=ids)
+    if user_id:
+        candidates = candidates.filter(user_id=user_id)
+    candidates = candidates.order_by("next_attempt_at", "id")
+
+    token = f"{dispatcher_id()}/{uuid.uuid4().hex[:12]}"
+    lease = dict(
+        status="in_progress",
+        lease_owner=token,
+        lease_expires_at=now + timedelta(seconds=lease_seconds or settings.DISPATCH_LEASE_SECONDS),
+        execution_attempts=F("execution_attempts") + 1,
+        last_attempt_at=now,
+        updated_at=now,
+    )
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            locked = candidates.select_for_update(skip_locked=True).values_list("id", flat=True)
+            candidate_ids = list(locked[:limit] if limit else locked)
+            if candidate_ids:
+                ScheduledCall.objects.filter(id__in=candidate_ids).update(**lease)
+    else:
+        candidate_ids = candidates.values_list("id", flat=True)
+        candidate_ids = list(candidate_ids[:limit] if limit else candidate_ids)
+        if candidate_ids:
+            # Rows another dispatcher claimed since the SELECT no longer match
+            claimable_scheduled_calls(now).filter(id__in=candidate_ids).update(**lease)
+    if not candidate_ids:
+        return []
+
+    return list(
+        ScheduledCall.objects.filter(lease_owner=token, status="in_progress")
+        .select_related("user", "campaign", "assistant", "phone_number")
+        .order_by("next_attempt_at", "id")
+    )
+
+
+def release_scheduled_calls(scheduled_calls):
+    """Return claimed calls that were not started to the scheduled state"""
+    scheduled_calls = list(scheduled_calls)
+    if not scheduled_calls:
+        return 0
+    return ScheduledCall.objects.filter(
+        id__in=[call.id for call in scheduled_calls],
+        lease_owner__in={call.lease_owner for call in scheduled_calls},
+        status="in_progress",
+        actual_call__isnull=True,
+    ).update(
+        status="scheduled",
+        lease_owner=None,
+        lease_expires_at=None,
+        # The claim counted an attempt that never happened
+        execution_attempts=F("execution_attempts") - 1,
+        updated_at=timezone.now(),
+    )
+
+
+class LeaseKeeper:
+    """
+    Renews the leases of claimed calls every third of the lease until they
+    are started or their failure is written, so another dispatcher does not
+    take over calls this process is still working through.
+    """
+
+    def __init__(self, lease_seconds=None):
+        self.lease_seconds = lease_seconds or settings.DISPATCH_LEASE_SECONDS
+        self._held = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def hold(self, scheduled_calls):
+        with self._lock:
+            for scheduled_call in scheduled_calls:
+                self._held[scheduled_call.id] = scheduled_call.lease_owner
+            if self._thread is None and self._held:
+                self._thread = threading.Thread(target=self._run, name="lease-keeper", daemon=True)
+                self._thread.start()
+
+    def drop(self, scheduled_calls):
+        with self._lock:
+            for scheduled_call in scheduled_calls:
+                self._held.pop(scheduled_call.id, None)
+
+    def renew(self):
+        """Push back the leases of the held calls; returns how many were renewed"""
+        with self._lock:
+            held = dict(self._held)
+        owners = {}
+        for scheduled_call_id, owner in held.items():
+            owners.setdefault(owner, []).append(scheduled_call_id)
+        lease_expires_at = timezone.now() + timedelta(seconds=self.lease_seconds)
+        renewed = 0
+        for owner, ids in owners.items():
+            for start in range(0, len(ids), 500):
+                # updated_at is left alone: the scheduler daemon would re-read
+                # every renewed row
+                renewed += ScheduledCall.objects.filter(
+                    id__in=ids[start:start + 500], lease_owner=owner, status="in_progress", actual_call__isnull=True
+                ).update(lease_expires_at=lease_expires_at)
+        return renewed
+
+    def _run(self):
+        try:
+            while not self._stop.wait(self.lease_seconds / 3):
+                try:
+                    self.renew()
+                except Exception as e:
+                    logger.error("Error renewing scheduled call leases: %s", e)
+        finally:
+            connection.close()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def retry_policy():
+    return RetryPolicy(
+        max_attempts=settings.SCHEDULED_CALL_MAX_ATTEMPTS,
+        base_delay=settings.SCHEDULED_CALL_RETRY_BASE_DELAY,
+        max_delay=settings.SCHEDULED_CALL_RETRY_MAX_DELAY,
+    )
+
+
+def jittered_retry_delay(policy, attempts):
+    """The backoff delay for an attempt, randomised over its upper half"""
+    delay = retry_delay(policy, attempts)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def is_retryable(exc):
+    """Whether a failed POST /call provably did not place the call"""
+    if isinstance(exc.__cause__, ProviderUnavailable):
+        # Rejected by the local circuit breaker or bulkhead, never sent
+        return True
+    status_code = getattr(exc, "status_code", None)
+    if status_code is not None:
+        # Any 5xx, including a 502/504 from the proxy in front of Vapi, may
+        # come after the call was created
+        return status_code == 429
+    # Other connection errors include resets after the body was sent; only
+    # a failed connect is known not to have reached Vapi
+    return connect_failed(exc)
+
+
+def retry_after(exc):
+    """Seconds the provider (or a local circuit breaker) asked us to wait"""
+    data = getattr(exc, "response_data", None)
+    if isinstance(data, dict):
+        try:
+            return float(data.get("retryAfter") or 0)
+        except (TypeError, ValueError):
+            return 0
+    return 0
+
+
+def account_key(vapi_api_key):
+    """Stable identifier of a Vapi account that does not expose its key"""
+    return hashlib.sha256(vapi_api_key.encode()).hexdigest()[:16]
+
+
+class DispatchEngine:
+    """
+    Runs execute(scheduled_call) on a worker pool under the dispatch caps.
+    execute returns a result dict whose "success" tells whether the call
+    was started (and is now live).
+    """
+
+    def __init__(self, execute, workers=None, max_per_number=None, max_per_account=None,
+                 max_starts_per_second=None):
+        self.execute = execute
+        self.workers = workers or settings.DISPATCH_WORKERS
+        self.max_per_number = settings.DISPATCH_MAX_PER_NUMBER if max_per_number is None else max_per_number
+        self.max_per_account = settings.DISPATCH_MAX_PER_ACCOUNT if max_per_account is None else max_per_account
+        self.max_starts_per_second = (
+            settings.DISPATCH_MAX_STARTS_PER_SECOND if max_starts_per_second is None else max_starts_per_second
+        )
+        self._pool = ThreadPoolExecutor(max_workers=max(1, self.workers), thread_name_prefix="dispatch")
+        self._cond = threading.Condition()
+        # Live calls per cap key when last read from the database, calls
+        # started since then, and calls handed to a worker but not finished
+        self._live = {}
+        self._started = Counter()
+        self._in_flight = Counter()
+        self._running = 0
+        self._accounts = {}
+        self._pace_lock = threading.Lock()
+        self._next_start = 0.0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
+
+    @property
+    def running(self):
+        with self._cond:
+            return self._running
+
+    def _cap_keys(self, scheduled_call):
+        account = self._accounts.get(scheduled_call.user_id, f"user-{scheduled_call.user_id}")
+        return (("number", scheduled_call.phone_number_id), ("account", account))
+
+    def _limit(self, key):
+        return self.max_per_number if key[0] == "number" else self.max_per_account
+
+    def _load(self, key):
+        return self._live.get(key, 0) + self._started[key] + self._in_flight[key]
+
+    def refresh(self, scheduled_calls):
+        """Read live call counts for the phone numbers and accounts of these calls"""
+        user_ids = {call.user_id for call in scheduled_calls}
+        number_ids = {call.phone_number_id for call in scheduled_calls}
+        keys = dict(
+            APIConfiguration.objects.filter(user_id__in=user_ids)
+            .exclude(vapi_api_key__isnull=True).exclude(vapi_api_key="")
+            .values_list("user_id", "vapi_api_key")
+        )
+        # Every user on the same key counts toward the account's cap
+        accounts = {user_id: f"user-{user_id}" for user_id in user_ids}
+        for user_id, key in APIConfiguration.objects.filter(
+            vapi_api_key__in=set(keys.values())
+        ).values_list("user_id", "vapi_api_key"):
+            accounts[user_id] = account_key(key)
+
+        with self._cond:
+            # Calls started before the counts are read are part of them
+            self._started = Counter()
+
+        live_calls = InterviewCall.objects.filter(
+            status__in=LIVE_CALL_STATUSES,
+            created_at__gte=timezone.now() - timedelta(minutes=settings.DISPATCH_ACTIVE_WINDOW),
+        ).order_by()
+        live = {}
+        for number_id, count in (
+            live_calls.filter(phone_number_id__in=number_ids)
+            .values_list("phone_number_id").annotate(count=Count("id"))
+        ):
+            live[("number", number_id)] = count
+        for user_id, count in (
+            live_calls.filter(user_id__in=accounts)
+            .values_list("user_id").annotate(count=Count("id"))
+        ):
+            key = ("account", accounts[user_id])
+            live[key] = live.get(key, 0) + count
+
+        with self._cond:
+            self._accounts.update(accounts)
+            for number_id in number_ids:
+                self._live[("number", number_id)] = live.get(("number", number_id), 0)
+            for account in set(accounts.values()):
+                self._live[("account", account)] = live.get(("account", account), 0)
+
+    def try_submit(self, scheduled_call, callback=None):
+        """
+        Hand a call to a worker if it is within the caps. Returns its future,
+        or None when a cap is reached. callback(scheduled_call, result) runs
+        on the worker once the call finishes.
+        """
+        with self._cond:
+            keys = self._cap_keys(scheduled_call)
+            for key in keys:
+                limit = self._limit(key)
+                if limit and self._load(key) >= limit:
+                    return None
+            for key in keys:
+                self._in_flight[key] += 1
+            self._running += 1
+        return self._pool.submit(self._run_one, scheduled_call, keys, callback)
+
+    def run(self, scheduled_calls, limit=None):
+        """
+        Dispatch calls in order and wait for them, holding back calls over a
+        cap until running ones finish. Starts at most `limit` calls (None or
+        0 for all). Returns a DispatchOutcome with the results and the calls
+        left for a later run.
+        """
+        scheduled_calls = list(scheduled_calls)
+        if not scheduled_calls:
+            return DispatchOutcome([], [])
+        self.refresh(scheduled_calls)
+
+        pending = scheduled_calls
+        futures = []
+        with self._cond:
+            while pending:
+                waiting = []
+                for scheduled_call in pending:
+                    future = None
+                    if not limit or len(futures) < limit:
+                        future = self.try_submit(scheduled_call)
+                    if future is None:
+                        waiting.append(scheduled_call)
+                    else:
+                        futures.append(future)
+                pending = waiting
+                # Only a finishing call can free capacity
+                if not pending or (limit and len(futures) >= limit) or not self._running:
+                    break
+                self._cond.wait()
+
+        results = [future.result() for future in futures]
+        return DispatchOutcome(results, pending)
+
+    def _pace(self):
+        if not self.max_starts_per_second:
+            return
+        with self._pace_lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_start)
+            self._next_start = start_at + 1 / self.max_starts_per_second
+        if start_at > now:
+            time.sleep(start_at - now)
+
+    def _run_one(self, scheduled_call, keys, callback):
+        result = None
+        try:
+            self._pace()
+            result = self.execute(scheduled_call)
+        except Exception as e:
+            logger.error("Error executing scheduled call %s: %s", scheduled_call.id, e)
+            result = {"scheduled_call_id": scheduled_call.id, "success": False, "error": str(e)}
+        finally:
+            with self._cond:
+                for key in keys:
+                    self._in_flight[key] -= 1
+                    if result and result.get("success"):
+                        self._started[key] += 1
+                self._running -= 1
+                self._cond.notify_all()
+            if callback:
+                try:
+                    callback(scheduled_call, result)
+                except Exception as e:
+                    logger.error("Error in dispatch callback for scheduled call %s: %s", scheduled_call.id, e)
+            connections.close_all()
+        return result
+
+
+class ScheduledCallExecutor:
+    """
+    Starts claimed scheduled calls through Vapi; pass it to DispatchEngine as
+    the execute callable. Call prime() with each batch before dispatching it
+    and flush() once the batch is done. With a LeaseKeeper, calls are dropped
+    from it once started or once their failure is written.
+    """
+
+    def __init__(self, lease_keeper=None):
+        self.lease_keeper = lease_keeper
+        self._lock = threading.Lock()
+        self._vapi_keys = {}
+        self._failures = []
+
+    def prime(self, scheduled_calls):
+        """Read the Vapi keys of the users in a batch"""
+        self._load_configs({call.user_id for call in scheduled_calls})
+
+    def _load_configs(self, user_ids):
+        configs = {config.user_id: config for config in APIConfiguration.objects.filter(user_id__in=user_ids)}
+        with self._lock:
+            for user_id in user_ids:
+                config = configs.get(user_id)
+                if config is None:
+                    self._vapi_keys[user_id] = "API configuration not found"
+                elif not config.is_vapi_configured:
+                    self._vapi_keys[user_id] = "Vapi API not configured"
+                else:
+                    self._vapi_keys[user_id] = config
+
+    def _vapi_key(self, user_id):
+        with self._lock:
+            config = self._vapi_keys.get(user_id)
+        if config is None:
+            self._load_configs({user_id})
+            with self._lock:
+                config = self._vapi_keys[user_id]
+        if isinstance(config, str):
+            raise Exception(config)
+        return config.vapi_api_key
+
+    def __call__(self, scheduled_call):
+        try:
+            vapi_key = self._vapi_key(scheduled_call.user_id)
+            payload = {
+                "assistantId": scheduled_call.assistant.vapi_assistant_id,
+                "phoneNumberId": scheduled_call.phone_number.vapi_phone_number_id,
+                "customer": {"number": scheduled_call.customer_number},
+            }
+            call_data = VapiClient(vapi_key).create_call(payload)
+        except requests.exceptions.RequestException as e:
+            return self._failed(scheduled_call, f"Vapi API error: {str(e)}", e)
+        except Exception as e:
+            return self._failed(scheduled_call, str(e))
+
+        now = timezone.now()
+        try:
+            with transaction.atomic():
+                interview_call = InterviewCall.objects.create(
+                    user=scheduled_call.user,
+                    campaign=scheduled_call.campaign,
+                    vapi_call_id=call_data.get("id"),
+                    assistant=scheduled_call.assistant,
+                    phone_number=scheduled_call.phone_number,
+                    customer_number=scheduled_call.customer_number,
+                    status="queued",
+                    raw_call_data=call_data,
+                )
+                # The InterviewCall is kept either way: the call was placed
+                recorded = ScheduledCall.objects.filter(
+                    id=scheduled_call.id, lease_owner=scheduled_call.lease_owner, status="in_progress"
+                ).update(
+                    status="completed", actual_call=interview_call, error_message=None, lease_expires_at=None,
+                    updated_at=now,
+                )
+        except Exception as e:
+            # The call was placed, so it must not be claimed and dialled again.
+            # It ends as failed, never retried; the lease is kept until flush()
+            # writes that and drops it from the keeper.
+            logger.error(
+                "Scheduled call %s was placed as Vapi call %s but could not be recorded: %s",
+                scheduled_call.id, call_data.get("id"), e,
+            )
+            return self._failed(
+                scheduled_call, f"Placed as Vapi call {call_data.get('id')} but not recorded: {str(e)}"
+            )
+        if self.lease_keeper:
+            self.lease_keeper.drop([scheduled_call])
+        metrics.increment("scheduled_call_attempts", outcome="started")
+
+        result = {
+            "scheduled_call_id": scheduled_call.id,
+            "success": True,
+            "call_id": interview_call.id,
+            "vapi_call_id": call_data.get("id"),
+            "message": f"Call initiated successfully for {scheduled_call.customer_number}",
+        }
+        if recorded:
+            scheduled_call.status = "completed"
+            scheduled_call.actual_call = interview_call
+        else:
+            self._lease_lost([scheduled_call.id], "started")
+            result["lease_lost"] = True
+        return result
+
+    def _lease_lost(self, scheduled_call_ids, outcome):
+        metrics.increment("scheduled_call_lease_lost", len(scheduled_call_ids), outcome=outcome)
+        logger.warning(
+            "Lease lost before the outcome (%s) of scheduled calls %s was written; left to their new dispatcher",
+            outcome, ", ".join(str(i) for i in scheduled_call_ids),
+        )
+
+    def _failed(self, scheduled_call, error, exc=None):
+        now = timezone.now()
+        policy = retry_policy()
+        retry = exc is not None and is_retryable(exc) and scheduled_call.execution_attempts < policy.max_attempts
+        if retry:
+            delay = max(jittered_retry_delay(policy, scheduled_call.execution_attempts), retry_after(exc))
+            scheduled_call.status = "scheduled"
+            scheduled_call.next_attempt_at = now + timedelta(seconds=delay)
+            logger.warning(
+                "Scheduled call %s attempt %s failed, retrying in %.0fs: %s",
+                scheduled_call.id, scheduled_call.execution_attempts, delay, error,
+            )
+        else:
+            scheduled_call.status = "failed"
+        scheduled_call.error_message = error
+        scheduled_call.lease_expires_at = None
+        scheduled_call.updated_at = now
+        metrics.increment("scheduled_call_attempts", outcome="retry" if retry else "failed")
+        with self._lock:
+            self._failures.append(scheduled_call)
+        result = {"scheduled_call_id": scheduled_call.id, "success": False, "error": error}
+        if retry:
+            result["next_attempt_at"] = scheduled_call.next_attempt_at
+        return result
+
+    def flush(self):
+        """
+        Write the failures and retries recorded since the last flush. Returns
+        how many were written; rows whose lease was taken over are skipped.
+        """
+        with self._lock:
+            failures, self._failures = self._failures, []
+        if not failures:
+            return 0
+        written, lost = [], []
+        try:
+            with transaction.atomic():
+                for scheduled_call in failures:
+                    retry = scheduled_call.status == "scheduled"
+                    updated = ScheduledCall.objects.filter(
+                        id=scheduled_call.id, lease_owner=scheduled_call.lease_owner, status="in_progress"
+                    ).update(
+                        status=scheduled_call.status,
+                        error_message=scheduled_call.error_message,
+                        next_attempt_at=scheduled_call.next_attempt_at,
+                        lease_owner=None if retry else scheduled_call.lease_owner,
+                        lease_expires_at=None,
+                        updated_at=scheduled_call.updated_at,
+                    )
+                    (written if updated else lost).append(scheduled_call)
+        finally:
+            if self.lease_keeper:
+                self.lease_keeper.drop(failures)
+        if lost:
+            self._lease_lost([call.id for call in lost], "failed")
+        if any(call.status == "scheduled" for call in written):
+            notify_schedule_changed()
+        return len(written)
+
+
+def dispatch_due_calls(user_id=None, limit=None, workers=None):
+    """
+    Claim due calls (of one user when given), start them under the dispatch
+    caps and release the ones held back. Starts at most `limit` calls
+    (default DISPATCH_MAX_PER_RUN). Returns a DispatchOutcome.
+    """
+    due_calls = claim_scheduled_calls(
+        user_id=user_id, limit=settings.DISPATCH_MAX_PER_RUN if limit is None else limit
+    )
+    if not due_calls:
+        return DispatchOutcome([], [])
+
+    with LeaseKeeper() as lease_keeper:
+        lease_keeper.hold(due_calls)
+        executor = ScheduledCallExecutor(lease_keeper)
+        executor.prime(due_calls)
+        try:
+            with DispatchEngine(executor, workers=workers) as engine:
+                outcome = engine.run(due_calls)
+        finally:
+            executor.flush()
+        release_scheduled_calls(outcome.deferred)
+    return outcome
@@ -0,0 +1,213 @@
+"""
+Append-only, segmented log of Vapi webhook events.
+
+Events are buffered in memory and flushed in batches to the active segment,
+a gzip file that is only ever appended to (every flush adds one gzip member,
+so a segment stays readable with gzip.open). A segment is sealed once it
+grows past WEBHOOK_LOG_SEGMENT_BYTES and a new one is started.
+
+Each segment has a small JSON index next to it that counts events per call
+id and event type, so auditing a call only opens the segments that mention
+it. Segment names include the process id: every gunicorn worker writes its
+own segments and no cross-process locking is needed.
+
+Layout:
+    webhook_logs/segments/events-20250822T143025-1234-0001.jsonl.gz
+    webhook_logs/segments/events-20250822T143025-1234-0001.index.json
+"""
+
+import atexit
+import gzip
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = ".jsonl.gz"
+INDEX_SUFFIX = ".index.json"
+
+
+def _event_call_id(event):
+    """Extract the Vapi call id from a webhook body"""
+    message = event.get("message") if isinstance(event, dict) else None
+    if isinstance(message, dict):
+        return (message.get("call") or {}).get("id")
+    if isinstance(event, dict):
+        return (event.get("call") or {}).get("id")
+    return None
+
+
+class SegmentedEventLog:
+    """Rotating, append-only, compressed event log with a per-segment index"""
+
+    def __init__(self, folder, max_segment_bytes=16 * 1024 * 1024, flush_events=100, flush_interval=2.0):
+        self.folder = os.path.join(folder, "segments")
+        self.max_segment_bytes = max_segment_bytes
+        self.flush_events = flush_events
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pid = None
+        atexit.register(self.flush)
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        # The parent's lock may have been held at fork time
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def _reset(self):
+        """(Re)initialise per-process state, e.g. after a gunicorn fork"""
+        self._pid = os.getpid()
+        self._buffer = []
+        self._buffer_started = None
+        self._sequence = 0
+        self._segment_path = None
+        self._index = None
+        self._flusher = None
+        os.makedirs(self.folder, exist_ok=True)
+
+    def _ensure_process(self):
+        if self._pid != os.getpid():
+            self._reset()
+        if self._flusher is None and self.flush_interval:
+            self._flusher = threading.Thread(
+                target=self._flush_periodically, name="webhook-event-log-flusher", daemon=True
+            )
+            self._flusher.start()
+
+    def append(self, event_type, event):
+        """Buffer one event; returns the path of the segment it will be written to"""
+        record = {
+            "ts": datetime.now(timezone.utc).isoformat(),
+            "event_type": event_type,
+            "call_id": _event_call_id(event),
+            "event": event,
+        }
+        line = json.dumps(record, separators=(",", ":"), default=str)
+
+        with self._lock:
+            self._ensure_process()
+            if self._segment_path is None:
+                self._open_segment()
+            # Read before flushing, which may seal this segment and open the next
+            segment_path = self._segment_path
+            self._buffer.append((record["call_id"], event_type, record["ts"], line))
+            if self._buffer_started is None:
+                self._buffer_started = time.monotonic()
+            if len(self._buffer) >= self.flush_events:
+                self._flush_locked()
+            return segment_path
+
+    def flush(self):
+        with self._lock:
+            if self._pid == os.getpid():
+                self._flush_locked()
+
+    def _flush_periodically(self):
+        while True:
+            time.sleep(self.flush_interval)
+            with self._lock:
+                if self._pid != os.getpid():
+                    return
+                if self._buffer_started and time.monotonic() - self._buffer_started >= self.flush_interval:
+                    self._flush_locked()
+
+    def _open_segment(self):
+        self._sequence += 1
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        name = f"events-{stamp}-{self._pid}-{self._sequence:04d}"
+        self._segment_path = os.path.join(self.folder, name + SEGMENT_SUFFIX)
+        self._index = {
+            "segment": name + SEGMENT_SUFFIX,
+            "first_ts": None,
+            "last_ts": None,
+            "count": 0,
+            "event_types": {},
+            "calls": {},
+        }
+
+    def _flush_locked(self):
+        if not self._buffer:
+            return
+        batch, self._buffer, self._buffer_started = self._buffer, [], None
+
+        try:
+            payload = ("\n".join(item[3] for item in batch) + "\n").encode("utf-8")
+            with open(self._segment_path, "ab") as f:
+                f.write(gzip.compress(payload))
+                segment_size = f.tell()
+
+            index = self._index
+            for call_id, event_type, ts, _ in batch:
+                event_type = event_type or "unknown_event"
+                index["first_ts"] = index["first_ts"] or ts
+                index["last_ts"] = ts
+                index["count"] += 1
+                index["event_types"][event_type] = index["event_types"].get(event_type, 0) + 1
+                if call_id:
+                    call_index = index["calls"].setdefault(call_id, {})
+                    call_index[event_type] = call_index.get(event_type, 0) + 1
+            self._write_index()
+
+            if segment_size >= self.max_segment_bytes:
+                self._open_segment()
+        except Exception as e:
+            logger.error("Failed to flush webhook event log: %s", e)
+
+    def _write_index(self):
+        index_path = self._segment_path[: -len(SEGMENT_SUFFIX)] + INDEX_SUFFIX
+        tmp_path = index_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._index, f, separators=(",", ":"))
+        os.replace(tmp_path, index_path)
+
+    def segments(self, call_id=None, event_type=None):
+        """Segment paths (oldest first) whose index matches the filters"""
+        self.flush()
+        if not os.path.isdir(self.folder):
+            return []
+
+        matches = []
+        for name in sorted(os.listdir(self.folder)):
+            if not name.endswith(INDEX_SUFFIX):
+                continue
+            try:
+                with open(os.path.join(self.folder, name)) as f:
+                    index = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if call_id and call_id not in index.get("calls", {}):
+                continue
+            if event_type:
+                counts = index["calls"][call_id] if call_id else index.get("event_types", {})
+                if event_type not in counts:
+                    continue
+            matches.append(os.path.join(self.folder, index["segment"]))
+        return matches
+
+    def iter_events(self, call_id=None, event_type=None):
+        """Yield matching log records in timestamp order, reading only indexed segments"""
+        readers = [self._read_segment(path, call_id, event_type) for path in self.segments(call_id, event_type)]
+        # Each segment is already in write order; merge them across processes
+        yield from heapq.merge(*readers, key=lambda record: record.get("ts") or "")
+
+    def _read_segment(self, path, call_id=None, event_type=None):
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    if call_id and record.get("call_id") != call_id:
+                        continue
+                    if event_type and record.get("event_type") != event_type:
+                        continue
+                    yield record
+        except (OSError, EOFError, ValueError) as e:
+            logger.warning("Skipping unreadable webhook log segment %s: %s", path, e)
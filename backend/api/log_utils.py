@@ -0,0 +1,126 @@
+"""
+Logging helpers for the request paths.
+
+- QueueLogHandler hands records to a background listener thread, so
+  formatting and stream I/O happen off the request thread.
+- StructuredFormatter writes one JSON object per line and caps message size.
+- log_payload() dumps request/response bodies lazily: nothing is serialised
+  unless the level is enabled and the per-category sample rate
+  (LOG_PAYLOAD_SAMPLE_RATES) selects the record, and bodies are truncated to
+  LOG_PAYLOAD_MAX_CHARS.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+# Attributes every LogRecord has; anything else was passed through `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def truncate(text, limit=None):
+    """Cap text at limit characters, noting how much was cut"""
+    if limit is None:
+        limit = settings.LOG_PAYLOAD_MAX_CHARS
+    if text is None or len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [truncated {len(text) - limit} chars]"
+
+
+def _should_sample(category):
+    rate = settings.LOG_PAYLOAD_SAMPLE_RATES.get(category, settings.LOG_PAYLOAD_SAMPLE_RATES.get("default", 1.0))
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+def log_payload(logger, category, label, payload, level=logging.DEBUG, **fields):
+    """Log a (sampled, truncated) payload dump for a category such as "webhook" or "vapi" """
+    if not logger.isEnabledFor(level) or not _should_sample(category):
+        return
+    if isinstance(payload, bytes):
+        text = payload.decode("utf-8", errors="ignore")
+    elif isinstance(payload, str):
+        text = payload
+    else:
+        text = json.dumps(payload, default=str)
+    logger.log(level, "%s: %s", label, truncate(text), extra={"category": category, **fields})
+
+
+class StructuredFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message and extra fields"""
+
+    def __init__(self, max_message_chars=None, **kwargs):
+        super().__init__(**kwargs)
+        self.max_message_chars = max_message_chars
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": truncate(record.getMessage(), self.max_message_chars or settings.LOG_MAX_MESSAGE_CHARS),
+            "thread": record.threadName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class QueueLogHandler(logging.handlers.QueueHandler):
+    """
+    Enqueue records and let a QueueListener thread format and write them.
+
+    The listener writes to stderr with the formatter configured on this
+    handler. It is restarted in a forked child (e.g. gunicorn --preload).
+    """
+
+    def __init__(self, maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        self._pid = None
+        self._listener = None
+        self.dropped = 0
+        atexit.register(self._stop_listener)
+
+    def _start_listener(self):
+        target = logging.StreamHandler(sys.stderr)
+        target.setFormatter(self.formatter or StructuredFormatter())
+        self._listener = logging.handlers.QueueListener(self.queue, target, respect_handler_level=False)
+        self._listener.start()
+        self._pid = os.getpid()
+
+    def _stop_listener(self):
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._listener = None
+
+    def prepare(self, record):
+        # Formatting happens in the listener thread; only resolve exception
+        # text here while the traceback is still current
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Never block a request on logging
+            self.dropped += 1
+
+    def emit(self, record):
+        if self._pid != os.getpid():
+            if self._pid is not None:
+                # Forked child: the parent's queue contents belong to the parent
+                self.queue = queue.Queue(self.queue.maxsize)
+            self._start_listener()
+        super().emit(record)
@@ -1,11 +1,6 @@
+from django.conf import settings
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-import logging
-import requests
-from api.models import ScheduledCall, InterviewCall, APIConfiguration
-
-
-logger = logging.getLogger(__name__)
+from api.dispatch import claimable_scheduled_calls, dispatch_due_calls
 
 
 class Command(BaseCommand):
@@ -22,156 +17,70 @@ class Command(BaseCommand):
             action="store_true",
             help="Show which calls would be executed without actually executing them",
         )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.DISPATCH_WORKERS,
+            help="Calls started concurrently (default: DISPATCH_WORKERS)",
+        )
+        parser.add_argument(
+            "--limit",
+            type=int,
+            default=settings.DISPATCH_MAX_PER_RUN,
+            help="Maximum calls started in this run, 0 for all due calls (default: DISPATCH_MAX_PER_RUN)",
+        )
 
     def handle(self, *args, **options):
         user_id = options.get("user_id")
         dry_run = options.get("dry_run", False)
         print(f"Executing scheduled calls with dry_run={dry_run} for user_id={user_id}")
-        # Get all due scheduled calls
-        queryset = ScheduledCall.objects.filter(
-            status="scheduled", scheduled_time__lte=timezone.now()
-        )
-
-        if user_id:
-            queryset = queryset.filter(user_id=user_id)
+        if dry_run:
+            queryset = claimable_scheduled_calls()
+            if user_id:
+                queryset = queryset.filter(user_id=user_id)
+            due_calls = list(queryset.order_by("next_attempt_at"))
+            if not due_calls:
+                self.stdout.write(
+                    self.style.SUCCESS("No scheduled calls are due for execution.")
+                )
+            for scheduled_call in due_calls:
+                self.stdout.write(
+                    f"Would execute: {scheduled_call} (ID: {scheduled_call.id})"
+                )
+            return
 
-        due_calls = queryset.order_by("scheduled_time")
-        print(f"Found {due_calls.count()} due scheduled calls.")
-        if not due_calls.exists():
+        outcome = dispatch_due_calls(user_id=user_id, limit=options["limit"], workers=options["workers"])
+        if not outcome.results and not outcome.deferred:
             self.stdout.write(
                 self.style.SUCCESS("No scheduled calls are due for execution.")
             )
             return
 
         self.stdout.write(
-            f"Found {due_calls.count()} scheduled calls due for execution."
+            f"Found {len(outcome.results) + len(outcome.deferred)} scheduled calls due for execution."
         )
 
         executed_count = 0
         failed_count = 0
-
-        for scheduled_call in due_calls:
-            if dry_run:
+        for result in outcome.results:
+            if result["success"]:
+                executed_count += 1
                 self.stdout.write(
-                    f"Would execute: {scheduled_call} (ID: {scheduled_call.id})"
-                )
-                continue
-
-            try:
-                result = self.execute_scheduled_call(scheduled_call)
-                if result["success"]:
-                    executed_count += 1
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f'Successfully executed scheduled call {scheduled_call.id}: {result["message"]}'
-                        )
-                    )
-                else:
-                    failed_count += 1
-                    self.stdout.write(
-                        self.style.ERROR(
-                            f'Failed to execute scheduled call {scheduled_call.id}: {result["error"]}'
-                        )
-                    )
-                # If 10 successful calls are executed, break the loop
-                if executed_count >= 10:
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            "Reached 10 successful executions, stopping further processing."
-                        )
+                    self.style.SUCCESS(
+                        f'Successfully executed scheduled call {result["scheduled_call_id"]}: {result["message"]}'
                     )
-                    break
-            except Exception as e:
-                failed_count += 1
-                logger.error(
-                    f"Error executing scheduled call {scheduled_call.id}: {str(e)}"
                 )
+            else:
+                failed_count += 1
                 self.stdout.write(
                     self.style.ERROR(
-                        f"Error executing scheduled call {scheduled_call.id}: {str(e)}"
+                        f'Failed to execute scheduled call {result["scheduled_call_id"]}: {result["error"]}'
                     )
                 )
 
-        if not dry_run:
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f"Execution complete. {executed_count} calls executed, {failed_count} failed."
-                )
-            )
-
-    def execute_scheduled_call(self, scheduled_call):
-        """Execute a single scheduled call"""
-        try:
-            # Update status and attempt tracking
-            scheduled_call.status = "in_progress"
-            scheduled_call.execution_attempts += 1
-            scheduled_call.last_attempt_at = timezone.now()
-            scheduled_call.save()
-
-            # Get user's API configuration
-            try:
-                api_config = APIConfiguration.objects.get(user=scheduled_call.user)
-                vapi_key = api_config.vapi_api_key
-            except APIConfiguration.DoesNotExist:
-                raise Exception("API configuration not found")
-
-            if not api_config.is_vapi_configured:
-                raise Exception("Vapi API not configured")
-
-            # Prepare call payload
-            headers = {
-                "Authorization": f"Bearer {vapi_key}",
-                "Content-Type": "application/json",
-            }
-
-            payload = {
-                "assistantId": scheduled_call.assistant.vapi_assistant_id,
-                "phoneNumberId": scheduled_call.phone_number.vapi_phone_number_id,
-                "customer": {"number": scheduled_call.customer_number},
-            }
-
-            # Make the call via Vapi API
-            response = requests.post(
-                "https://api.vapi.ai/call", headers=headers, json=payload
-            )
-
-            response.raise_for_status()
-            call_data = response.json()
-
-            # Create InterviewCall record
-            interview_call = InterviewCall.objects.create(
-                user=scheduled_call.user,
-                campaign=scheduled_call.campaign,
-                vapi_call_id=call_data.get("id"),
-                assistant=scheduled_call.assistant,
-                phone_number=scheduled_call.phone_number,
-                customer_number=scheduled_call.customer_number,
-                status="queued",
-                raw_call_data=call_data,
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Execution complete. {executed_count} calls executed, {failed_count} failed, "
+                f"{len(outcome.deferred)} left for a later run."
             )
-
-            # Link the scheduled call to the actual call
-            scheduled_call.actual_call = interview_call
-            scheduled_call.status = "completed"
-            scheduled_call.save()
-
-            return {
-                "success": True,
-                "call_id": interview_call.id,
-                "vapi_call_id": call_data.get("id"),
-                "message": f"Call initiated successfully for {scheduled_call.customer_number}",
-            }
-
-        except requests.exceptions.RequestException as e:
-            scheduled_call.status = "failed"
-            scheduled_call.error_message = f"Vapi API error: {str(e)}"
-            scheduled_call.save()
-
-            return {"success": False, "error": f"Vapi API error: {str(e)}"}
-
-        except Exception as e:
-            scheduled_call.status = "failed"
-            scheduled_call.error_message = str(e)
-            scheduled_call.save()
-
-            return {"success": False, "error": str(e)}
+        )
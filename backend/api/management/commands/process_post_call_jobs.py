@@ -0,0 +1,125 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+import logging
+import threading
+import time
+from api.post_call_jobs import claim_post_call_jobs, job_depths, release_stale_jobs, run_post_call_job
+
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Run post-call jobs (recording downloads, transcript processing) with a worker pool per job kind"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--download-workers",
+            type=int,
+            default=settings.POST_CALL_DOWNLOAD_WORKERS,
+            help="Threads downloading recordings (default: POST_CALL_DOWNLOAD_WORKERS)",
+        )
+        parser.add_argument(
+            "--transcript-workers",
+            type=int,
+            default=settings.POST_CALL_TRANSCRIPT_WORKERS,
+            help="Threads processing transcripts with OpenAI (default: POST_CALL_TRANSCRIPT_WORKERS)",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5,
+            help="Jobs claimed per worker per round (default: 5)",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=2.0,
+            help="Seconds to wait when no job is due (default: 2)",
+        )
+        parser.add_argument(
+            "--stale-after",
+            type=int,
+            default=900,
+            help="Seconds after which a running job is considered abandoned (default: 900)",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Run every job that is currently due and exit",
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options["batch_size"]
+        self.poll_interval = options["poll_interval"]
+        self.once = options["once"]
+        self.stop_event = threading.Event()
+        self.counts = {}
+        self.counter_lock = threading.Lock()
+
+        released = release_stale_jobs(options["stale_after"])
+        if released:
+            self.stdout.write(f"Released {released} abandoned post-call jobs.")
+
+        pools = {
+            "download_recording": options["download_workers"],
+            "process_transcript": options["transcript_workers"],
+        }
+        workers = [
+            threading.Thread(target=self.worker_loop, args=(kind,), name=f"{kind}-{i}", daemon=True)
+            for kind, size in pools.items()
+            for i in range(max(0, size))
+        ]
+        self.stdout.write(
+            "Starting post-call workers: "
+            + ", ".join(f"{size} x {kind}" for kind, size in pools.items())
+        )
+        for worker in workers:
+            worker.start()
+
+        try:
+            last_maintenance = time.monotonic()
+            while any(worker.is_alive() for worker in workers):
+                time.sleep(1)
+                if time.monotonic() - last_maintenance > 600:
+                    release_stale_jobs(options["stale_after"])
+                    close_old_connections()
+                    last_maintenance = time.monotonic()
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping post-call workers...")
+            self.stop_event.set()
+            for worker in workers:
+                worker.join()
+
+        summary = ", ".join(
+            f"{kind}: {counts['succeeded']} succeeded, {counts['failed']} failed"
+            for kind, counts in sorted(self.counts.items())
+        )
+        self.stdout.write(self.style.SUCCESS(f"Post-call workers stopped. {summary or 'No jobs run.'}"))
+        for kind, depth in job_depths().items():
+            if depth["pending"]:
+                self.stdout.write(f"{depth['pending']} {kind} jobs still pending.")
+
+    def worker_loop(self, kind):
+        while not self.stop_event.is_set():
+            close_old_connections()
+            try:
+                jobs = claim_post_call_jobs(kind, self.batch_size)
+            except Exception as e:
+                logger.error("Error claiming %s jobs: %s", kind, e)
+                jobs = []
+
+            if not jobs:
+                if self.once:
+                    break
+                self.stop_event.wait(self.poll_interval)
+                continue
+
+            for job in jobs:
+                success = run_post_call_job(job)
+                with self.counter_lock:
+                    counts = self.counts.setdefault(kind, {"succeeded": 0, "failed": 0})
+                    counts["succeeded" if success else "failed"] += 1
+
+        close_old_connections()
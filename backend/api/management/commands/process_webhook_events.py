@@ -0,0 +1,282 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+from api.webhook_queue import (
+    acquire_shard_leases,
+    claim_webhook_events,
+    process_webhook_event,
+    purge_processed_events,
+    release_shard_leases,
+    release_stale_events,
+    release_webhook_event,
+    reshard_pending_events,
+    shard_depths,
+    worker_id,
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+def parse_shards(value, shard_count):
+    """Parse "0,2,5-7" into a sorted list of shard numbers"""
+    shards = set()
+    for part in value.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition("-")
+        try:
+            shards.update(range(int(start), int(end or start) + 1))
+        except ValueError:
+            raise CommandError(f"Invalid shard list: {value}")
+    invalid = [shard for shard in shards if shard < 0 or shard >= shard_count]
+    if invalid:
+        raise CommandError(f"Shards {invalid} are outside 0-{shard_count - 1} (WEBHOOK_SHARD_COUNT={shard_count})")
+    return sorted(shards)
+
+
+class Command(BaseCommand):
+    help = (
+        "Drain the Vapi webhook queue. Events are sharded by call id and each shard "
+        "is owned by one worker thread, so a call's events are applied in order."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.WEBHOOK_QUEUE_WORKERS,
+            help="Number of worker threads per process (default: WEBHOOK_QUEUE_WORKERS)",
+        )
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=1,
+            help="Split the shards across this many worker processes (default: 1)",
+        )
+        parser.add_argument(
+            "--only-shards",
+            help='Only drain these shards, e.g. "0-3" or "1,5" (default: all)',
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=20,
+            help="Events claimed per worker per round (default: 20)",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=0.5,
+            help="Seconds to wait when the queue is empty (default: 0.5)",
+        )
+        parser.add_argument(
+            "--stale-after",
+            type=int,
+            default=300,
+            help=(
+                "Seconds after which a claimed event whose worker stopped renewing its "
+                "shard leases is considered abandoned (default: 300)"
+            ),
+        )
+        parser.add_argument(
+            "--report-interval",
+            type=int,
+            default=60,
+            help="Seconds between queue depth reports, 0 to disable (default: 60)",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Process everything currently queued and exit",
+        )
+
+    def handle(self, *args, **options):
+        shard_count = settings.WEBHOOK_SHARD_COUNT
+        if options["only_shards"]:
+            self.shards = parse_shards(options["only_shards"], shard_count)
+        else:
+            self.shards = list(range(shard_count))
+            moved = reshard_pending_events(shard_count)
+            if moved:
+                self.stdout.write(f"Moved {moved} pending events onto {shard_count} shards.")
+
+        if options["processes"] > 1:
+            return self.run_processes(options)
+
+        lease_seconds = settings.WEBHOOK_SHARD_LEASE_SECONDS
+        if options["stale_after"] <= lease_seconds:
+            raise CommandError(
+                f"--stale-after must be longer than WEBHOOK_SHARD_LEASE_SECONDS ({lease_seconds}s), "
+                "or events still being processed would be handed to another worker"
+            )
+
+        self.batch_size = options["batch_size"]
+        self.poll_interval = options["poll_interval"]
+        self.once = options["once"]
+        self.stop_event = threading.Event()
+        self.processed_count = 0
+        self.failed_count = 0
+        self.counter_lock = threading.Lock()
+        self.owner = worker_id()
+
+        released = release_stale_events(options["stale_after"])
+        if released:
+            self.stdout.write(f"Released {released} abandoned webhook events.")
+
+        self.held = acquire_shard_leases(self.owner, self.shards)
+        if self.held != self.shards:
+            self.stdout.write(
+                f"Shards {sorted(set(self.shards) - set(self.held))} are leased by another process; "
+                "they are taken over if their lease expires."
+            )
+
+        # Thread i owns shards i, i + n, i + 2n, ...
+        worker_count = max(1, min(options["workers"], len(self.shards)))
+        workers = [
+            threading.Thread(
+                target=self.worker_loop,
+                args=(self.shards[i::worker_count],),
+                name=f"webhook-worker-{i}",
+                daemon=True,
+            )
+            for i in range(worker_count)
+        ]
+        self.stdout.write(
+            f"Starting {len(workers)} webhook queue workers for shards {self.shards} "
+            f"(of {shard_count})..."
+        )
+        for worker in workers:
+            worker.start()
+
+        try:
+            last_maintenance = last_report = last_renewal = time.monotonic()
+            while any(worker.is_alive() for worker in workers):
+                time.sleep(1)
+                now = time.monotonic()
+                if now - last_renewal >= lease_seconds / 3:
+                    self.renew_leases()
+                    last_renewal = now
+                if options["report_interval"] and now - last_report >= options["report_interval"]:
+                    self.report_depths()
+                    last_report = now
+                if now - last_maintenance > 600:
+                    release_stale_events(options["stale_after"])
+                    # Calls that were busy when the shard count was lowered
+                    reshard_pending_events(shard_count)
+                    purge_processed_events()
+                    close_old_connections()
+                    last_maintenance = now
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping webhook queue workers...")
+            self.stop_event.set()
+            for worker in workers:
+                worker.join()
+        finally:
+            release_shard_leases(self.owner)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Webhook queue workers stopped. {self.processed_count} processed, {self.failed_count} failed."
+            )
+        )
+
+    def run_processes(self, options):
+        """Re-run this command in child processes, each owning a slice of the shards"""
+        process_count = min(options["processes"], len(self.shards))
+        manage_py = os.path.join(settings.BASE_DIR, "manage.py")
+        children = []
+        for i in range(process_count):
+            command = [
+                sys.executable, manage_py, "process_webhook_events",
+                "--only-shards", ",".join(str(shard) for shard in self.shards[i::process_count]),
+                "--workers", str(options["workers"]),
+                "--batch-size", str(options["batch_size"]),
+                "--poll-interval", str(options["poll_interval"]),
+                "--stale-after", str(options["stale_after"]),
+                "--report-interval", str(options["report_interval"]),
+            ]
+            if options["once"]:
+                command.append("--once")
+            children.append(subprocess.Popen(command))
+        self.stdout.write(f"Started {process_count} webhook queue processes.")
+
+        try:
+            exit_codes = [child.wait() for child in children]
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping webhook queue processes...")
+            for child in children:
+                child.terminate()
+            exit_codes = [child.wait() for child in children]
+
+        failed = [code for code in exit_codes if code]
+        if failed:
+            self.stdout.write(self.style.ERROR(f"{len(failed)} webhook queue processes exited with errors."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Webhook queue processes stopped."))
+
+    def renew_leases(self):
+        try:
+            held = acquire_shard_leases(self.owner, self.shards)
+        except Exception as e:
+            logger.error("Error renewing webhook shard leases: %s", e)
+            return
+        if held != self.held:
+            logger.info("Webhook shard leases changed: now holding %s", held)
+            self.held = held
+
+    def report_depths(self):
+        try:
+            depths = shard_depths()
+        except Exception as e:
+            logger.error("Error reading webhook queue depth: %s", e)
+            return
+        owned = {str(shard) for shard in self.shards}
+        summary = " ".join(
+            f"{shard}={counts['pending']}" for shard, counts in depths.items() if shard in owned
+        )
+        self.stdout.write(f"Pending events per shard: {summary or 'none'}")
+
+    def worker_loop(self, shards):
+        while not self.stop_event.is_set():
+            close_old_connections()
+            try:
+                events = claim_webhook_events(self.batch_size, shards=shards, owner=self.owner)
+            except Exception as e:
+                logger.error("Error claiming webhook events: %s", e)
+                events = []
+
+            if not events:
+                if self.once:
+                    break
+                self.stop_event.wait(self.poll_interval)
+                continue
+
+            # A call whose event will be retried must not have later events applied first
+            blocked_calls = set()
+            for event in events:
+                if event.vapi_call_id in blocked_calls:
+                    release_webhook_event(event)
+                    continue
+
+                success = process_webhook_event(event)
+                with self.counter_lock:
+                    if success:
+                        self.processed_count += 1
+                    else:
+                        self.failed_count += 1
+                if event.status == "pending":
+                    blocked_calls.add(event.vapi_call_id)
+
+            if blocked_calls:
+                # Back off before retrying
+                self.stop_event.wait(self.poll_interval)
+
+        close_old_connections()
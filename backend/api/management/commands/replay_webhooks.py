@@ -0,0 +1,399 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from datetime import datetime
+import glob
+import gzip
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import zlib
+import requests
+from api.models import InterviewAssistant, InterviewCall, PhoneNumber, WebhookDelivery
+from api.views import VAPI_SERVER_URL_SECRET, WEBHOOK_LOG_FOLDER, webhook_event_log
+
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_PATH = "/api/webhook/vapi/"
+REPLAY_USERNAME = "webhook-replay"
+
+
+class NetworkBlocked(requests.exceptions.ConnectionError):
+    pass
+
+
+class block_outbound_http:
+    """Make every requests call fail fast, so replays never reach Vapi or OpenAI"""
+
+    def __init__(self):
+        self.blocked = 0
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        self.original = requests.sessions.Session.request
+        guard = self
+
+        def blocked_request(session, method, url, *args, **kwargs):
+            with guard.lock:
+                guard.blocked += 1
+            raise NetworkBlocked(f"Outbound {method} {url} blocked during webhook replay")
+
+        requests.sessions.Session.request = blocked_request
+        return self
+
+    def __exit__(self, *exc_info):
+        requests.sessions.Session.request = self.original
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def _epoch(ts):
+    try:
+        return datetime.fromisoformat(ts).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay recorded Vapi webhook events against the local webhook endpoint and "
+        "report throughput, latency percentiles and DB queries per event type"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "sources",
+            nargs="*",
+            help=(
+                "Event sources: exported .jsonl/.jsonl.gz files, legacy per-event .json files "
+                "or directories of them (default: the webhook event log and legacy files in webhook_logs/)"
+            ),
+        )
+        parser.add_argument("--call-id", type=str, help="Only replay events for this Vapi call ID")
+        parser.add_argument("--event-type", type=str, help="Only replay events of this type")
+        parser.add_argument("--limit", type=int, default=0, help="Replay at most this many events")
+        parser.add_argument(
+            "--rate",
+            type=float,
+            default=0,
+            help="Events per second to send, 0 for as fast as possible (default: 0)",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=4,
+            help="Concurrent senders; each call's events always go through one sender in order (default: 4)",
+        )
+        parser.add_argument(
+            "--mode",
+            choices=["sync", "queue"],
+            help="Override VAPI_WEBHOOK_MODE for the replay",
+        )
+        parser.add_argument(
+            "--seed-calls",
+            action="store_true",
+            help="Create a user, assistant, phone number and InterviewCall for replayed calls missing locally",
+        )
+        parser.add_argument(
+            "--keep-delivery-keys",
+            action="store_true",
+            help="Keep stored delivery keys, so events replayed before are dropped as duplicates",
+        )
+        parser.add_argument(
+            "--allow-network",
+            action="store_true",
+            help="Let handlers make outbound HTTP calls (blocked by default)",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Allow running with DJANGO_ENVIRONMENT=production",
+        )
+        parser.add_argument("--report", type=str, help="Also write the report to this JSON file")
+
+    def handle(self, *args, **options):
+        if settings.DJANGO_ENVIRONMENT == "production" and not options["force"]:
+            raise CommandError("Refusing to replay webhooks into a production database (use --force)")
+
+        events = self.load_events(options)
+        if not events:
+            raise CommandError("No recorded webhook events matched")
+        call_ids = {call_id for call_id, _, _ in events if call_id}
+        self.stdout.write(f"Loaded {len(events)} events for {len(call_ids)} calls.")
+
+        if options["seed_calls"]:
+            seeded = self.seed_calls(events)
+            self.stdout.write(f"Seeded {seeded} calls.")
+        if not options["keep_delivery_keys"]:
+            WebhookDelivery.objects.filter(vapi_call_id__in=call_ids).delete()
+
+        overrides = {"ALLOWED_HOSTS": [*settings.ALLOWED_HOSTS, "testserver"]}
+        if options["mode"]:
+            overrides["VAPI_WEBHOOK_MODE"] = options["mode"]
+
+        network_guard = None
+        with override_settings(**overrides):
+            if options["allow_network"]:
+                results, elapsed = self.replay(events, options)
+            else:
+                with block_outbound_http() as network_guard:
+                    results, elapsed = self.replay(events, options)
+
+        report = self.build_report(results, elapsed)
+        report["blocked_http_calls"] = network_guard.blocked if network_guard else 0
+        self.print_report(report)
+        if options.get("report"):
+            with open(options["report"], "w") as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Report written to {options['report']}")
+
+    # Loading
+
+    def load_events(self, options):
+        """Return [(call_id, event_type, body)] in recorded order"""
+        loaded = []
+        sources = options["sources"]
+        if not sources:
+            loaded.extend(
+                (_epoch(record.get("ts")), record)
+                for record in webhook_event_log.iter_events(options.get("call_id"), options.get("event_type"))
+            )
+            sources = [WEBHOOK_LOG_FOLDER]
+
+        for source in sources:
+            if os.path.isdir(source):
+                paths = sorted(glob.glob(os.path.join(source, "*.json")))
+            elif os.path.exists(source):
+                paths = [source]
+            else:
+                raise CommandError(f"Event source not found: {source}")
+            for path in paths:
+                loaded.extend(self.read_source(path))
+
+        # Stable sort: events with equal timestamps keep their recorded order
+        loaded.sort(key=lambda item: item[0])
+
+        events = []
+        for _, record in loaded:
+            body = record["event"] if "event" in record and "message" not in record else record
+            message = body.get("message") if isinstance(body, dict) else None
+            if not isinstance(message, dict):
+                continue
+            event_type = message.get("type")
+            call_id = (message.get("call") or {}).get("id")
+            if options.get("call_id") and call_id != options["call_id"]:
+                continue
+            if options.get("event_type") and event_type != options["event_type"]:
+                continue
+            events.append((call_id, event_type, body))
+            if options["limit"] and len(events) >= options["limit"]:
+                break
+        return events
+
+    def read_source(self, path):
+        """Yield (sort_key, record) from an exported JSONL file or a legacy JSON file"""
+        try:
+            if path.endswith((".jsonl", ".jsonl.gz")):
+                opener = gzip.open if path.endswith(".gz") else open
+                with opener(path, "rt", encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            record = json.loads(line)
+                            yield _epoch(record.get("ts")), record
+            else:
+                with open(path) as f:
+                    yield os.path.getmtime(path), json.load(f)
+        except (OSError, ValueError) as e:
+            self.stdout.write(self.style.ERROR(f"Skipping unreadable source {path}: {e}"))
+
+    # Seeding
+
+    def seed_calls(self, events):
+        """Create local records for replayed calls that do not exist yet"""
+        first_seen = {}
+        for call_id, _, body in events:
+            if call_id and call_id not in first_seen:
+                first_seen[call_id] = body["message"].get("call") or {}
+        existing = set(
+            InterviewCall.objects.filter(vapi_call_id__in=first_seen).values_list("vapi_call_id", flat=True)
+        )
+        missing = {call_id: data for call_id, data in first_seen.items() if call_id not in existing}
+        if not missing:
+            return 0
+
+        user, _ = User.objects.get_or_create(username=REPLAY_USERNAME)
+        assistants, phones, calls = {}, {}, []
+        for call_id, call_data in missing.items():
+            assistant_id = call_data.get("assistantId") or "replay-assistant"
+            phone_id = call_data.get("phoneNumberId") or "replay-phone"
+            if assistant_id not in assistants:
+                assistants[assistant_id], _ = InterviewAssistant.objects.get_or_create(
+                    vapi_assistant_id=assistant_id,
+                    defaults={"user": user, "name": f"Replay {assistant_id[:8]}", "first_message": "Hello"},
+                )
+            if phone_id not in phones:
+                phones[phone_id], _ = PhoneNumber.objects.get_or_create(
+                    vapi_phone_number_id=phone_id,
+                    defaults={"user": user, "phone_number": f"+1000{len(phones):07d}"},
+                )
+            assistant, phone = assistants[assistant_id], phones[phone_id]
+            calls.append(
+                InterviewCall(
+                    user=assistant.user,
+                    assistant=assistant,
+                    phone_number=phone,
+                    vapi_call_id=call_id,
+                    customer_number=(call_data.get("customer") or {}).get("number") or "+10000000000",
+                    status="queued",
+                )
+            )
+        InterviewCall.objects.bulk_create(calls)
+        return len(calls)
+
+    # Replay
+
+    def replay(self, events, options):
+        concurrency = max(1, options["concurrency"])
+        inboxes = [queue.Queue(maxsize=1000) for _ in range(concurrency)]
+        results = []
+        results_lock = threading.Lock()
+
+        senders = [
+            threading.Thread(
+                target=self.sender_loop, args=(inbox, results, results_lock), name=f"replay-{i}", daemon=True
+            )
+            for i, inbox in enumerate(inboxes)
+        ]
+        for sender in senders:
+            sender.start()
+
+        interval = 1.0 / options["rate"] if options["rate"] > 0 else 0
+        started = time.perf_counter()
+        for i, (call_id, event_type, body) in enumerate(events):
+            if interval:
+                delay = started + i * interval - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            # The same call always goes to the same sender, preserving its order
+            inbox = inboxes[zlib.crc32((call_id or "").encode("utf-8")) % concurrency]
+            inbox.put((event_type, body))
+        for inbox in inboxes:
+            inbox.put(None)
+        for sender in senders:
+            sender.join()
+        return results, time.perf_counter() - started
+
+    def sender_loop(self, inbox, results, results_lock):
+        client = Client(HTTP_X_VAPI_SECRET=VAPI_SERVER_URL_SECRET or "")
+        local_results = []
+        while True:
+            item = inbox.get()
+            if item is None:
+                break
+            event_type, body = item
+            data = json.dumps(body)
+            error = None
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                try:
+                    response = client.post(WEBHOOK_PATH, data=data, content_type="application/json")
+                    status_code = response.status_code
+                    if status_code >= 400:
+                        error = response.content[:200].decode("utf-8", errors="ignore")
+                except Exception as e:
+                    status_code = None
+                    error = str(e)
+                latency = time.perf_counter() - start
+            local_results.append((event_type or "unknown", status_code, latency, len(queries), error))
+        close_old_connections()
+        connection.close()
+        with results_lock:
+            results.extend(local_results)
+
+    # Reporting
+
+    def build_report(self, results, elapsed):
+        latencies = sorted(latency for _, _, latency, _, _ in results)
+        by_type = {}
+        status_codes = {}
+        errors = {}
+        for event_type, status_code, latency, query_count, error in results:
+            entry = by_type.setdefault(event_type, {"latencies": [], "queries": []})
+            entry["latencies"].append(latency)
+            entry["queries"].append(query_count)
+            status_codes[str(status_code)] = status_codes.get(str(status_code), 0) + 1
+            if error:
+                errors.setdefault(error, 0)
+                errors[error] += 1
+
+        def summary(values):
+            values = sorted(values)
+            return {
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+                "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+            }
+
+        return {
+            "events": len(results),
+            "elapsed_seconds": round(elapsed, 3),
+            "events_per_second": round(len(results) / elapsed, 1) if elapsed else 0.0,
+            "latency": summary(latencies),
+            "status_codes": status_codes,
+            "event_types": {
+                event_type: {
+                    "count": len(entry["latencies"]),
+                    **summary(entry["latencies"]),
+                    "avg_queries": round(sum(entry["queries"]) / len(entry["queries"]), 2),
+                    "max_queries": max(entry["queries"]),
+                }
+                for event_type, entry in sorted(by_type.items())
+            },
+            "errors": [
+                {"count": count, "error": error}
+                for error, count in sorted(errors.items(), key=lambda item: -item[1])[:20]
+            ],
+        }
+
+    def print_report(self, report):
+        latency = report["latency"]
+        self.stdout.write(
+            f"\n{report['events']} events in {report['elapsed_seconds']}s "
+            f"({report['events_per_second']} events/s)"
+        )
+        self.stdout.write(
+            f"Latency p50={latency['p50_ms']}ms p95={latency['p95_ms']}ms "
+            f"p99={latency['p99_ms']}ms max={latency['max_ms']}ms"
+        )
+        self.stdout.write(f"Status codes: {report['status_codes']}")
+        if report["blocked_http_calls"]:
+            self.stdout.write(f"Blocked outbound HTTP calls: {report['blocked_http_calls']}")
+
+        self.stdout.write(
+            f"\n{'event type':<32}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'queries':>10}"
+        )
+        for event_type, stats in report["event_types"].items():
+            self.stdout.write(
+                f"{event_type:<32}{stats['count']:>8}{stats['p50_ms']:>10}{stats['p95_ms']:>10}"
+                f"{stats['p99_ms']:>10}{stats['avg_queries']:>10}"
+            )
+
+        if report["errors"]:
+            self.stdout.write(self.style.ERROR(f"\nErrors ({sum(e['count'] for e in report['errors'])}):"))
+            for entry in report["errors"]:
+                self.stdout.write(f"{entry['count']:>8}  {entry['error']}")
+        else:
+            self.stdout.write(self.style.SUCCESS("\nNo errors."))
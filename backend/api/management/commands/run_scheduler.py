@@ -0,0 +1,263 @@
+from datetime import timedelta
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+import logging
+import threading
+import time
+from api.dispatch import (
+    DispatchEngine,
+    LeaseKeeper,
+    ScheduledCallExecutor,
+    claim_scheduled_calls,
+    release_scheduled_calls,
+)
+from api.metrics import metrics
+from api.models import ScheduledCall
+from api.scheduler import DispatchQueue, ScheduleListener, dispatch_lag
+
+
+logger = logging.getLogger(__name__)
+
+# Re-read rows updated this long before the last sync, in case the clocks of
+# the web servers writing updated_at run behind this one
+RESYNC_OVERLAP = timedelta(seconds=5)
+
+
+class Command(BaseCommand):
+    help = "Run the call scheduler: dispatch scheduled calls as they become due and keep call details in sync"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=settings.DISPATCH_WORKERS,
+            help="Calls started concurrently (default: DISPATCH_WORKERS)",
+        )
+        parser.add_argument(
+            "--resync-interval",
+            type=float,
+            default=settings.SCHEDULER_RESYNC_SECONDS,
+            help="Seconds between checks for schedule changes made without a notification (default: SCHEDULER_RESYNC_SECONDS)",
+        )
+        parser.add_argument(
+            "--call-sync-interval",
+            type=int,
+            default=settings.SCHEDULER_CALL_SYNC_INTERVAL,
+            help="Seconds between update_call_details runs, 0 to disable (default: SCHEDULER_CALL_SYNC_INTERVAL)",
+        )
+        parser.add_argument(
+            "--report-interval",
+            type=int,
+            default=60,
+            help="Seconds between queue and dispatch lag log lines, 0 to disable (default: 60)",
+        )
+
+    def handle(self, *args, **options):
+        self.resync_interval = options["resync_interval"]
+        self.stop_event = threading.Event()
+        self.queue = DispatchQueue()
+        self.listener = ScheduleListener()
+        self.lease_keeper = LeaseKeeper()
+        self.executor = ScheduledCallExecutor(self.lease_keeper)
+        self.counts = {"executed": 0, "retried": 0, "failed": 0, "skipped": 0, "deferred": 0}
+        self.counter_lock = threading.Lock()
+
+        self.load_all()
+        self.stdout.write(
+            f"Scheduler started: {len(self.queue)} scheduled calls queued, "
+            f"{options['workers']} dispatch workers, "
+            + ("listening for schedule changes" if self.listener.listening
+               else f"checking for schedule changes every {self.resync_interval}s")
+        )
+
+        call_sync = None
+        if options["call_sync_interval"] > 0:
+            call_sync = threading.Thread(
+                target=self.call_sync_loop, args=(options["call_sync_interval"],), name="call-sync", daemon=True
+            )
+            call_sync.start()
+
+        self.engine = DispatchEngine(self.dispatch, workers=options["workers"])
+        try:
+            self.run(options["report_interval"])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping scheduler...")
+        finally:
+            self.stop_event.set()
+            self.engine.shutdown(wait=True)
+            self.flush()
+            self.lease_keeper.stop()
+            if call_sync:
+                call_sync.join()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Scheduler stopped. {self.counts['executed']} calls executed, {self.counts['retried']} retries scheduled, "
+            f"{self.counts['failed']} failed, "
+            f"{self.counts['skipped']} skipped, {self.counts['deferred']} times deferred over a dispatch cap."
+        ))
+
+    def run(self, report_interval):
+        # Resync right away to pick up calls left behind by a previous run
+        next_resync = time.monotonic()
+        next_report = time.monotonic() + report_interval if report_interval > 0 else None
+        while not self.stop_event.is_set():
+            now = timezone.now()
+            due = self.queue.pop_due(now)
+            if due:
+                self.submit_due([scheduled_call_id for scheduled_call_id, due_at in due])
+
+            if time.monotonic() >= next_resync:
+                self.resync()
+                next_resync = time.monotonic() + self.resync_interval
+                close_old_connections()
+
+            next_due = self.queue.next_due()
+            dispatch_lag.queued = len(self.queue)
+            dispatch_lag.next_due_in = round((next_due - now).total_seconds(), 3) if next_due else None
+            if next_report is not None and time.monotonic() >= next_report:
+                self.report()
+                next_report = time.monotonic() + report_interval
+
+            timeout = next_resync - time.monotonic()
+            if next_due is not None:
+                timeout = min(timeout, (next_due - timezone.now()).total_seconds())
+            changed = self.listener.wait(max(0.0, timeout))
+            if None in changed:
+                self.resync()
+            changed.discard(None)
+            if changed:
+                self.refresh(changed)
+
+    def apply(self, rows):
+        for scheduled_call_id, status, due_at in rows:
+            if status == "scheduled":
+                self.queue.schedule(scheduled_call_id, due_at)
+            else:
+                self.queue.discard(scheduled_call_id)
+
+    def load_all(self):
+        self.synced_at = timezone.now()
+        self.queue.clear()
+        self.apply(
+            ScheduledCall.objects.filter(status="scheduled")
+            .values_list("id", "status", "next_attempt_at")
+            .iterator(chunk_size=2000)
+        )
+
+    def resync(self):
+        """Apply every schedule change since the last sync and pick up expired leases"""
+        started = timezone.now()
+        try:
+            self.apply(
+                ScheduledCall.objects.filter(updated_at__gte=self.synced_at - RESYNC_OVERLAP)
+                .values_list("id", "status", "next_attempt_at")
+                .iterator(chunk_size=2000)
+            )
+            # Claimed by a dispatcher that died before starting them
+            for scheduled_call_id, due_at in ScheduledCall.objects.filter(
+                status="in_progress", lease_expires_at__lt=started, actual_call__isnull=True
+            ).values_list("id", "next_attempt_at"):
+                self.queue.schedule(scheduled_call_id, due_at)
+        except Exception as e:
+            logger.error("Error syncing scheduled calls: %s", e)
+            close_old_connections()
+            return
+        self.synced_at = started
+
+    def refresh(self, scheduled_call_ids):
+        """Apply notified changes; ids that no longer exist were deleted"""
+        try:
+            rows = list(
+                ScheduledCall.objects.filter(id__in=scheduled_call_ids).values_list("id", "status", "next_attempt_at")
+            )
+        except Exception as e:
+            logger.error("Error loading changed scheduled calls: %s", e)
+            close_old_connections()
+            return
+        self.apply(rows)
+        for scheduled_call_id in set(scheduled_call_ids) - {row[0] for row in rows}:
+            self.queue.discard(scheduled_call_id)
+
+    def submit_due(self, scheduled_call_ids):
+        """Claim due calls and hand them to the dispatch engine; calls over a cap go back in the queue"""
+        retry_at = timezone.now() + timedelta(seconds=settings.DISPATCH_DEFER_SECONDS)
+        try:
+            due_calls = claim_scheduled_calls(ids=scheduled_call_ids)
+            self.lease_keeper.hold(due_calls)
+            self.executor.prime(due_calls)
+            self.engine.refresh(due_calls)
+        except Exception as e:
+            logger.error("Error claiming due scheduled calls: %s", e)
+            close_old_connections()
+            for scheduled_call_id in scheduled_call_ids:
+                self.queue.schedule(scheduled_call_id, retry_at)
+            return
+
+        # Cancelled, moved or claimed by another dispatcher since they were queued
+        for _ in range(len(scheduled_call_ids) - len(due_calls)):
+            self.count("skipped")
+
+        held_back = [call for call in due_calls if self.engine.try_submit(call) is None]
+        if held_back:
+            release_scheduled_calls(held_back)
+            self.lease_keeper.drop(held_back)
+            for scheduled_call in held_back:
+                self.queue.schedule(scheduled_call.id, retry_at)
+                self.count("deferred")
+
+    def dispatch(self, scheduled_call):
+        lag = (timezone.now() - scheduled_call.next_attempt_at).total_seconds()
+        dispatch_lag.record(lag)
+
+        result = self.executor(scheduled_call)
+        if result["success"]:
+            self.count("executed")
+            logger.info("Executed scheduled call %s (%.3fs after its scheduled time)", scheduled_call.id, lag)
+        elif "next_attempt_at" in result:
+            self.count("retried")
+        else:
+            self.count("failed")
+            logger.warning("Failed to execute scheduled call %s: %s", scheduled_call.id, result["error"])
+        if not result["success"]:
+            # Written from the worker: the main loop may sleep until the next
+            # due call or resync, and until then the row stays in_progress.
+            # Failures recorded meanwhile by other workers go in the same batch.
+            self.flush()
+        return result
+
+    def flush(self):
+        try:
+            self.executor.flush()
+        except Exception as e:
+            logger.error("Error recording failed scheduled calls: %s", e)
+            close_old_connections()
+
+    def count(self, outcome):
+        with self.counter_lock:
+            self.counts[outcome] += 1
+        metrics.increment("scheduled_calls_dispatched", outcome=outcome)
+
+    def report(self):
+        snapshot = dispatch_lag.snapshot()
+        lag = (
+            f"dispatch lag p50 {snapshot['lag_p50']}s, p95 {snapshot['lag_p95']}s, max {snapshot['lag_max']}s"
+            if snapshot["recent_dispatches"] else "no recent dispatches"
+        )
+        logger.info(
+            "Scheduler: %s calls queued, next due in %ss, %s",
+            snapshot["queued"], snapshot["next_due_in"], lag,
+            extra={"scheduler": snapshot},
+        )
+
+    def call_sync_loop(self, interval):
+        while not self.stop_event.is_set():
+            try:
+                call_command("update_call_details", "--hours", "2", stdout=self.stdout, stderr=self.stderr)
+            except Exception as e:
+                logger.error("Error updating call details: %s", e)
+            finally:
+                close_old_connections()
+            self.stop_event.wait(interval)
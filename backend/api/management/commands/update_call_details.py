@@ -1,13 +1,183 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+from django.conf import settings
 from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection, transaction
+from django.db.models.fields.json import KT
 from django.utils import timezone
 from api.models import InterviewCall, APIConfiguration
-import requests
+from api.vapi_client import VapiClient
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+# Vapi's createdAt is set slightly before our row's created_at; widen the
+# list window so calls created around the cutoff are not missed
+CREATED_AT_SKEW = timedelta(minutes=5)
+
+# Columns the sync reads. The large JSON/text columns it overwrites
+# (raw_call_data, transcript, ...) stay deferred; only Vapi's updatedAt is
+# read out of raw_call_data, to skip calls that have not changed.
+SYNC_FIELDS = (
+    'id', 'user_id', 'vapi_call_id', 'created_at', 'version', 'status', 'outcome_status',
+    'started_at', 'ended_at', 'duration_seconds', 'cost', 'end_reason',
+)
+
+
+class TenantCallSync:
+    """Reconciles one user's calls using that user's Vapi key"""
+
+    def __init__(self, command, user_id, api_key, concurrency, page_size, batch_size):
+        self.command = command
+        self.user_id = user_id
+        self.client = VapiClient(api_key)
+        self.concurrency = concurrency
+        self.page_size = page_size
+        self.batch_size = batch_size
+        self.counts = {'calls': 0, 'updated': 0, 'unchanged': 0, 'failed': 0, 'listed': 0, 'fetched': 0}
+
+    def run(self, calls, use_list=True):
+        """Sync an iterable of calls, a chunk of batch_size at a time"""
+        chunk = []
+        for call in calls:
+            chunk.append(call)
+            if len(chunk) >= self.batch_size:
+                self.sync_chunk(chunk, use_list)
+                chunk = []
+        if chunk:
+            self.sync_chunk(chunk, use_list)
+        return self.counts
+
+    def sync_chunk(self, calls, use_list):
+        candidates = {call.vapi_call_id: call for call in calls}
+        self.counts['calls'] += len(candidates)
+
+        # One list query per page covers most calls; fetch the rest one by one
+        listed = self.fetch_listed_calls(candidates) if use_list else {}
+        remaining = [call for call_id, call in candidates.items() if call_id not in listed]
+        self.counts['listed'] += len(listed)
+        self.counts['fetched'] += len(remaining)
+
+        pending = []
+        for call_id, call_data in listed.items():
+            self.apply_update(candidates[call_id], call_data, pending)
+        if remaining:
+            self.fetch_remaining(remaining, pending)
+        self.save_updates(pending)
+
+    def fetch_listed_calls(self, candidates):
+        """Page through Vapi's call list for the candidates' time window"""
+        created = [call.created_at for call in candidates.values()]
+        params = {
+            'createdAtGe': (min(created) - CREATED_AT_SKEW).isoformat(),
+            'createdAtLe': (max(created) + CREATED_AT_SKEW).isoformat(),
+            'limit': self.page_size,
+        }
+        found = {}
+        pages = 0
+        while len(found) < len(candidates):
+            try:
+                page = self.client.list_calls(**params)
+            except Exception as e:
+                # Not fatal: anything not listed is fetched individually
+                logger.warning(
+                    "Listing Vapi calls for user %s failed, falling back to per-call fetches: %s",
+                    self.user_id, e,
+                )
+                break
+            pages += 1
+            if not isinstance(page, list) or not page:
+                break
+            for call_data in page:
+                if call_data.get('id') in candidates:
+                    found[call_data['id']] = call_data
+            created_at = [call_data['createdAt'] for call_data in page if call_data.get('createdAt')]
+            if len(page) < self.page_size or not created_at:
+                break
+            # Pages come newest first; continue below the oldest call seen
+            next_before = min(created_at)
+            if next_before == params.get('createdAtLt'):
+                break
+            params['createdAtLt'] = next_before
+        logger.info("User %s: listed %s/%s calls from %s page(s)", self.user_id, len(found), len(candidates), pages)
+        return found
+
+    def fetch_remaining(self, calls, pending):
+        """Fetch calls one by one on a bounded pool, applying results as they arrive"""
+        with ThreadPoolExecutor(max_workers=max(1, self.concurrency), thread_name_prefix='call-sync') as pool:
+            futures = {pool.submit(self.client.get_call, call.vapi_call_id): call for call in calls}
+            for future in as_completed(futures):
+                call = futures[future]
+                try:
+                    call_data = future.result()
+                except Exception as e:
+                    self.record_failure(call, e)
+                    continue
+                self.apply_update(call, call_data, pending)
+
+    def apply_update(self, call, call_data, pending):
+        try:
+            self.command.update_call_details(call, call_data)
+        except Exception as e:
+            self.record_failure(call, e)
+            return
+        if call.dirty_fields():
+            pending.append(call)
+        else:
+            self.counts['unchanged'] += 1
+
+    def record_failure(self, call, error):
+        self.counts['failed'] += 1
+        logger.error("Error updating call %s: %s", call.id, error)
+        self.command.stdout.write(self.command.style.ERROR(f"❌ Failed to update call {call.id}: {str(error)}"))
+
+    def save_updates(self, calls):
+        """Write changed calls with bulk_update; rows changed meanwhile are saved one by one"""
+        if not calls:
+            return
+        with transaction.atomic():
+            current_versions = dict(
+                InterviewCall.objects.select_for_update()
+                .filter(id__in=[call.id for call in calls])
+                .values_list('id', 'version')
+            )
+            bulk, conflicted = [], []
+            for call in calls:
+                (bulk if current_versions.get(call.id) == call.version else conflicted).append(call)
+            # One bulk_update per set of changed fields: listing a field a row
+            # did not change would load it (deferred) and write it back
+            groups = {}
+            for call in bulk:
+                groups.setdefault(tuple(sorted(call.dirty_fields())), []).append(call)
+                call.version += 1
+            for fields, group in groups.items():
+                InterviewCall.objects.bulk_update(group, [*fields, 'version'], batch_size=self.batch_size)
+        for call in bulk:
+            call._take_snapshot()
+        saved = list(bulk)
+        for call in conflicted:
+            # A webhook updated the row since it was read; save() merges field by field
+            try:
+                call.save()
+            except Exception as e:
+                self.record_failure(call, e)
+                continue
+            saved.append(call)
+        self.counts['updated'] += len(saved)
+        if self.command.verbosity >= 2:
+            for call in saved:
+                self.command.stdout.write(
+                    self.command.style.SUCCESS(
+                        f"✅ Updated call {call.id}: Status: {call.status}, "
+                        f"Duration: {call.duration_seconds}s, Cost: ${call.cost}"
+                    )
+                )
+
+
 class Command(BaseCommand):
-    help = 'Update call details and transcripts from Vapi API'
+    help = 'Update call details and transcripts from Vapi API, using each call owner\'s Vapi key'
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -21,20 +191,36 @@ class Command(BaseCommand):
             default=24,
             help='Update calls from the last N hours (default: 24)'
         )
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=settings.CALL_SYNC_PAGE_SIZE,
+            help='Calls per page from the Vapi list endpoint (default: CALL_SYNC_PAGE_SIZE)'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=settings.CALL_SYNC_CONCURRENCY,
+            help='Concurrent per-call fetches per user (default: CALL_SYNC_CONCURRENCY)'
+        )
+        parser.add_argument(
+            '--tenant-workers',
+            type=int,
+            default=settings.CALL_SYNC_TENANT_WORKERS,
+            help='Users synced in parallel (default: CALL_SYNC_TENANT_WORKERS)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Calls read, matched and bulk-updated per chunk (default: 200)'
+        )
 
     def handle(self, *args, **options):
         self.stdout.write("🔄 Starting call details update...")
-        
-        # Get API configuration
-        config = APIConfiguration.objects.first()
-        if not config or not config.vapi_api_key:
-            self.stdout.write(self.style.ERROR("❌ No Vapi API key configured"))
-            return
-
-        headers = {
-            'Authorization': f'Bearer {config.vapi_api_key}',
-            'Content-Type': 'application/json'
-        }
+        self.verbosity = options['verbosity']
+        self.options = options
+        started = time.monotonic()
 
         # Get calls to update
         if options['call_id']:
@@ -47,118 +233,122 @@ class Command(BaseCommand):
                 vapi_call_id__isnull=False
             ).exclude(status='ended')
 
-        updated_count = 0
-        failed_count = 0
+        # Each user's calls are reconciled with that user's key
+        user_ids = list(calls.order_by().values_list('user_id', flat=True).distinct())
+        keys = {
+            config.user_id: config.vapi_api_key
+            for config in APIConfiguration.objects.filter(user_id__in=user_ids).only('user_id', 'vapi_api_key')
+            if config.is_vapi_configured
+        }
+        skipped = [user_id for user_id in user_ids if user_id not in keys]
+        if skipped:
+            self.stdout.write(self.style.WARNING(f"⚠️ Skipping {len(skipped)} user(s) without a Vapi API key"))
+
+        totals = {'calls': 0, 'updated': 0, 'unchanged': 0, 'failed': 0, 'listed': 0, 'fetched': 0}
+        totals_lock = threading.Lock()
 
-        for call in calls:
+        def sync_tenant(user_id):
             try:
-                self.stdout.write(f"📞 Updating call {call.vapi_call_id}...")
-                result = self.update_call_details(call, headers)
-                
-                if result['success']:
-                    updated_count += 1
-                    self.stdout.write(
-                        self.style.SUCCESS(f"✅ Updated call {call.id}: {result['message']}")
-                    )
-                else:
-                    failed_count += 1
-                    self.stdout.write(
-                        self.style.ERROR(f"❌ Failed to update call {call.id}: {result['error']}")
-                    )
-                    
-            except Exception as e:
-                failed_count += 1
-                logger.error(f"Error updating call {call.id}: {str(e)}")
-                self.stdout.write(
-                    self.style.ERROR(f"❌ Error updating call {call.id}: {str(e)}")
+                tenant = TenantCallSync(
+                    self, user_id, keys[user_id],
+                    options['concurrency'], options['page_size'], options['batch_size'],
+                )
+                tenant_calls = (
+                    calls.filter(user_id=user_id)
+                    .only(*SYNC_FIELDS)
+                    .annotate(vapi_updated_at=KT('raw_call_data__updatedAt'))
+                    .order_by('-created_at', 'id')
+                    .iterator(chunk_size=options['batch_size'])
                 )
+                counts = tenant.run(tenant_calls, use_list=not options['call_id'])
+                with totals_lock:
+                    for key, value in counts.items():
+                        totals[key] += value
+                if self.verbosity >= 2:
+                    self.stdout.write(f"👤 User {user_id}: {counts}")
+            except Exception as e:
+                logger.error("Error syncing calls for user %s: %s", user_id, e)
+                self.stdout.write(self.style.ERROR(f"❌ Error syncing calls for user {user_id}: {str(e)}"))
+            finally:
+                close_old_connections()
+
+        tenants = [user_id for user_id in user_ids if user_id in keys]
+        tenant_workers = max(1, options['tenant_workers'])
+        if connection.vendor == 'sqlite':
+            # An open streaming read in one connection blocks commits from
+            # the others, so tenants take turns (fetches stay concurrent)
+            tenant_workers = 1
+        with ThreadPoolExecutor(max_workers=tenant_workers, thread_name_prefix='tenant-sync') as pool:
+            list(pool.map(sync_tenant, tenants))
 
+        elapsed = time.monotonic() - started
         self.stdout.write(
             self.style.SUCCESS(
-                f"🎉 Update complete: {updated_count} updated, {failed_count} failed"
+                f"🎉 Update complete: {totals['updated']} updated, {totals['unchanged']} unchanged, "
+                f"{totals['failed']} failed across {len(tenants)} user(s); {totals['listed']} via list, "
+                f"{totals['fetched']} fetched individually in {elapsed:.2f}s "
+                f"({totals['calls'] / elapsed if elapsed else 0:.1f} calls/s)"
             )
         )
 
-    def update_call_details(self, call, headers):
-        """Update a single call with details from Vapi API"""
-        try:
-            # Get call details from Vapi
-            url = f'https://api.vapi.ai/call/{call.vapi_call_id}'
-            response = requests.get(url, headers=headers)
-            
-            if response.status_code != 200:
-                return {
-                    'success': False,
-                    'error': f'Vapi API error: {response.status_code} - {response.text}'
-                }
-
-            call_data = response.json()
-            
-            # Update call fields
-            call.status = call_data.get('status', call.status)
-            call.raw_call_data = call_data
-            
-            # Update timestamps
-            from dateutil import parser as date_parser
-            if call_data.get('startedAt'):
-                call.started_at = date_parser.parse(call_data['startedAt'])
-            if call_data.get('endedAt'):
-                call.ended_at = date_parser.parse(call_data['endedAt'])
-            
-            # Update duration
-            if call_data.get('duration'):
-                call.duration_seconds = call_data['duration']
-            elif call.started_at and call.ended_at:
-                duration = (call.ended_at - call.started_at).total_seconds()
-                call.duration_seconds = int(duration)
-            
-            # Update cost
-            if call_data.get('cost'):
-                call.cost = call_data['cost']
-                call.cost_breakdown = call_data.get('costBreakdown', {})
-            
-            # Update transcript
-            transcript = call_data.get('transcript')
-            if transcript:
-                if isinstance(transcript, list):
-                    # Convert transcript array to text
-                    transcript_text = ""
-                    for item in transcript:
-                        if isinstance(item, dict):
-                            role = item.get('role', 'unknown')
-                            message = item.get('message', '')
-                            transcript_text += f"{role}: {message}\n"
-                        else:
-                            transcript_text += str(item) + "\n"
-                    call.transcript_text = transcript_text
-                    call.transcript = transcript
-                else:
-                    call.transcript_text = str(transcript)
-            
-            # Update outcome
-            call.outcome_status = self.determine_call_outcome(call_data)
-            if call_data.get('endReason'):
-                call.end_reason = call_data['endReason']
-            
-            call.save()
-            
-            return {
-                'success': True,
-                'message': f'Status: {call.status}, Duration: {call.duration_seconds}s, Cost: ${call.cost}'
-            }
-            
-        except Exception as e:
-            return {
-                'success': False,
-                'error': str(e)
-            }
+    def update_call_details(self, call, call_data):
+        """Apply Vapi's call data to a call (not saved)"""
+        # Nothing changed at Vapi since the stored copy was taken
+        if call_data.get('updatedAt') and call_data['updatedAt'] == getattr(call, 'vapi_updated_at', None):
+            return
+
+        # Update call fields
+        call.status = call_data.get('status', call.status)
+        call.raw_call_data = call_data
+
+        # Update timestamps
+        from dateutil import parser as date_parser
+        if call_data.get('startedAt'):
+            call.started_at = date_parser.parse(call_data['startedAt'])
+        if call_data.get('endedAt'):
+            call.ended_at = date_parser.parse(call_data['endedAt'])
+
+        # Update duration
+        if call_data.get('duration'):
+            call.duration_seconds = call_data['duration']
+        elif call.started_at and call.ended_at:
+            duration = (call.ended_at - call.started_at).total_seconds()
+            call.duration_seconds = int(duration)
+
+        # Update cost
+        if call_data.get('cost'):
+            call.cost = call_data['cost']
+            call.cost_breakdown = call_data.get('costBreakdown', {})
+
+        # Update transcript
+        transcript = call_data.get('transcript')
+        if transcript:
+            if isinstance(transcript, list):
+                # Convert transcript array to text
+                transcript_text = ""
+                for item in transcript:
+                    if isinstance(item, dict):
+                        role = item.get('role', 'unknown')
+                        message = item.get('message', '')
+                        transcript_text += f"{role}: {message}\n"
+                    else:
+                        transcript_text += str(item) + "\n"
+                call.transcript_text = transcript_text
+                call.transcript = transcript
+            else:
+                call.transcript_text = str(transcript)
+
+        # Update outcome
+        call.outcome_status = self.determine_call_outcome(call_data)
+        if call_data.get('endReason'):
+            call.end_reason = call_data['endReason']
 
     def determine_call_outcome(self, call_data):
         """Determine call outcome based on Vapi data"""
         status = call_data.get('status', '')
         end_reason = call_data.get('endReason', '')
         duration = call_data.get('duration', 0)
-        
+
         if status == 'ended':
             if 'no-answer' in end_reason.lower() or 'declined' in end_reason.lower():
                 return 'no-answer'
@@ -170,5 +360,5 @@ class Command(BaseCommand):
                 return 'answered-brief'
             else:
                 return 'completed'
-        
-        return status
\ No newline at end of file
+
+        return status
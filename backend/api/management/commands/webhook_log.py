@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+import json
+from api.views import webhook_event_log
+
+
+class Command(BaseCommand):
+    help = "Read webhook events back from the segmented webhook event log"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--call-id",
+            type=str,
+            help="Only show events for this Vapi call ID",
+        )
+        parser.add_argument(
+            "--event-type",
+            type=str,
+            help="Only show events of this type (e.g. end-of-call-report)",
+        )
+        parser.add_argument(
+            "--export",
+            type=str,
+            help="Write matching events to this file as JSON lines instead of printing them",
+        )
+        parser.add_argument(
+            "--summary",
+            action="store_true",
+            help="Only print event counts per type",
+        )
+
+    def handle(self, *args, **options):
+        call_id = options.get("call_id")
+        event_type = options.get("event_type")
+
+        if options["summary"]:
+            counts = {}
+            for record in webhook_event_log.iter_events(call_id, event_type):
+                key = record.get("event_type") or "unknown_event"
+                counts[key] = counts.get(key, 0) + 1
+            for key, count in sorted(counts.items(), key=lambda item: -item[1]):
+                self.stdout.write(f"{count:>8}  {key}")
+            return
+
+        if options.get("export"):
+            exported = 0
+            try:
+                with open(options["export"], "w") as f:
+                    for record in webhook_event_log.iter_events(call_id, event_type):
+                        f.write(json.dumps(record, separators=(",", ":")) + "\n")
+                        exported += 1
+            except OSError as e:
+                raise CommandError(f"Could not write export file: {e}")
+            self.stdout.write(
+                self.style.SUCCESS(f"Exported {exported} events to {options['export']}")
+            )
+            return
+
+        for record in webhook_event_log.iter_events(call_id, event_type):
+            self.stdout.write(
+                f"{record.get('ts')}  {record.get('event_type')}  {record.get('call_id')}"
+            )
+            self.stdout.write(json.dumps(record.get("event"), indent=2))
@@ -0,0 +1,62 @@
+"""
+In-process counters and gauges.
+
+Values are per process (each gunicorn worker or management command keeps
+its own) and are exposed through the admin-only /api/metrics/ endpoint.
+Components with state that is cheaper to read on demand (queue depths,
+breaker states) register a collector instead of pushing gauges.
+"""
+
+import threading
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._collectors = {}
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def increment(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges[self._key(name, labels)] = value
+
+    def register_collector(self, name, collector):
+        """Register a callable returning a JSON-serialisable value for snapshot()"""
+        with self._lock:
+            self._collectors[name] = collector
+
+    def counter_value(self, name, **labels):
+        with self._lock:
+            return self._counters.get(self._key(name, labels), 0)
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            collectors = dict(self._collectors)
+
+        data = {"counters": {}, "gauges": {}}
+        for section, values in (("counters", counters), ("gauges", gauges)):
+            for (name, labels), value in sorted(values.items()):
+                label_text = ",".join(f"{k}={v}" for k, v in labels) or "total"
+                data[section].setdefault(name, {})[label_text] = value
+
+        for name, collector in collectors.items():
+            try:
+                data[name] = collector()
+            except Exception as e:
+                data[name] = {"error": str(e)}
+        return data
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-17 23:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_webhookevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookDelivery',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delivery_key', models.CharField(max_length=64, unique=True)),
+                ('vapi_call_id', models.CharField(blank=True, max_length=255, null=True)),
+                ('event_type', models.CharField(blank=True, max_length=100, null=True)),
+                ('received_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.4 on 2026-10-17 23:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_webhookdelivery'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TranscriptSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('transcript', 'Transcript event'), ('conversation', 'Conversation update')], max_length=20)),
+                ('sequence', models.IntegerField()),
+                ('role', models.CharField(blank=True, max_length=50, null=True)),
+                ('message', models.TextField(blank=True, default='')),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('call', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transcript_segments', to='api.interviewcall')),
+            ],
+            options={
+                'ordering': ['call', 'source', 'sequence'],
+                'constraints': [models.UniqueConstraint(fields=('call', 'source', 'sequence'), name='unique_transcript_segment')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.4 on 2026-10-17 23:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_transcriptsegment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='webhookevent',
+            name='shard',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='webhookevent',
+            index=models.Index(fields=['status', 'shard', 'id'], name='api_webhook_status_d2858a_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-17 23:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_webhookevent_shard'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='interviewcall',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
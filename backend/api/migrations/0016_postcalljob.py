@@ -0,0 +1,36 @@
+# Generated by Django 5.1.4 on 2026-10-17 23:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_interviewcall_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostCallJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('download_recording', 'Download Recording'), ('process_transcript', 'Process Transcript')], max_length=30)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='pending', max_length=20)),
+                ('attempts', models.IntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(db_index=True)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('locked_by', models.CharField(blank=True, max_length=64, null=True)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('call', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='post_call_jobs', to='api.interviewcall')),
+            ],
+            options={
+                'ordering': ['next_attempt_at', 'id'],
+                'indexes': [models.Index(fields=['kind', 'status', 'next_attempt_at'], name='api_postcal_kind_c06b54_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status__in', ['pending', 'running'])), fields=('call', 'kind'), name='unique_active_post_call_job')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-17 23:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_postcalljob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='scheduledcall',
+            index=models.Index(fields=['status', 'scheduled_time'], name='api_schedul_status_776b0a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='scheduledcall',
+            index=models.Index(fields=['updated_at'], name='api_schedul_updated_23716e_idx'),
+        ),
+    ]
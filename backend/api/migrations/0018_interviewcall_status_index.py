@@ -0,0 +1,19 @@
+# Generated by Django 5.1.4 on 2026-10-17 23:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_scheduledcall_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='interviewcall',
+            index=models.Index(fields=['status', 'created_at'], name='api_intervi_status_57fd50_idx'),
+        ),
+    ]
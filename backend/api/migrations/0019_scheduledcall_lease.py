@@ -0,0 +1,23 @@
+# Generated by Django 5.1.4 on 2026-10-17 23:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_interviewcall_status_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='scheduledcall',
+            name='lease_expires_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='scheduledcall',
+            name='lease_owner',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.1.4 on 2026-10-17 23:54
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_scheduled_time(apps, schema_editor):
+    ScheduledCall = apps.get_model('api', 'ScheduledCall')
+    ScheduledCall.objects.update(next_attempt_at=F('scheduled_time'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_scheduledcall_lease'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='scheduledcall',
+            name='api_schedul_status_776b0a_idx',
+        ),
+        migrations.AddField(
+            model_name='scheduledcall',
+            name='next_attempt_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(copy_scheduled_time, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='scheduledcall',
+            name='next_attempt_at',
+            field=models.DateTimeField(),
+        ),
+        migrations.AddIndex(
+            model_name='scheduledcall',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='api_schedul_status_082e85_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.4 on 2026-10-18 00:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_scheduledcall_next_attempt_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookShardLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shard', models.IntegerField(unique=True)),
+                ('owner', models.CharField(blank=True, max_length=48, null=True)),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
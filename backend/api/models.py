@@ -1,8 +1,183 @@
-from django.db import models
+from django.db import connections, models, transaction
 from django.contrib.auth.models import User
+from contextlib import nullcontext
 import json
 
 
+class ConcurrentUpdateError(Exception):
+    """Raised when a versioned save keeps conflicting with concurrent writers"""
+
+
+class _VersionConflict(Exception):
+    pass
+
+
+def _copy_json(value):
+    """Copy JSON-shaped data (dicts, lists, scalars) for change tracking"""
+    if isinstance(value, dict):
+        return {key: _copy_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy_json(item) for item in value]
+    return value
+
+
+class ChangeTrackingModel(models.Model):
+    """
+    Abstract model that writes only changed fields and versions every update.
+
+    Field values are snapshotted when a row is loaded; save() without
+    update_fields writes just the fields that differ from the snapshot (and
+    does nothing if none do). Each update is a conditional UPDATE on the
+    version column. If another writer got there first, the row is reloaded,
+    merge_changes() decides which of this instance's changes still apply on
+    top of it, and the update is retried.
+    """
+
+    MAX_SAVE_RETRIES = 3
+
+    version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._take_snapshot()
+        return instance
+
+    def _tracked_value(self, field):
+        value = getattr(self, field.attname)
+        if isinstance(field, models.FileField):
+            return value.name if value else None
+        if isinstance(field, models.JSONField):
+            return _copy_json(value)
+        return value
+
+    def _take_snapshot(self, field_names=None):
+        deferred = self.get_deferred_fields()
+        snapshot = getattr(self, "_snapshot", None) or {}
+        for field in self._meta.concrete_fields:
+            if field.primary_key or field.attname in deferred:
+                continue
+            if field_names is None or field.name in field_names or field.attname in field_names:
+                snapshot[field.attname] = self._tracked_value(field)
+        self._snapshot = snapshot
+
+    def dirty_fields(self):
+        """
+        Names of fields changed since the row was read or saved. A field that
+        was deferred (.only()/.defer()) and has since been assigned counts as
+        changed, since there is no loaded value to compare against.
+        """
+        snapshot = getattr(self, "_snapshot", {})
+        deferred = self.get_deferred_fields()
+        return [
+            field.name
+            for field in self._meta.concrete_fields
+            if not field.primary_key and (
+                self._tracked_value(field) != snapshot[field.attname]
+                if field.attname in snapshot
+                else field.attname not in deferred
+            )
+        ]
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._take_snapshot(fields)
+
+    def save(self, *args, **kwargs):
+        if self._state.adding or kwargs.get("force_insert") or not hasattr(self, "_snapshot"):
+            super().save(*args, **kwargs)
+            self._take_snapshot()
+            return
+
+        update_fields = kwargs.pop("update_fields", None)
+        fields = set(update_fields) if update_fields is not None else set(self.dirty_fields())
+        fields.discard("version")
+        if not fields:
+            return
+
+        for attempt in range(self.MAX_SAVE_RETRIES + 1):
+            expected_version = self.version
+            self._expected_version = expected_version
+            self.version = expected_version + 1
+            # Inside a transaction a conflicting attempt must roll back to a
+            # savepoint, or the whole transaction is marked for rollback
+            using = kwargs.get("using") or self._state.db or "default"
+            savepoint = transaction.atomic(using=using) if connections[using].in_atomic_block else nullcontext()
+            try:
+                with savepoint:
+                    super().save(*args, update_fields=[*fields, "version"], **kwargs)
+                break
+            except _VersionConflict:
+                self.version = expected_version
+                if attempt == self.MAX_SAVE_RETRIES:
+                    raise ConcurrentUpdateError(
+                        f"{type(self).__name__} {self.pk} changed concurrently; "
+                        f"gave up after {attempt + 1} attempts"
+                    )
+                # Take the latest row and let the model decide what of ours still applies
+                ours = {name: getattr(self, self._meta.get_field(name).attname) for name in fields}
+                self.refresh_from_db()
+                fields = set(self.merge_changes(ours))
+                fields.discard("version")
+                if not fields:
+                    return
+            finally:
+                self._expected_version = None
+        self._take_snapshot(fields | {"version"})
+
+    def merge_changes(self, changes):
+        """
+        Called when a save lost a race: the instance holds the latest row and
+        changes maps each field the save was writing to this instance's value.
+        Apply the changes that should still be written and return their
+        names; returning none of them drops the save, and raising
+        ConcurrentUpdateError rejects it. By default every change is
+        re-applied (per field, last writer wins).
+        """
+        for name, value in changes.items():
+            setattr(self, self._meta.get_field(name).attname, value)
+        return changes.keys()
+
+    def save_if(self, condition):
+        """
+        Write the changed fields in one UPDATE that only matches while the
+        stored row satisfies condition (a Q object), e.g. so a late webhook
+        never moves a status backwards. Returns whether the row was written;
+        if it was not, the instance is reloaded from the database.
+        """
+        fields = set(self.dirty_fields())
+        fields.discard("version")
+        values = {}
+        for field in self._meta.concrete_fields:
+            if field.name in fields or getattr(field, "auto_now", False):
+                values[field.attname] = field.pre_save(self, False)
+        updated = type(self)._default_manager.filter(condition, pk=self.pk).update(
+            version=models.F("version") + 1, **values
+        )
+        if not updated:
+            self.refresh_from_db()
+            return False
+        self.refresh_from_db(fields=["version"])
+        self._take_snapshot(fields)
+        return True
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        expected_version = getattr(self, "_expected_version", None)
+        if expected_version is None:
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+        updated = super()._do_update(
+            base_qs.filter(version=expected_version), using, pk_val, values, update_fields, forced_update
+        )
+        if not updated:
+            if not base_qs.filter(pk=pk_val).exists():
+                return False
+            raise _VersionConflict()
+        return updated
+
+
 class Campaign(models.Model):
     """Store campaign details for interview calls"""
 
@@ -125,7 +300,7 @@ class PhoneNumber(models.Model):
         ordering = ["-created_at"]
 
 
-class InterviewCall(models.Model):
+class InterviewCall(ChangeTrackingModel):
     """Store call records and outcomes"""
 
     CALL_STATUS_CHOICES = [
@@ -136,6 +311,21 @@ class InterviewCall(models.Model):
         ("failed", "Failed"),
     ]
 
+    # Calls whose transcript has been copied out of their TranscriptSegments
+    FINISHED_STATUSES = ("ended", "failed")
+
+    # Order of Vapi call statuses; a call only ever moves forwards
+    STATUS_ORDER = {
+        "scheduled": 0,
+        "queued": 1,
+        "ringing": 2,
+        "in-progress": 3,
+        "forwarding": 4,
+        "transferred": 4,
+        "ended": 5,
+        "failed": 5,
+    }
+
     CALL_TYPE_CHOICES = [
         ("outbound", "Outbound"),
         ("inbound", "Inbound"),
@@ -220,8 +410,131 @@ class InterviewCall(models.Model):
         """Check if this call has a downloaded recording file"""
         return bool(self.recording_file)
 
+    @property
+    def is_live(self):
+        return self.status not in self.FINISHED_STATUSES
+
+    def merge_changes(self, changes):
+        """Re-apply our changes, except a status the call has already moved past"""
+        status = changes.get("status")
+        if status is not None and status != self.status:
+            stored_rank = self.STATUS_ORDER.get(self.status)
+            new_rank = self.STATUS_ORDER.get(status)
+            if stored_rank is not None and new_rank is not None and new_rank <= stored_rank:
+                changes = {name: value for name, value in changes.items() if name != "status"}
+        return super().merge_changes(changes)
+
+    def transcript_from_segments(self):
+        """
+        Rebuild (transcript, transcript_text) from the stored TranscriptSegments.
+        Conversation updates carry the full message list, so they win over
+        individual transcript events. Returns None when there are no segments.
+        Uses prefetched transcript_segments when the queryset has them.
+        """
+        segments = list(self.transcript_segments.all())
+        if not segments:
+            return None
+
+        conversation = [s for s in segments if s.source == "conversation"]
+        if conversation:
+            transcript = [s.data for s in conversation]
+            transcript_text = "\n".join(f"{s.role or 'unknown'}: {s.message}" for s in conversation)
+            return transcript, transcript_text
+
+        transcript_text = "\n".join(f"{s.role}: {s.message}" for s in segments)
+        return self.transcript, transcript_text
+
+    def materialize_transcript(self):
+        """Copy the live transcript segments onto transcript/transcript_text (caller saves)"""
+        rebuilt = self.transcript_from_segments()
+        if rebuilt is None:
+            return False
+        self.transcript, self.transcript_text = rebuilt
+        return True
+
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # Live call counts for the dispatch caps (api/dispatch.py)
+            models.Index(fields=["status", "created_at"]),
+        ]
+
+
+class TranscriptSegment(models.Model):
+    """Transcript pieces received through webhooks while a call is live"""
+
+    SOURCE_CHOICES = [
+        ("transcript", "Transcript event"),
+        ("conversation", "Conversation update"),
+    ]
+
+    call = models.ForeignKey(
+        InterviewCall, on_delete=models.CASCADE, related_name="transcript_segments"
+    )
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    sequence = models.IntegerField()
+    role = models.CharField(max_length=50, blank=True, null=True)
+    message = models.TextField(blank=True, default="")
+    data = models.JSONField(default=dict, blank=True)  # Original Vapi message for conversation updates
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.source} #{self.sequence} for call {self.call_id}"
+
+    class Meta:
+        ordering = ["call", "source", "sequence"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["call", "source", "sequence"], name="unique_transcript_segment"
+            )
+        ]
+
+
+class PostCallJob(models.Model):
+    """Work to do after a call ends, run by the process_post_call_jobs workers"""
+
+    KIND_CHOICES = [
+        ("download_recording", "Download Recording"),
+        ("process_transcript", "Process Transcript"),
+    ]
+
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("succeeded", "Succeeded"),
+        ("failed", "Failed"),
+    ]
+
+    call = models.ForeignKey(InterviewCall, on_delete=models.CASCADE, related_name="post_call_jobs")
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    payload = models.JSONField(default=dict, blank=True)  # e.g. {"recording_url": ...}
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+
+    # Retry bookkeeping
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(db_index=True)
+    last_error = models.TextField(blank=True, null=True)
+    locked_by = models.CharField(max_length=64, blank=True, null=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+
+    # Timestamps
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.kind} for call {self.call_id} ({self.status})"
+
+    class Meta:
+        ordering = ["next_attempt_at", "id"]
+        indexes = [models.Index(fields=["kind", "status", "next_attempt_at"])]
+        constraints = [
+            # At most one outstanding job of each kind per call
+            models.UniqueConstraint(
+                fields=["call", "kind"],
+                condition=models.Q(status__in=["pending", "running"]),
+                name="unique_active_post_call_job",
+            )
+        ]
 
 
 class ScheduledCall(models.Model):
@@ -256,6 +569,8 @@ class ScheduledCall(models.Model):
     
     # Scheduling information
     scheduled_time = models.DateTimeField()
+    # When the call is next due: scheduled_time at first, pushed back by retries
+    next_attempt_at = models.DateTimeField()
     timezone = models.CharField(max_length=50, blank=True, null=True)  # Store the timezone used for scheduling
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
     
@@ -274,6 +589,11 @@ class ScheduledCall(models.Model):
     execution_attempts = models.IntegerField(default=0)
     last_attempt_at = models.DateTimeField(blank=True, null=True)
     error_message = models.TextField(blank=True, null=True)
+
+    # Dispatcher holding the call while it is started (api/dispatch.py); an
+    # in_progress call whose lease expired without a call is claimed again
+    lease_owner = models.CharField(max_length=64, blank=True, null=True)
+    lease_expires_at = models.DateTimeField(blank=True, null=True, db_index=True)
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -282,11 +602,95 @@ class ScheduledCall(models.Model):
     def __str__(self):
         return f"Scheduled call to {self.customer_number} at {self.scheduled_time}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_scheduled_time = instance.__dict__.get("scheduled_time")
+        return instance
+
+    def save(self, *args, **kwargs):
+        # Moving a scheduled call also moves its next attempt, even one a
+        # retry had pushed back
+        loaded = getattr(self, "_loaded_scheduled_time", None)
+        moved = loaded is not None and self.status == "scheduled" and self.scheduled_time != loaded
+        if self.next_attempt_at is None or moved:
+            self.next_attempt_at = self.scheduled_time
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None and "next_attempt_at" not in update_fields:
+                kwargs["update_fields"] = [*update_fields, "next_attempt_at"]
+        super().save(*args, **kwargs)
+        self._loaded_scheduled_time = self.__dict__.get("scheduled_time")
+
     @property
     def is_due(self):
         """Check if the scheduled call is due for execution"""
         from django.utils import timezone
-        return self.status == "scheduled" and self.scheduled_time <= timezone.now()
+        return self.status == "scheduled" and self.next_attempt_at <= timezone.now()
 
     class Meta:
         ordering = ["scheduled_time"]
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+            # Scheduler resyncs read rows changed since its last pass
+            models.Index(fields=["updated_at"]),
+        ]
+
+
+class WebhookEvent(models.Model):
+    """Queue of raw Vapi webhook payloads waiting for background processing"""
+
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("processing", "Processing"),
+        ("processed", "Processed"),
+        ("failed", "Failed"),
+    ]
+
+    event_type = models.CharField(max_length=100, blank=True, null=True)
+    vapi_call_id = models.CharField(max_length=255, blank=True, null=True, db_index=True)
+    payload = models.JSONField(default=dict)  # Raw webhook body as received from Vapi
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    shard = models.IntegerField(default=0)  # Hash of vapi_call_id; one worker (holding its lease) owns each shard
+
+    # Worker bookkeeping
+    attempts = models.IntegerField(default=0)
+    locked_by = models.CharField(max_length=64, blank=True, null=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    error_message = models.TextField(blank=True, null=True)
+
+    # Timestamps
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"{self.event_type} for call {self.vapi_call_id} ({self.status})"
+
+    class Meta:
+        ordering = ["id"]
+        indexes = [
+            models.Index(fields=["status", "id"]),
+            models.Index(fields=["status", "shard", "id"]),
+        ]
+
+
+class WebhookShardLease(models.Model):
+    """Which process_webhook_events process currently owns a webhook queue shard"""
+
+    shard = models.IntegerField(unique=True)
+    owner = models.CharField(max_length=48, blank=True, null=True)
+    expires_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"Shard {self.shard} owned by {self.owner or 'nobody'}"
+
+
+class WebhookDelivery(models.Model):
+    """Keys of webhook deliveries already accepted, used to drop Vapi retries"""
+
+    delivery_key = models.CharField(max_length=64, unique=True)
+    vapi_call_id = models.CharField(max_length=255, blank=True, null=True)
+    event_type = models.CharField(max_length=100, blank=True, null=True)
+    received_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.event_type} for call {self.vapi_call_id}"
@@ -0,0 +1,203 @@
+"""
+Background jobs that run after a call ends.
+
+The end-of-call webhook only records what happened; downloading the
+recording and processing the transcript with OpenAI are queued as
+PostCallJob rows and run by the `process_post_call_jobs` management
+command, which keeps a separate worker pool per job kind. Failed jobs are
+retried with exponential backoff up to the kind's max_attempts.
+"""
+
+import logging
+import os
+import tempfile
+import uuid
+from collections import namedtuple
+from datetime import timedelta
+from urllib.parse import urlparse
+
+import requests
+from django.core.files import File
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from api.metrics import metrics
+from api.models import PostCallJob
+
+logger = logging.getLogger(__name__)
+
+RetryPolicy = namedtuple("RetryPolicy", "max_attempts base_delay max_delay")
+
+RETRY_POLICIES = {
+    "download_recording": RetryPolicy(max_attempts=5, base_delay=30, max_delay=1800),
+    "process_transcript": RetryPolicy(max_attempts=3, base_delay=60, max_delay=1800),
+}
+
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
+
+class PermanentJobError(Exception):
+    """A job failure that retrying cannot fix"""
+
+
+def enqueue_post_call_job(call, kind, payload=None):
+    """Queue a job for a call. Returns None if one of this kind is already outstanding."""
+    try:
+        with transaction.atomic():
+            return PostCallJob.objects.create(
+                call=call, kind=kind, payload=payload or {}, next_attempt_at=timezone.now()
+            )
+    except IntegrityError:
+        return None
+
+
+def retry_delay(policy, attempts):
+    """Seconds to wait before the next attempt"""
+    return min(policy.max_delay, policy.base_delay * 2 ** max(0, attempts - 1))
+
+
+def claim_post_call_jobs(kind, batch_size=10):
+    """Claim due pending jobs of one kind for the calling worker"""
+    candidate_ids = list(
+        PostCallJob.objects.filter(kind=kind, status="pending", next_attempt_at__lte=timezone.now())
+        .order_by("next_attempt_at", "id")
+        .values_list("id", flat=True)[:batch_size]
+    )
+    if not candidate_ids:
+        return []
+
+    claim_token = uuid.uuid4().hex
+    PostCallJob.objects.filter(id__in=candidate_ids, status="pending").update(
+        status="running",
+        locked_by=claim_token,
+        locked_at=timezone.now(),
+        attempts=F("attempts") + 1,
+    )
+    return list(
+        PostCallJob.objects.filter(locked_by=claim_token, status="running")
+        .select_related("call", "call__assistant", "call__user")
+        .order_by("next_attempt_at", "id")
+    )
+
+
+def download_recording(job):
+    """Stream the call recording to a temporary file, then into recording_file"""
+    call = job.call
+    if call.recording_file:
+        return
+    recording_url = job.payload.get("recording_url") or call.recording_url
+    if not recording_url:
+        raise PermanentJobError("No recording URL")
+
+    file_extension = os.path.splitext(urlparse(recording_url).path)[1] or ".mp3"
+    filename = f"call_{call.id}_{timezone.now().strftime('%Y%m%d_%H%M%S')}{file_extension}"
+
+    with requests.get(recording_url, stream=True, timeout=(10, 60)) as response:
+        if 400 <= response.status_code < 500 and response.status_code not in (408, 429):
+            raise PermanentJobError(f"Recording URL returned {response.status_code}")
+        response.raise_for_status()
+        with tempfile.TemporaryFile() as tmp:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_BYTES):
+                tmp.write(chunk)
+            tmp.seek(0)
+            call.recording_file.save(filename, File(tmp, name=filename), save=True)
+
+    logger.info("Downloaded recording for call %s: %s", call.id, filename)
+
+
+def process_transcript(job):
+    """Run the transcript through OpenAI against the assistant's knowledge text"""
+    from api.views import CreateAssistantView
+
+    call = job.call
+    if call.processed_transcript:
+        return
+    knowledge_text = call.assistant.knowledge_text if call.assistant else ""
+    if not knowledge_text or not call.transcript_text:
+        logger.debug("Skipping transcript processing for call %s: missing knowledge_text or transcript_text", call.id)
+        return
+
+    result = CreateAssistantView().process_transcript_with_articles(
+        call.transcript_text, knowledge_text, user=call.user
+    )
+    if not result.get("success") or "structured_output" not in result:
+        raise Exception(result.get("error", "Unknown error"))
+
+    call.processed_transcript = result["structured_output"]
+    call.save()
+    logger.info("Processed transcript for call %s", call.id)
+
+
+JOB_HANDLERS = {
+    "download_recording": download_recording,
+    "process_transcript": process_transcript,
+}
+
+
+def run_post_call_job(job):
+    """Run a claimed job and record the outcome. Returns True on success."""
+    policy = RETRY_POLICIES[job.kind]
+    try:
+        JOB_HANDLERS[job.kind](job)
+    except PermanentJobError as e:
+        logger.error("Post-call job %s (%s) for call %s failed: %s", job.id, job.kind, job.call_id, e)
+        return _finish(job, "failed", str(e))
+    except Exception as e:
+        if job.attempts < policy.max_attempts:
+            delay = retry_delay(policy, job.attempts)
+            logger.warning(
+                "Post-call job %s (%s) for call %s attempt %s/%s failed, retrying in %ss: %s",
+                job.id, job.kind, job.call_id, job.attempts, policy.max_attempts, delay, e,
+            )
+            PostCallJob.objects.filter(id=job.id).update(
+                status="pending",
+                locked_by=None,
+                locked_at=None,
+                last_error=str(e),
+                next_attempt_at=timezone.now() + timedelta(seconds=delay),
+            )
+            return False
+        logger.error(
+            "Post-call job %s (%s) for call %s failed after %s attempts: %s",
+            job.id, job.kind, job.call_id, job.attempts, e,
+        )
+        return _finish(job, "failed", str(e))
+
+    _finish(job, "succeeded")
+    return True
+
+
+def _finish(job, status, error=None):
+    PostCallJob.objects.filter(id=job.id).update(
+        status=status,
+        locked_by=None,
+        locked_at=None,
+        last_error=error,
+        finished_at=timezone.now(),
+    )
+    return status == "succeeded"
+
+
+def release_stale_jobs(stale_after_seconds=900):
+    """Return jobs held by a crashed worker to the pending state"""
+    cutoff = timezone.now() - timedelta(seconds=stale_after_seconds)
+    return PostCallJob.objects.filter(status="running", locked_at__lt=cutoff).update(
+        status="pending", locked_by=None, locked_at=None
+    )
+
+
+def job_depths():
+    """Pending and running job counts per kind"""
+    rows = (
+        PostCallJob.objects.filter(status__in=["pending", "running"])
+        .values("kind", "status")
+        .annotate(count=Count("id"))
+    )
+    depths = {kind: {"pending": 0, "running": 0} for kind in JOB_HANDLERS}
+    for row in rows:
+        depths.setdefault(row["kind"], {"pending": 0, "running": 0})[row["status"]] = row["count"]
+    return depths
+
+
+metrics.register_collector("post_call_job_depth", job_depths)
@@ -0,0 +1,294 @@
+"""
+Circuit breakers and bulkheads for outbound provider calls (Vapi, Twilio,
+OpenAI).
+
+Each provider gets its own breaker and bulkhead, so trouble with one of
+them only affects the code paths that use it:
+
+- The bulkhead caps concurrent calls to the provider per process. A caller
+  waits at most max_wait seconds for a slot and is then rejected, instead
+  of tying up another worker behind a slow upstream.
+- The breaker tracks the outcome of the last `window` calls. Errors and
+  calls slower than slow_call_seconds count as failures. Once at least
+  min_calls are recorded and the failure rate reaches failure_rate, it
+  opens and rejects calls for open_seconds. It then goes half-open and
+  lets half_open_calls trial calls through. A successful trial closes it;
+  a failed one opens it again.
+
+Rejected calls raise ProviderUnavailable, which views turn into 503s.
+Client errors, rate limits (429) included, mean the provider is healthy and
+do not count as failures: a rate limit applies to one account, while the
+breaker is shared by every account using the provider. Limits come from
+PROVIDER_RESILIENCE; state is exposed through the "providers" metrics
+collector.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+from django.conf import settings
+
+from api.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ProviderUnavailable(Exception):
+    """A provider call was rejected by its circuit breaker or bulkhead"""
+
+    def __init__(self, provider, reason, retry_after=None):
+        self.provider = provider
+        self.reason = reason
+        self.retry_after = retry_after
+        if reason == "circuit_open":
+            message = f"{provider} is unavailable (circuit open)"
+        else:
+            message = f"{provider} is at capacity ({reason.replace('_', ' ')})"
+        super().__init__(message)
+
+
+def is_provider_failure(exc):
+    """Whether an exception says something about the provider's health"""
+    status_code = getattr(exc, "status_code", None) or getattr(exc, "status", None)
+    if isinstance(status_code, int) and 400 <= status_code < 500:
+        return False
+    return True
+
+
+class CircuitBreaker:
+    def __init__(self, name, failure_rate=0.5, min_calls=10, window=20, open_seconds=30,
+                 half_open_calls=1, slow_call_seconds=None):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        self.slow_call_seconds = slow_call_seconds
+        self._outcomes = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = None
+        self._trials = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self):
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._trials = 0
+            logger.info("Circuit breaker %s half-open", self.name)
+        return self._state
+
+    def retry_after(self):
+        with self._lock:
+            if self._state != OPEN:
+                return 0
+            return max(0, self.open_seconds - (time.monotonic() - self._opened_at))
+
+    def allow(self):
+        """Reserve permission for one call; False while open or out of trial calls"""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._trials < self.half_open_calls:
+                self._trials += 1
+                return True
+            return False
+
+    def cancel(self):
+        """Give back a call reserved by allow() that never ran"""
+        with self._lock:
+            if self._state == HALF_OPEN and self._trials:
+                self._trials -= 1
+
+    def record(self, success, duration=None):
+        if success and self.slow_call_seconds and duration is not None and duration > self.slow_call_seconds:
+            success = False
+        with self._lock:
+            state = self._current_state()
+            if state == HALF_OPEN:
+                if success:
+                    self._close()
+                else:
+                    self._open()
+                return
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if (state == CLOSED and len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.failure_rate):
+                self._open()
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._trials = 0
+        metrics.increment("provider_breaker_opened", provider=self.name)
+        logger.warning("Circuit breaker %s opened for %ss", self.name, self.open_seconds)
+
+    def _close(self):
+        self._state = CLOSED
+        self._outcomes.clear()
+        self._trials = 0
+        logger.info("Circuit breaker %s closed", self.name)
+
+    def snapshot(self):
+        with self._lock:
+            outcomes = list(self._outcomes)
+            return {
+                "state": self._current_state(),
+                "recent_calls": len(outcomes),
+                "failure_rate": round(outcomes.count(False) / len(outcomes), 3) if outcomes else 0.0,
+            }
+
+
+class Bulkhead:
+    def __init__(self, name, max_concurrent, max_wait=0.5):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_wait = max_wait
+        self._semaphore = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+
+    def acquire(self):
+        if not self._semaphore.acquire(timeout=self.max_wait):
+            return False
+        with self._lock:
+            self.in_flight += 1
+        return True
+
+    async def acquire_async(self):
+        """Like acquire(), polling so the event loop is never blocked"""
+        deadline = time.monotonic() + self.max_wait
+        while not self._semaphore.acquire(blocking=False):
+            if time.monotonic() >= deadline:
+                return False
+            await asyncio.sleep(0.01)
+        with self._lock:
+            self.in_flight += 1
+        return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._semaphore.release()
+
+
+class ProviderCall:
+    """Handle yielded by Provider.guard() for reporting a failed response"""
+
+    __slots__ = ("failed",)
+
+    def __init__(self):
+        self.failed = False
+
+
+class Provider:
+    def __init__(self, name, max_concurrent=10, max_wait=0.5, **breaker_options):
+        self.name = name
+        self.breaker = CircuitBreaker(name, **breaker_options)
+        self.bulkhead = Bulkhead(name, max_concurrent, max_wait)
+
+    def _admit(self):
+        if not self.breaker.allow():
+            metrics.increment("provider_rejected", provider=self.name, reason="circuit_open")
+            raise ProviderUnavailable(self.name, "circuit_open", round(self.breaker.retry_after()))
+
+    def _reject_full(self):
+        self.breaker.cancel()
+        metrics.increment("provider_rejected", provider=self.name, reason="bulkhead_full")
+        raise ProviderUnavailable(self.name, "bulkhead_full", 1)
+
+    def _record(self, exc, started, call):
+        duration = time.monotonic() - started
+        success = not call.failed and (exc is None or not is_provider_failure(exc))
+        self.breaker.record(success, duration)
+        metrics.increment("provider_calls", provider=self.name, outcome="success" if success else "failure")
+
+    @contextmanager
+    def guard(self):
+        """
+        Run one provider call under the breaker and bulkhead. Exceptions are
+        recorded as failures; a call that returns an error response instead
+        of raising reports it with `call.failed = True`.
+        """
+        self._admit()
+        if not self.bulkhead.acquire():
+            self._reject_full()
+        started = time.monotonic()
+        call = ProviderCall()
+        try:
+            yield call
+        except Exception as e:
+            self._record(e, started, call)
+            raise
+        except BaseException:
+            # Interrupted (e.g. cancelled), says nothing about the provider
+            self.breaker.cancel()
+            raise
+        else:
+            self._record(None, started, call)
+        finally:
+            self.bulkhead.release()
+
+    @asynccontextmanager
+    async def guard_async(self):
+        self._admit()
+        if not await self.bulkhead.acquire_async():
+            self._reject_full()
+        started = time.monotonic()
+        call = ProviderCall()
+        try:
+            yield call
+        except Exception as e:
+            self._record(e, started, call)
+            raise
+        except BaseException:
+            # Interrupted (e.g. cancelled), says nothing about the provider
+            self.breaker.cancel()
+            raise
+        else:
+            self._record(None, started, call)
+        finally:
+            self.bulkhead.release()
+
+    def snapshot(self):
+        return {
+            **self.breaker.snapshot(),
+            "in_flight": self.bulkhead.in_flight,
+            "max_concurrent": self.bulkhead.max_concurrent,
+        }
+
+
+_providers = {}
+_providers_lock = threading.Lock()
+
+
+def provider(name):
+    """The shared Provider for a name, configured from PROVIDER_RESILIENCE"""
+    with _providers_lock:
+        if name not in _providers:
+            options = {**settings.PROVIDER_RESILIENCE_DEFAULTS, **settings.PROVIDER_RESILIENCE.get(name, {})}
+            _providers[name] = Provider(name, **options)
+        return _providers[name]
+
+
+def provider_states():
+    with _providers_lock:
+        providers = dict(_providers)
+    return {name: p.snapshot() for name, p in sorted(providers.items())}
+
+
+metrics.register_collector("providers", provider_states)
@@ -0,0 +1,288 @@
+"""
+Bulk import of scheduled calls from CSV or NDJSON uploads.
+
+ScheduleCallView creates one ScheduledCall per request and looks up the
+assistant and phone number every time, so a 50k-row candidate list means
+50k requests. An import resolves the assistant and phone number once and
+reads the upload as a stream of rows, so the file is never held in memory.
+Rows are validated in batches of SCHEDULE_IMPORT_BATCH_SIZE and the valid
+ones are inserted with bulk_create(), all in one transaction: an import
+that fails part way leaves nothing behind.
+
+Rows carry customer_number and scheduled_time, and optionally timezone,
+call_name and notes. A naive scheduled_time is read in the row's timezone,
+else the import's default timezone, else TIME_ZONE. Invalid rows are
+skipped and reported by row number. The report lists at most
+SCHEDULE_IMPORT_MAX_ERRORS of them.
+
+bulk_create() does not call save() or send post_save, so next_attempt_at
+is set here and the scheduler daemon is woken once for the whole import.
+"""
+
+import codecs
+import csv
+import json
+import logging
+import re
+import time
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from api.metrics import metrics
+from api.models import ScheduledCall
+from api.scheduler import notify_schedule_changed
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_FIELDS = ("customer_number", "scheduled_time")
+
+# Separators people type in phone numbers; what is left must be E.164
+NUMBER_SEPARATORS = re.compile(r"[\s().\-]")
+E164_NUMBER = re.compile(r"\+[1-9]\d{6,14}")
+
+FORMAT_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/csv": "csv",
+    "application/x-ndjson": "ndjson",
+    "application/ndjson": "ndjson",
+    "application/jsonl": "ndjson",
+    "application/json-lines": "ndjson",
+}
+FORMAT_EXTENSIONS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+
+class ScheduleImportError(Exception):
+    """The upload as a whole cannot be imported (bad format, too many rows)"""
+
+
+def detect_format(file_format=None, file_name=None, content_type=None):
+    """"csv" or "ndjson" from an explicit format, the file name or the content type"""
+    if file_format:
+        file_format = file_format.lower()
+        if file_format in ("csv", "ndjson", "jsonl"):
+            return "ndjson" if file_format == "jsonl" else file_format
+        raise ScheduleImportError(f"Unsupported file format: {file_format}")
+    if file_name:
+        for extension, detected in FORMAT_EXTENSIONS.items():
+            if file_name.lower().endswith(extension):
+                return detected
+    if content_type:
+        detected = FORMAT_CONTENT_TYPES.get(content_type.split(";")[0].strip().lower())
+        if detected:
+            return detected
+    raise ScheduleImportError("Could not tell the file format; upload a .csv or .ndjson file or pass file_format")
+
+
+def iter_csv_rows(lines):
+    """
+    (line number, row dict) for each data row of a CSV read from an iterable
+    of byte lines. The header is line 1, as in a spreadsheet.
+    """
+    reader = csv.reader(codecs.iterdecode(lines, "utf-8-sig"))
+    try:
+        header = next(reader, None)
+        if header is None:
+            raise ScheduleImportError("The file is empty")
+        columns = [name.strip().lower() for name in header]
+        missing = [name for name in REQUIRED_FIELDS if name not in columns]
+        if missing:
+            raise ScheduleImportError(f"Missing required columns: {', '.join(missing)}")
+        for values in reader:
+            if not any(value.strip() for value in values):
+                continue
+            yield reader.line_num, dict(zip(columns, values))
+    except UnicodeDecodeError:
+        raise ScheduleImportError("The file is not valid UTF-8")
+    except csv.Error as e:
+        raise ScheduleImportError(f"Malformed CSV at line {reader.line_num}: {str(e)}")
+
+
+def iter_ndjson_rows(lines):
+    """(line number, row dict) for each line of an NDJSON upload; unparseable lines come back as error strings"""
+    try:
+        for line_number, line in enumerate(codecs.iterdecode(lines, "utf-8-sig"), start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield line_number, "Invalid JSON"
+                continue
+            if not isinstance(row, dict):
+                yield line_number, "Each line must be a JSON object"
+                continue
+            yield line_number, row
+    except UnicodeDecodeError:
+        raise ScheduleImportError("The file is not valid UTF-8")
+
+
+@lru_cache(maxsize=256)
+def zone_for_name(name):
+    """ZoneInfo for an IANA timezone name, or None if it is unknown"""
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return None
+
+
+def _text(row, field):
+    value = row.get(field)
+    if value is None:
+        return ""
+    return str(value).strip()
+
+
+class ScheduleImporter:
+    """
+    Validates and inserts the rows of one import. Column values repeat a lot
+    in candidate lists (a handful of slots and timezones), so each distinct
+    scheduled_time / timezone pair is parsed once per import.
+    """
+
+    def __init__(self, user, assistant, phone_number, default_timezone="", dry_run=False):
+        self.user = user
+        self.assistant = assistant
+        self.phone_number = phone_number
+        self.campaign = assistant.campaign or phone_number.campaign
+        self.default_timezone = default_timezone or ""
+        self.dry_run = dry_run
+        self.batch_size = settings.SCHEDULE_IMPORT_BATCH_SIZE
+        self.max_rows = settings.SCHEDULE_IMPORT_MAX_ROWS
+        self.max_errors = settings.SCHEDULE_IMPORT_MAX_ERRORS
+        self.now = timezone.now()
+        self._times = {}
+        self.rows = 0
+        self.valid = 0
+        self.created = 0
+        self.invalid = 0
+        self.errors = []
+
+    def _scheduled_time(self, value, zone_name):
+        key = (value, zone_name)
+        if key not in self._times:
+            self._times[key] = self._parse_time(value, zone_name)
+        return self._times[key]
+
+    def _parse_time(self, value, zone_name):
+        """(aware datetime, None) or (None, error message)"""
+        try:
+            parsed = parse_datetime(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            return None, "Enter a valid ISO 8601 date and time."
+        if timezone.is_naive(parsed):
+            zone = zone_for_name(zone_name) if zone_name else timezone.get_current_timezone()
+            parsed = timezone.make_aware(parsed, zone)
+        if parsed <= self.now:
+            return None, "Scheduled time must be in the future."
+        return parsed, None
+
+    def validate(self, batch):
+        """ScheduledCall instances for the valid rows of a batch of (row number, row) pairs"""
+        valid = []
+        for row_number, row in batch:
+            if isinstance(row, str):
+                self._reject(row_number, {"row": row})
+                continue
+
+            errors = {}
+            customer_number = NUMBER_SEPARATORS.sub("", _text(row, "customer_number"))
+            if not customer_number:
+                errors["customer_number"] = "This field is required."
+            elif not E164_NUMBER.fullmatch(customer_number):
+                errors["customer_number"] = "Enter the number in E.164 format, e.g. +14155550123."
+
+            zone_name = _text(row, "timezone") or self.default_timezone
+            if zone_name and (len(zone_name) > 50 or zone_for_name(zone_name) is None):
+                errors["timezone"] = f"Unknown timezone: {zone_name}"
+                zone_name = ""
+
+            scheduled_time = None
+            raw_time = _text(row, "scheduled_time")
+            if not raw_time:
+                errors["scheduled_time"] = "This field is required."
+            elif "timezone" not in errors:
+                scheduled_time, error = self._scheduled_time(raw_time, zone_name)
+                if error:
+                    errors["scheduled_time"] = error
+
+            call_name = _text(row, "call_name")
+            if len(call_name) > 255:
+                errors["call_name"] = "Ensure this field has no more than 255 characters."
+
+            if errors:
+                self._reject(row_number, errors)
+                continue
+
+            valid.append(ScheduledCall(
+                # Ids rather than instances: setting related objects costs
+                # more than the rest of the row put together
+                user_id=self.user.id,
+                campaign_id=self.campaign.id if self.campaign else None,
+                assistant_id=self.assistant.id,
+                phone_number_id=self.phone_number.id,
+                customer_number=customer_number,
+                scheduled_time=scheduled_time,
+                next_attempt_at=scheduled_time,
+                timezone=zone_name,
+                call_name=call_name,
+                notes=_text(row, "notes"),
+                status="scheduled",
+            ))
+        return valid
+
+    def _reject(self, row_number, errors):
+        self.invalid += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row_number, "errors": errors})
+
+    def _insert(self, batch):
+        calls = self.validate(batch)
+        self.valid += len(calls)
+        if calls and not self.dry_run:
+            ScheduledCall.objects.bulk_create(calls, batch_size=self.batch_size)
+            self.created += len(calls)
+
+    def run(self, rows):
+        """Import an iterable of (row number, row) pairs and return the report"""
+        started = time.monotonic()
+        with transaction.atomic():
+            batch = []
+            for row_number, row in rows:
+                self.rows += 1
+                if self.max_rows and self.rows > self.max_rows:
+                    raise ScheduleImportError(f"Imports are limited to {self.max_rows} rows")
+                batch.append((row_number, row))
+                if len(batch) >= self.batch_size:
+                    self._insert(batch)
+                    batch = []
+            if batch:
+                self._insert(batch)
+            if self.created and not self.dry_run:
+                notify_schedule_changed()
+        elapsed = time.monotonic() - started
+
+        if not self.dry_run:
+            metrics.increment("scheduled_calls_imported", self.created)
+        logger.info(
+            "Imported %s of %s scheduled calls for user %s in %.2fs (%s invalid%s)",
+            self.created, self.rows, self.user.id, elapsed, self.invalid, ", dry run" if self.dry_run else "",
+        )
+        return {
+            "dry_run": self.dry_run,
+            "rows": self.rows,
+            "valid": self.valid,
+            "created": self.created,
+            "invalid": self.invalid,
+            "errors": self.errors,
+            "errors_truncated": self.invalid > len(self.errors),
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(self.rows / elapsed, 1) if elapsed > 0 else None,
+        }
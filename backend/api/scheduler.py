@@ -0,0 +1,222 @@
+"""
+Support code for the scheduler daemon (`python manage.py run_scheduler`).
+
+The daemon keeps every ScheduledCall with status "scheduled" in a heap
+ordered by next_attempt_at (scheduled_time until a retry moves it) and
+sleeps until the earliest one is due, instead of polling the table on a
+fixed interval. It learns about new, moved and cancelled schedules in two
+ways:
+
+- On PostgreSQL, saving or deleting a ScheduledCall sends a NOTIFY on
+  SCHEDULER_NOTIFY_CHANNEL after the transaction commits, and the daemon
+  LISTENs on it, so it wakes within milliseconds.
+- Every SCHEDULER_RESYNC_SECONDS it also re-reads rows whose updated_at
+  moved past the last one it saw. This is the only mechanism on SQLite and
+  a safety net for notifications lost while the daemon was reconnecting.
+
+Code that changes schedules without save() (bulk_create, update()) should
+call notify_schedule_changed() itself and set updated_at.
+
+Dispatch lag (claim time minus next_attempt_at) is recorded per call and
+exposed through the "scheduler" metrics collector.
+"""
+
+import heapq
+import logging
+import select
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api.metrics import metrics
+from api.models import ScheduledCall
+
+logger = logging.getLogger(__name__)
+
+# Status changes written by the executors themselves; the daemon already
+# dropped these calls from its heap when it dispatched them
+EXECUTION_STATUSES = ("in_progress", "completed", "failed")
+
+
+def notify_schedule_changed(scheduled_call_id=None):
+    """
+    Wake the scheduler daemon after the current transaction commits. Without
+    an id the daemon re-reads everything that changed since its last sync.
+    """
+    if connection.vendor != "postgresql":
+        return
+    payload = str(scheduled_call_id or "")
+
+    def send():
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_notify(%s, %s)", [settings.SCHEDULER_NOTIFY_CHANNEL, payload])
+        except Exception as e:
+            logger.warning("Could not notify the scheduler: %s", e)
+
+    transaction.on_commit(send)
+
+
+@receiver(post_save, sender=ScheduledCall)
+def scheduled_call_saved(sender, instance, created, **kwargs):
+    if created or instance.status not in EXECUTION_STATUSES:
+        notify_schedule_changed(instance.id)
+
+
+@receiver(post_delete, sender=ScheduledCall)
+def scheduled_call_deleted(sender, instance, **kwargs):
+    notify_schedule_changed(instance.id)
+
+
+class DispatchQueue:
+    """
+    Min-heap of (due_at, id). Moving or removing an entry only updates the
+    id -> time map; stale heap entries are skipped when they reach the top.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._times = {}
+
+    def __len__(self):
+        return len(self._times)
+
+    def schedule(self, scheduled_call_id, due_at):
+        if self._times.get(scheduled_call_id) == due_at:
+            return
+        self._times[scheduled_call_id] = due_at
+        heapq.heappush(self._heap, (due_at, scheduled_call_id))
+
+    def discard(self, scheduled_call_id):
+        self._times.pop(scheduled_call_id, None)
+
+    def clear(self):
+        self._heap = []
+        self._times = {}
+
+    def _drop_stale(self):
+        while self._heap and self._times.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def next_due(self):
+        """due_at of the earliest entry, or None"""
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now):
+        """Remove and return (id, due_at) for every entry due at `now`"""
+        due = []
+        while True:
+            self._drop_stale()
+            if not self._heap or self._heap[0][0] > now:
+                return due
+            due_at, scheduled_call_id = heapq.heappop(self._heap)
+            del self._times[scheduled_call_id]
+            due.append((scheduled_call_id, due_at))
+
+
+class ScheduleListener:
+    """
+    Waits for schedule change notifications. wait() returns the notified
+    ScheduledCall ids, with None in the set when a full resync was asked
+    for, or an empty set on timeout.
+
+    LISTEN/NOTIFY is used on PostgreSQL with psycopg2; anywhere else wait()
+    just sleeps, interruptible through wake().
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._listening_on = None
+
+    @property
+    def listening(self):
+        return self._listening_on is not None
+
+    def _raw_connection(self):
+        if connection.vendor != "postgresql":
+            return None
+        connection.ensure_connection()
+        raw = connection.connection
+        if not (hasattr(raw, "poll") and hasattr(raw, "notifies")):
+            return None
+        if self._listening_on is not raw:
+            with connection.cursor() as cursor:
+                cursor.execute(f'LISTEN "{settings.SCHEDULER_NOTIFY_CHANNEL}"')
+            self._listening_on = raw
+            logger.info("Listening for schedule changes on %s", settings.SCHEDULER_NOTIFY_CHANNEL)
+        return raw
+
+    def wake(self):
+        self._event.set()
+
+    def wait(self, timeout):
+        try:
+            raw = self._raw_connection()
+        except Exception as e:
+            logger.warning("Could not LISTEN for schedule changes: %s", e)
+            self._listening_on = None
+            raw = None
+
+        if raw is None:
+            woken = self._event.wait(timeout)
+            self._event.clear()
+            return {None} if woken else set()
+
+        try:
+            raw.poll()
+            if not raw.notifies and not self._event.is_set():
+                select.select([raw], [], [], timeout)
+                raw.poll()
+        except Exception as e:
+            # Connection lost: listen again on the next call and resync,
+            # since notifications may have been missed meanwhile
+            logger.warning("Lost the schedule change listener: %s", e)
+            self._listening_on = None
+            connection.close()
+            return {None}
+
+        changed = set()
+        if self._event.is_set():
+            self._event.clear()
+            changed.add(None)
+        while raw.notifies:
+            payload = raw.notifies.pop(0).payload
+            changed.add(int(payload) if payload.isdigit() else None)
+        return changed
+
+
+class DispatchLag:
+    """Recent dispatch lags in seconds, for the "scheduler" metrics collector"""
+
+    def __init__(self, size=1000):
+        self._lags = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.next_due_in = None
+
+    def record(self, lag):
+        with self._lock:
+            self._lags.append(lag)
+        metrics.set_gauge("scheduler_dispatch_lag_seconds", round(lag, 3))
+
+    def snapshot(self):
+        with self._lock:
+            lags = sorted(self._lags)
+        data = {"queued": self.queued, "next_due_in": self.next_due_in, "recent_dispatches": len(lags)}
+        if lags:
+            data.update(
+                lag_p50=round(lags[len(lags) // 2], 3),
+                lag_p95=round(lags[min(len(lags) - 1, int(len(lags) * 0.95))], 3),
+                lag_max=round(lags[-1], 3),
+            )
+        return data
+
+
+dispatch_lag = DispatchLag()
+
+metrics.register_collector("scheduler", dispatch_lag.snapshot)
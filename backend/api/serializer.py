@@ -195,6 +195,16 @@ class InterviewCallSerializer(serializers.ModelSerializer):
             return obj.recording_file.url
         return None
 
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Live calls keep their transcript in TranscriptSegments until the call
+        # ends; build the current view of it on read
+        if instance.is_live:
+            rebuilt = instance.transcript_from_segments()
+            if rebuilt is not None:
+                data["transcript"], data["transcript_text"] = rebuilt
+        return data
+
     class Meta:
         model = InterviewCall
         fields = [
@@ -268,6 +278,7 @@ class ScheduledCallSerializer(serializers.ModelSerializer):
             "phone_number_display",
             "customer_number",
             "scheduled_time",
+            "next_attempt_at",
             "timezone",
             "status",
             "call_name",
@@ -285,6 +296,7 @@ class ScheduledCallSerializer(serializers.ModelSerializer):
         read_only_fields = [
             "id",
             "actual_call",
+            "next_attempt_at",
             "execution_attempts",
             "last_attempt_at",
             "error_message",
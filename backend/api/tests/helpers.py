@@ -0,0 +1,46 @@
+"""Fixtures shared by the api test modules"""
+
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from api.models import APIConfiguration, InterviewAssistant, InterviewCall, PhoneNumber, ScheduledCall
+
+
+def create_account(username="tester", vapi_api_key="test-key"):
+    """A user with a Vapi key, an assistant and a phone number"""
+    user = User.objects.create_user(username, password="x")
+    APIConfiguration.objects.create(user=user, vapi_api_key=vapi_api_key)
+    assistant = InterviewAssistant.objects.create(
+        user=user, name="Assistant", vapi_assistant_id=f"asst-{username}", first_message="Hi"
+    )
+    phone_number = PhoneNumber.objects.create(
+        user=user, vapi_phone_number_id=f"ph-{username}", phone_number="+14155550100"
+    )
+    return user, assistant, phone_number
+
+
+def create_call(user, assistant, phone_number, vapi_call_id="call-1", **fields):
+    return InterviewCall.objects.create(
+        user=user,
+        assistant=assistant,
+        phone_number=phone_number,
+        customer_number=fields.pop("customer_number", "+14155550199"),
+        vapi_call_id=vapi_call_id,
+        **fields,
+    )
+
+
+def create_due_calls(user, assistant, phone_number, count):
+    return [
+        ScheduledCall.objects.create(
+            user=user,
+            assistant=assistant,
+            phone_number=phone_number,
+            customer_number=f"+1415555{i:04d}",
+            scheduled_time=timezone.now() - timedelta(seconds=1),
+            status="scheduled",
+        )
+        for i in range(count)
+    ]
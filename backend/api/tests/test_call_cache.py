@@ -0,0 +1,83 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase
+
+from api.call_cache import CallRoute, CallRouteCache
+from api.tests.helpers import create_account, create_call
+from api.views import WebhookProcessingError, process_call_event, resolve_webhook_call
+
+
+class CallRouteCacheTests(SimpleTestCase):
+    route = CallRoute(1, "asst-1", "ph-1", 7)
+
+    def test_route_matches_the_ownership_fingerprint(self):
+        self.assertTrue(self.route.matches({"assistantId": "asst-1", "phoneNumberId": "ph-1"}))
+        self.assertTrue(self.route.matches({"assistantId": "asst-1"}))
+        self.assertFalse(self.route.matches({"assistantId": "asst-2", "phoneNumberId": "ph-1"}))
+        self.assertFalse(self.route.matches({"assistantId": "asst-1", "phoneNumberId": "ph-2"}))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        routes = CallRouteCache(max_entries=2)
+        routes.put("call-1", self.route)
+        routes.put("call-2", self.route)
+        routes.get("call-1")
+
+        routes.put("call-3", self.route)
+
+        self.assertIsNone(routes.get("call-2"))
+        self.assertEqual(routes.get("call-1"), self.route)
+
+    def test_shared_entries_are_seen_by_other_processes(self):
+        self.addCleanup(cache.clear)
+        CallRouteCache(shared=True).put("call-1", self.route)
+
+        other = CallRouteCache(shared=True)
+        self.assertEqual(other.get("call-1"), self.route)
+
+        other.invalidate("call-1")
+        self.assertIsNone(CallRouteCache(shared=True).get("call-1"))
+
+
+class ResolveWebhookCallTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch("api.views.call_route_cache", CallRouteCache())
+        self.routes = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user, self.assistant, self.phone_number = create_account("routing")
+        self.call = create_call(self.user, self.assistant, self.phone_number, status="in-progress")
+        self.call_data = {"id": "call-1", "assistantId": "asst-routing", "phoneNumberId": "ph-routing"}
+
+    def test_later_events_use_the_cached_route(self):
+        resolve_webhook_call("call-1", self.call_data)
+
+        # Primary-key lookup only, no join and no ownership checks
+        with self.assertNumQueries(1):
+            call = resolve_webhook_call("call-1", self.call_data)
+
+        self.assertEqual(call.pk, self.call.pk)
+
+    def test_mismatched_payload_gets_the_full_check(self):
+        resolve_webhook_call("call-1", self.call_data)
+
+        with self.assertRaises(WebhookProcessingError) as raised:
+            resolve_webhook_call("call-1", dict(self.call_data, assistantId="asst-someone-else"))
+
+        self.assertEqual(raised.exception.status_code, 401)
+
+    def test_stale_route_falls_back_to_the_full_lookup(self):
+        resolve_webhook_call("call-1", self.call_data)
+        self.call.delete()
+
+        # Recreated as an inbound call on the user's phone number
+        call = resolve_webhook_call("call-1", self.call_data)
+
+        self.assertNotEqual(call.pk, self.call.pk)
+        self.assertEqual(self.routes.get("call-1").call_id, call.pk)
+
+    def test_route_is_dropped_when_the_call_ends(self):
+        resolve_webhook_call("call-1", self.call_data)
+
+        process_call_event("status-update", {"type": "status-update", "status": "ended", "call": self.call_data})
+
+        self.assertIsNone(self.routes.get("call-1"))
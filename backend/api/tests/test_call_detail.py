@@ -0,0 +1,59 @@
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from api.tests.helpers import create_account, create_call
+from api.views import CallDetailView
+
+
+@override_settings(CALL_DETAIL_LOCAL_FIRST=True)
+class SettledCallTests(TestCase):
+    def setUp(self):
+        self.user, self.assistant, self.phone_number = create_account("details")
+        self.view = CallDetailView()
+
+    def call(self, **fields):
+        fields.setdefault("raw_call_data", {"id": "call-1", "status": fields.get("status")})
+        return create_call(self.user, self.assistant, self.phone_number, **fields)
+
+    def cached_response(self, user=None):
+        with mock.patch("api.views.call_detail_cache.get", return_value=(None, False)):
+            return self.view.cached_response(user or self.user, "call-1", "test-key")
+
+    def test_reported_call_is_answered_from_the_database_in_one_query(self):
+        self.call(status="ended", end_reason="customer-ended-call", cost="0.1200", transcript_text="user: Hi")
+
+        with self.assertNumQueries(1):
+            body = self.cached_response()
+
+        self.assertEqual(body["call_db"]["end_reason"], "customer-ended-call")
+        self.assertEqual(body["call_db"]["assistant_name"], "Assistant")
+
+    def test_unanswered_call_without_cost_or_transcript_is_settled(self):
+        self.call(status="ended", end_reason="customer-did-not-answer")
+
+        self.assertIsNotNone(self.cached_response())
+
+    def test_ended_call_still_waiting_for_its_report_goes_to_vapi(self):
+        # A status-update has ended it; the end-of-call report has not arrived
+        self.call(status="ended")
+
+        self.assertIsNone(self.cached_response())
+
+    def test_failed_call_is_settled(self):
+        self.call(status="failed")
+
+        self.assertIsNotNone(self.cached_response())
+
+    def test_live_call_goes_to_vapi(self):
+        self.call(status="in-progress")
+
+        self.assertIsNone(self.cached_response())
+
+    def test_another_users_call_is_not_served(self):
+        self.call(status="ended", end_reason="customer-ended-call")
+        other_user, _, _ = create_account("someone-else")
+
+        body = self.cached_response(other_user)
+
+        self.assertIsNone(body)
@@ -0,0 +1,49 @@
+from django.test import TestCase
+
+from api.models import InterviewCall
+from api.tests.helpers import create_account, create_call
+from api.views import handle_status_update
+
+
+def status_update(status, **call_fields):
+    return {"type": "status-update", "status": status, "call": {"id": "call-1", **call_fields}}
+
+
+class StatusUpdateOrderTests(TestCase):
+    def setUp(self):
+        self.user, self.assistant, self.phone_number = create_account("statuses")
+        self.call = create_call(self.user, self.assistant, self.phone_number, status="queued")
+
+    def stored(self):
+        return InterviewCall.objects.get(id=self.call.id)
+
+    def test_status_moves_forwards(self):
+        handle_status_update(self.call, status_update("in-progress", startedAt="2026-01-05T10:00:00Z"))
+
+        call = self.stored()
+        self.assertEqual(call.status, "in-progress")
+        self.assertEqual(call.started_at.isoformat(), "2026-01-05T10:00:00+00:00")
+
+    def test_late_in_progress_after_ended_is_ignored(self):
+        # Read by another worker before the call ended
+        stale = self.stored()
+        handle_status_update(self.call, status_update("ended", endedAt="2026-01-05T10:05:00Z"))
+        late = status_update("in-progress", startedAt="2026-01-05T10:00:00Z")
+
+        handle_status_update(self.call, late)
+        handle_status_update(stale, late)
+
+        call = self.stored()
+        self.assertEqual(call.status, "ended")
+        self.assertIsNone(call.started_at)
+        self.assertEqual(call.raw_call_data["endedAt"], "2026-01-05T10:05:00Z")
+
+    def test_stale_instance_is_reloaded_when_its_update_loses(self):
+        stale = self.stored()
+        InterviewCall.objects.filter(id=self.call.id).update(status="ended")
+
+        handle_status_update(stale, status_update("in-progress"))
+
+        self.assertEqual(stale.status, "ended")
+        self.assertFalse(stale.is_live)
+
@@ -0,0 +1,129 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from api.models import ConcurrentUpdateError, InterviewCall
+from api.tests.helpers import create_account, create_call
+
+
+class ChangeTrackingSaveTests(TestCase):
+    def setUp(self):
+        self.user, self.assistant, self.phone_number = create_account("tracking")
+        self.call = create_call(self.user, self.assistant, self.phone_number, status="in-progress")
+
+    def load(self, **kwargs):
+        return InterviewCall.objects.get(id=self.call.id, **kwargs)
+
+    def other_writer(self, **fields):
+        """Save from a separately loaded instance, as another worker would"""
+        other = self.load()
+        for name, value in fields.items():
+            setattr(other, name, value)
+        other.save()
+
+    def test_only_changed_fields_are_written(self):
+        call = self.load()
+        call.cost = Decimal("0.5000")
+
+        with CaptureQueriesContext(connection) as queries:
+            call.save()
+
+        updates = [query["sql"] for query in queries if query["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+        sql = updates[0]
+        self.assertIn('"cost"', sql)
+        self.assertIn('"version"', sql)
+        self.assertNotIn('"status"', sql)
+        self.assertNotIn('"raw_call_data"', sql)
+
+    def test_unchanged_instance_is_not_written(self):
+        call = self.load()
+        call.raw_call_data = dict(call.raw_call_data)
+
+        with self.assertNumQueries(0):
+            call.save()
+
+    def test_nested_json_change_is_detected(self):
+        InterviewCall.objects.filter(id=self.call.id).update(raw_call_data={"analysis": {"summary": "old"}})
+        call = self.load()
+
+        call.raw_call_data["analysis"]["summary"] = "new"
+
+        self.assertEqual(call.dirty_fields(), ["raw_call_data"])
+
+    def test_conflicting_save_keeps_the_other_writers_fields(self):
+        call = self.load()
+        self.other_writer(end_reason="customer-ended-call")
+        call.cost = Decimal("0.5000")
+
+        call.save()
+
+        stored = self.load()
+        self.assertEqual(stored.cost, Decimal("0.5000"))
+        self.assertEqual(stored.end_reason, "customer-ended-call")
+        self.assertEqual(stored.version, 2)
+        self.assertEqual(call.version, 2)
+
+    def test_merge_does_not_move_status_backwards(self):
+        call = self.load()
+        self.other_writer(status="ended")
+        call.status = "forwarding"
+        call.cost = Decimal("0.5000")
+
+        call.save()
+
+        stored = self.load()
+        self.assertEqual(stored.status, "ended")
+        self.assertEqual(stored.cost, Decimal("0.5000"))
+
+    def test_merge_can_drop_the_save(self):
+        call = self.load()
+        self.other_writer(status="ended")
+        call.status = "forwarding"
+
+        call.save()
+
+        self.assertEqual(self.load().status, "ended")
+        self.assertEqual(call.status, "ended")
+        self.assertEqual(call.dirty_fields(), [])
+
+    def test_merge_hook_can_reject_the_save(self):
+        call = self.load()
+        self.other_writer(end_reason="customer-ended-call")
+        call.cost = Decimal("0.5000")
+
+        with mock.patch.object(InterviewCall, "merge_changes", side_effect=ConcurrentUpdateError("rejected")):
+            with self.assertRaises(ConcurrentUpdateError):
+                call.save()
+
+        self.assertIsNone(self.load().cost)
+
+    def test_gives_up_when_the_row_keeps_changing(self):
+        call = self.load()
+        call.cost = Decimal("0.5000")
+        refresh_from_db = InterviewCall.refresh_from_db
+
+        def refresh_and_lose_again(instance, *args, **kwargs):
+            refresh_from_db(instance, *args, **kwargs)
+            InterviewCall.objects.filter(id=instance.id).update(version=instance.version + 1)
+
+        InterviewCall.objects.filter(id=call.id).update(version=5)
+        with mock.patch.object(InterviewCall, "refresh_from_db", refresh_and_lose_again):
+            with self.assertRaises(ConcurrentUpdateError):
+                call.save()
+
+        self.assertIsNone(self.load().cost)
+
+    def test_assigned_deferred_field_is_written(self):
+        call = InterviewCall.objects.only("id", "version", "status").get(id=self.call.id)
+        call.end_reason = "silence-timed-out"
+
+        self.assertEqual(call.dirty_fields(), ["end_reason"])
+        call.save()
+
+        stored = self.load()
+        self.assertEqual(stored.end_reason, "silence-timed-out")
+        self.assertEqual(stored.status, "in-progress")
@@ -0,0 +1,137 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.db import DatabaseError
+from django.test import TestCase
+from django.utils import timezone
+
+from api.dispatch import LeaseKeeper, ScheduledCallExecutor, claim_scheduled_calls
+from api.models import ScheduledCall
+from api.tests.helpers import create_account, create_due_calls
+from api.vapi_client import VapiAPIError
+
+
+class ScheduledCallTestCase(TestCase):
+    def setUp(self):
+        self.user, self.assistant, self.phone_number = create_account("dispatcher")
+
+    def create_due_calls(self, count):
+        return create_due_calls(self.user, self.assistant, self.phone_number, count)
+
+
+class ClaimScheduledCallsTests(ScheduledCallTestCase):
+    def test_dispatchers_claim_disjoint_calls(self):
+        calls = self.create_due_calls(5)
+
+        first = claim_scheduled_calls(limit=3)
+        second = claim_scheduled_calls()
+        third = claim_scheduled_calls()
+
+        first_ids = {call.id for call in first}
+        second_ids = {call.id for call in second}
+        self.assertEqual(len(first_ids), 3)
+        self.assertFalse(first_ids & second_ids)
+        self.assertEqual(first_ids | second_ids, {call.id for call in calls})
+        self.assertEqual(third, [])
+        self.assertNotEqual(first[0].lease_owner, second[0].lease_owner)
+
+    def test_claimed_ids_are_not_claimed_again(self):
+        ids = [call.id for call in self.create_due_calls(2)]
+
+        self.assertEqual(len(claim_scheduled_calls(ids=ids)), 2)
+        self.assertEqual(claim_scheduled_calls(ids=ids), [])
+
+    def test_expired_lease_is_claimed_again(self):
+        call = self.create_due_calls(1)[0]
+        claim_scheduled_calls()
+        ScheduledCall.objects.filter(id=call.id).update(lease_expires_at=timezone.now() - timedelta(seconds=1))
+
+        reclaimed = claim_scheduled_calls()
+
+        self.assertEqual([c.id for c in reclaimed], [call.id])
+
+
+class LeaseFenceTests(ScheduledCallTestCase):
+    def take_over(self, scheduled_call):
+        ScheduledCall.objects.filter(id=scheduled_call.id).update(lease_owner="other-host:1/abc")
+
+    def test_success_after_takeover_leaves_new_owner_row(self):
+        self.create_due_calls(1)
+        claimed = claim_scheduled_calls()[0]
+        self.take_over(claimed)
+
+        with mock.patch("api.dispatch.VapiClient") as client:
+            client.return_value.create_call.return_value = {"id": "vapi-call-1"}
+            result = ScheduledCallExecutor()(claimed)
+
+        self.assertTrue(result["success"])
+        self.assertTrue(result["lease_lost"])
+        row = ScheduledCall.objects.get(id=claimed.id)
+        self.assertEqual(row.status, "in_progress")
+        self.assertEqual(row.lease_owner, "other-host:1/abc")
+        self.assertIsNone(row.actual_call_id)
+
+    def test_failure_after_takeover_is_not_written(self):
+        self.create_due_calls(1)
+        claimed = claim_scheduled_calls()[0]
+        self.take_over(claimed)
+
+        executor = ScheduledCallExecutor()
+        with mock.patch("api.dispatch.VapiClient") as client:
+            client.return_value.create_call.side_effect = VapiAPIError("rate limited", 429)
+            executor(claimed)
+        written = executor.flush()
+
+        self.assertEqual(written, 0)
+        row = ScheduledCall.objects.get(id=claimed.id)
+        self.assertEqual(row.status, "in_progress")
+        self.assertEqual(row.lease_owner, "other-host:1/abc")
+
+    def test_stale_failure_does_not_reset_completed_call(self):
+        self.create_due_calls(1)
+        claimed = claim_scheduled_calls()[0]
+        ScheduledCall.objects.filter(id=claimed.id).update(status="completed")
+
+        executor = ScheduledCallExecutor()
+        with mock.patch("api.dispatch.VapiClient") as client:
+            client.return_value.create_call.side_effect = VapiAPIError("bad number", 400)
+            executor(claimed)
+        executor.flush()
+
+        self.assertEqual(ScheduledCall.objects.get(id=claimed.id).status, "completed")
+
+    def test_retryable_failure_is_rescheduled_by_its_owner(self):
+        self.create_due_calls(1)
+        claimed = claim_scheduled_calls()[0]
+
+        executor = ScheduledCallExecutor()
+        with mock.patch("api.dispatch.VapiClient") as client:
+            client.return_value.create_call.side_effect = VapiAPIError("rate limited", 429)
+            result = executor(claimed)
+        executor.flush()
+
+        row = ScheduledCall.objects.get(id=claimed.id)
+        self.assertEqual(row.status, "scheduled")
+        self.assertIsNone(row.lease_owner)
+        self.assertEqual(row.next_attempt_at, result["next_attempt_at"])
+
+    def test_placed_call_that_cannot_be_recorded_fails_and_leaves_the_keeper(self):
+        self.create_due_calls(1)
+        claimed = claim_scheduled_calls()[0]
+        lease_keeper = LeaseKeeper()
+        self.addCleanup(lease_keeper.stop)
+        lease_keeper.hold([claimed])
+
+        executor = ScheduledCallExecutor(lease_keeper)
+        with mock.patch("api.dispatch.VapiClient") as client, \
+                mock.patch("api.dispatch.InterviewCall.objects.create", side_effect=DatabaseError("disk full")):
+            client.return_value.create_call.return_value = {"id": "vapi-call-1"}
+            result = executor(claimed)
+        executor.flush()
+
+        self.assertFalse(result["success"])
+        self.assertNotIn("next_attempt_at", result)
+        row = ScheduledCall.objects.get(id=claimed.id)
+        self.assertEqual(row.status, "failed")
+        self.assertIn("vapi-call-1", row.error_message)
+        self.assertEqual(lease_keeper._held, {})
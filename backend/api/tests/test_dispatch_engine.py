@@ -0,0 +1,100 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from api.dispatch import DispatchEngine
+from api.models import APIConfiguration, InterviewCall
+from api.tests.helpers import create_account, create_call, create_due_calls
+
+
+def started(scheduled_call):
+    return {"scheduled_call_id": scheduled_call.id, "success": True}
+
+
+def failed(scheduled_call):
+    return {"scheduled_call_id": scheduled_call.id, "success": False, "error": "bad number"}
+
+
+class DispatchEngineTests(TestCase):
+    def setUp(self):
+        self.user, self.assistant, self.phone_number = create_account("engine")
+
+    def engine(self, execute=started, **caps):
+        caps.setdefault("max_per_number", 0)
+        caps.setdefault("max_per_account", 0)
+        engine = DispatchEngine(execute, workers=2, max_starts_per_second=0, **caps)
+        self.addCleanup(engine.shutdown)
+        return engine
+
+    def due_calls(self, count, account=None):
+        user, assistant, phone_number = account or (self.user, self.assistant, self.phone_number)
+        return create_due_calls(user, assistant, phone_number, count)
+
+    def test_calls_over_the_number_cap_are_deferred(self):
+        calls = self.due_calls(3)
+
+        outcome = self.engine(max_per_number=2).run(calls)
+
+        self.assertEqual(len(outcome.results), 2)
+        self.assertEqual(outcome.deferred, calls[2:])
+
+    def test_live_calls_count_against_the_number_cap(self):
+        create_call(self.user, self.assistant, self.phone_number, status="in-progress")
+
+        outcome = self.engine(max_per_number=1).run(self.due_calls(1))
+
+        self.assertEqual(outcome.results, [])
+        self.assertEqual(len(outcome.deferred), 1)
+
+    def test_live_calls_outside_the_active_window_are_ignored(self):
+        live = create_call(self.user, self.assistant, self.phone_number, status="in-progress")
+        InterviewCall.objects.filter(id=live.id).update(created_at=timezone.now() - timedelta(days=1))
+
+        outcome = self.engine(max_per_number=1).run(self.due_calls(1))
+
+        self.assertEqual(len(outcome.results), 1)
+
+    def test_users_sharing_a_vapi_key_share_the_account_cap(self):
+        other = create_account("engine-2")
+        APIConfiguration.objects.filter(user=other[0]).update(vapi_api_key="test-key")
+        calls = self.due_calls(1) + self.due_calls(1, account=other)
+
+        outcome = self.engine(max_per_account=1).run(calls)
+
+        self.assertEqual(len(outcome.results), 1)
+        self.assertEqual(len(outcome.deferred), 1)
+
+    def test_users_with_their_own_keys_have_their_own_account_caps(self):
+        other = create_account("engine-2", vapi_api_key="other-key")
+        calls = self.due_calls(1) + self.due_calls(1, account=other)
+
+        outcome = self.engine(max_per_account=1).run(calls)
+
+        self.assertEqual(len(outcome.results), 2)
+        self.assertEqual(outcome.deferred, [])
+
+    def test_failed_call_frees_its_slot_for_a_held_back_call(self):
+        calls = self.due_calls(3)
+
+        outcome = self.engine(failed, max_per_number=1).run(calls)
+
+        self.assertEqual(len(outcome.results), 3)
+        self.assertEqual(outcome.deferred, [])
+
+    def test_limit_leaves_the_rest_for_a_later_run(self):
+        calls = self.due_calls(3)
+
+        outcome = self.engine().run(calls, limit=2)
+
+        self.assertEqual(len(outcome.results), 2)
+        self.assertEqual(outcome.deferred, calls[2:])
+
+    def test_execute_error_is_reported_as_a_failed_result(self):
+        def execute(scheduled_call):
+            raise RuntimeError("boom")
+
+        outcome = self.engine(execute).run(self.due_calls(1))
+
+        self.assertFalse(outcome.results[0]["success"])
+        self.assertEqual(outcome.results[0]["error"], "boom")
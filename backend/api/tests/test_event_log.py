@@ -0,0 +1,86 @@
+import gzip
+import json
+import os
+import tempfile
+
+from django.test import SimpleTestCase
+
+from api.event_log import INDEX_SUFFIX, SegmentedEventLog
+
+
+def webhook(vapi_call_id, event_type="status-update", **fields):
+    return {"message": {"type": event_type, "call": {"id": vapi_call_id}, **fields}}
+
+
+class SegmentedEventLogTests(SimpleTestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        self.addCleanup(folder.cleanup)
+        self.folder = folder.name
+
+    def make_log(self, **options):
+        options.setdefault("flush_interval", 0)
+        return SegmentedEventLog(self.folder, **options)
+
+    def test_events_are_buffered_until_the_batch_is_full(self):
+        log = self.make_log(flush_events=3)
+        segment = log.append("status-update", webhook("call-1"))
+        log.append("status-update", webhook("call-1"))
+
+        self.assertFalse(os.path.exists(segment))
+        log.append("status-update", webhook("call-1"))
+        with gzip.open(segment, "rt") as f:
+            self.assertEqual(len(f.readlines()), 3)
+
+    def test_every_flush_appends_a_readable_gzip_member(self):
+        log = self.make_log(flush_events=1)
+        segment = log.append("status-update", webhook("call-1", status="ringing"))
+        log.append("status-update", webhook("call-1", status="in-progress"))
+
+        with gzip.open(segment, "rt") as f:
+            statuses = [json.loads(line)["event"]["message"]["status"] for line in f]
+        self.assertEqual(statuses, ["ringing", "in-progress"])
+
+    def test_full_segment_is_sealed_and_a_new_one_started(self):
+        log = self.make_log(flush_events=1, max_segment_bytes=1)
+        first = log.append("status-update", webhook("call-1"))
+        second = log.append("status-update", webhook("call-2"))
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(len(log.segments()), 2)
+
+    def test_index_counts_events_per_call_and_type(self):
+        log = self.make_log()
+        log.append("status-update", webhook("call-1"))
+        log.append("status-update", webhook("call-1"))
+        segment = log.append("end-of-call-report", webhook("call-2", "end-of-call-report"))
+        log.flush()
+
+        with open(segment[: -len(".jsonl.gz")] + INDEX_SUFFIX) as f:
+            index = json.load(f)
+        self.assertEqual(index["count"], 3)
+        self.assertEqual(index["event_types"], {"status-update": 2, "end-of-call-report": 1})
+        self.assertEqual(index["calls"], {"call-1": {"status-update": 2}, "call-2": {"end-of-call-report": 1}})
+
+    def test_reader_only_opens_segments_whose_index_mentions_the_call(self):
+        log = self.make_log(flush_events=1, max_segment_bytes=1)
+        log.append("status-update", webhook("call-1"))
+        wanted = log.append("end-of-call-report", webhook("call-2", "end-of-call-report"))
+        log.append("status-update", webhook("call-3"))
+
+        self.assertEqual(log.segments(call_id="call-2"), [wanted])
+        self.assertEqual(log.segments(call_id="call-1", event_type="end-of-call-report"), [])
+        self.assertEqual(len(log.segments(event_type="status-update")), 2)
+
+    def test_events_of_a_call_are_read_back_in_order(self):
+        log = self.make_log(flush_events=2, max_segment_bytes=1)
+        for status in ("queued", "ringing", "in-progress", "ended"):
+            log.append("status-update", webhook("call-1", status=status))
+            log.append("status-update", webhook("call-2", status=status))
+
+        records = list(log.iter_events(call_id="call-1"))
+
+        self.assertEqual(
+            [record["event"]["message"]["status"] for record in records], ["queued", "ringing", "in-progress", "ended"]
+        )
+        self.assertTrue(all(record["call_id"] == "call-1" for record in records))
@@ -0,0 +1,59 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from api.metrics import metrics
+from api.models import PhoneNumber
+from api.views import VapiPhoneNumbersView
+
+
+def vapi_number(vapi_id, number="+14155550123", name="Main line"):
+    return {"id": vapi_id, "number": number, "name": name}
+
+
+class PhoneNumberSyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("numbers", password="x")
+        self.view = VapiPhoneNumbersView()
+
+    def sync(self, phone_numbers, user=None):
+        return self.view.sync_phone_numbers(user or self.user, phone_numbers)
+
+    def test_new_numbers_are_created(self):
+        self.sync([vapi_number("ph-1"), vapi_number("ph-2", "+14155550124")])
+
+        stored = dict(PhoneNumber.objects.filter(user=self.user).values_list("vapi_phone_number_id", "phone_number"))
+        self.assertEqual(stored, {"ph-1": "+14155550123", "ph-2": "+14155550124"})
+
+    def test_changed_numbers_are_updated_and_unchanged_ones_left_alone(self):
+        self.sync([vapi_number("ph-1"), vapi_number("ph-2")])
+
+        with self.assertNumQueries(2):
+            self.sync([vapi_number("ph-1", name="Renamed"), vapi_number("ph-2")])
+
+        self.assertEqual(PhoneNumber.objects.get(vapi_phone_number_id="ph-1").friendly_name, "Renamed")
+
+    def test_unchanged_list_writes_nothing(self):
+        self.sync([vapi_number("ph-1")])
+
+        with self.assertNumQueries(1):
+            self.sync([vapi_number("ph-1")])
+
+    def test_number_of_another_user_is_skipped_and_counted(self):
+        other_user = User.objects.create_user("other", password="x")
+        self.sync([vapi_number("ph-1", name="Theirs")], user=other_user)
+        skipped_before = metrics.counter_value("phone_number_sync_skipped")
+
+        with self.assertLogs("api.views", "WARNING") as logs:
+            self.sync([vapi_number("ph-1", name="Mine"), vapi_number("ph-2")])
+
+        theirs = PhoneNumber.objects.get(vapi_phone_number_id="ph-1")
+        self.assertEqual((theirs.user, theirs.friendly_name), (other_user, "Theirs"))
+        self.assertTrue(PhoneNumber.objects.filter(user=self.user, vapi_phone_number_id="ph-2").exists())
+        self.assertEqual(metrics.counter_value("phone_number_sync_skipped"), skipped_before + 1)
+        self.assertIn("ph-1", logs.output[0])
+
+    def test_assistant_info_is_added(self):
+        enriched = self.sync([vapi_number("ph-1")])
+
+        self.assertEqual(enriched[0]["assistant"], None)
+        self.assertEqual(enriched[0]["id"], "ph-1")
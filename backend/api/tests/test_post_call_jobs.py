@@ -0,0 +1,116 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+
+from api.models import PostCallJob
+from api.post_call_jobs import (
+    PermanentJobError,
+    RetryPolicy,
+    claim_post_call_jobs,
+    enqueue_post_call_job,
+    release_stale_jobs,
+    retry_delay,
+    run_post_call_job,
+)
+from api.tests.helpers import create_account, create_call
+
+
+class PostCallJobTests(TestCase):
+    def setUp(self):
+        self.user, self.assistant, self.phone_number = create_account("jobs")
+        self.calls = [
+            create_call(self.user, self.assistant, self.phone_number, f"call-{i}", status="ended",
+                        recording_url=f"https://recordings.example.com/{i}.mp3")
+            for i in range(3)
+        ]
+
+    def enqueue(self, call, kind="download_recording"):
+        return enqueue_post_call_job(call, kind, {"recording_url": call.recording_url})
+
+    def run_failing(self, job, error):
+        with mock.patch.dict("api.post_call_jobs.JOB_HANDLERS", {job.kind: mock.Mock(side_effect=error)}):
+            return run_post_call_job(job)
+
+    def test_one_outstanding_job_per_call_and_kind(self):
+        self.assertIsNotNone(self.enqueue(self.calls[0]))
+        self.assertIsNone(self.enqueue(self.calls[0]))
+        self.assertIsNotNone(self.enqueue(self.calls[0], "process_transcript"))
+
+    def test_claims_are_disjoint_and_only_of_the_kind(self):
+        for call in self.calls:
+            self.enqueue(call)
+        self.enqueue(self.calls[0], "process_transcript")
+
+        first = claim_post_call_jobs("download_recording", batch_size=2)
+        second = claim_post_call_jobs("download_recording", batch_size=2)
+
+        self.assertEqual(len(first), 2)
+        self.assertEqual(len(second), 1)
+        self.assertFalse({job.id for job in first} & {job.id for job in second})
+        self.assertTrue(all(job.kind == "download_recording" and job.attempts == 1 for job in first + second))
+        self.assertEqual(claim_post_call_jobs("download_recording"), [])
+
+    def test_jobs_are_not_claimed_before_they_are_due(self):
+        job = self.enqueue(self.calls[0])
+        PostCallJob.objects.filter(id=job.id).update(next_attempt_at=timezone.now() + timedelta(minutes=1))
+
+        self.assertEqual(claim_post_call_jobs("download_recording"), [])
+
+    def test_failed_attempt_is_retried_with_backoff(self):
+        self.enqueue(self.calls[0])
+        job = claim_post_call_jobs("download_recording")[0]
+        before = timezone.now()
+
+        self.assertFalse(self.run_failing(job, ConnectionError("reset")))
+
+        stored = PostCallJob.objects.get(id=job.id)
+        self.assertEqual(stored.status, "pending")
+        self.assertEqual(stored.last_error, "reset")
+        self.assertGreaterEqual(stored.next_attempt_at, before + timedelta(seconds=30))
+
+    def test_job_fails_once_attempts_are_used_up(self):
+        self.enqueue(self.calls[0])
+        for _ in range(5):
+            PostCallJob.objects.update(next_attempt_at=timezone.now())
+            job = claim_post_call_jobs("download_recording")[0]
+            self.run_failing(job, ConnectionError("reset"))
+
+        stored = PostCallJob.objects.get(id=job.id)
+        self.assertEqual(stored.status, "failed")
+        self.assertEqual(stored.attempts, 5)
+        # The call can get a new job once the old one is finished
+        self.assertIsNotNone(self.enqueue(self.calls[0]))
+
+    def test_permanent_error_fails_at_once(self):
+        self.enqueue(self.calls[0])
+        job = claim_post_call_jobs("download_recording")[0]
+
+        self.run_failing(job, PermanentJobError("Recording URL returned 404"))
+
+        self.assertEqual(PostCallJob.objects.get(id=job.id).status, "failed")
+
+    def test_successful_job_is_finished(self):
+        self.enqueue(self.calls[0])
+        job = claim_post_call_jobs("download_recording")[0]
+
+        with mock.patch.dict("api.post_call_jobs.JOB_HANDLERS", {job.kind: mock.Mock()}):
+            self.assertTrue(run_post_call_job(job))
+
+        stored = PostCallJob.objects.get(id=job.id)
+        self.assertEqual(stored.status, "succeeded")
+        self.assertIsNotNone(stored.finished_at)
+
+    def test_stale_running_job_is_released(self):
+        self.enqueue(self.calls[0])
+        job = claim_post_call_jobs("download_recording")[0]
+        PostCallJob.objects.filter(id=job.id).update(locked_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(release_stale_jobs(900), 1)
+        self.assertEqual(claim_post_call_jobs("download_recording")[0].id, job.id)
+
+    def test_retry_delay_doubles_up_to_the_cap(self):
+        policy = RetryPolicy(max_attempts=10, base_delay=30, max_delay=100)
+
+        self.assertEqual([retry_delay(policy, attempts) for attempts in (1, 2, 3, 4)], [30, 60, 100, 100])
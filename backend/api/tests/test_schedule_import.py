@@ -0,0 +1,197 @@
+import json
+from datetime import timedelta
+from zoneinfo import ZoneInfo
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.models import ScheduledCall
+from api.schedule_import import (
+    ScheduleImportError,
+    ScheduleImporter,
+    detect_format,
+    iter_csv_rows,
+    iter_ndjson_rows,
+)
+from api.tests.helpers import create_account
+
+
+def lines(text):
+    return [line.encode() for line in text.splitlines(keepends=True)]
+
+
+def future(days=1):
+    return (timezone.now() + timedelta(days=days)).replace(microsecond=0)
+
+
+class DetectFormatTests(SimpleTestCase):
+    def test_explicit_format_wins(self):
+        self.assertEqual(detect_format("JSONL", "calls.csv", "text/csv"), "ndjson")
+
+    def test_unsupported_explicit_format_is_rejected(self):
+        with self.assertRaises(ScheduleImportError):
+            detect_format("xlsx")
+
+    def test_file_extension(self):
+        self.assertEqual(detect_format(file_name="Calls.CSV"), "csv")
+        self.assertEqual(detect_format(file_name="calls.jsonl"), "ndjson")
+
+    def test_content_type_with_parameters(self):
+        self.assertEqual(detect_format(content_type="application/x-ndjson; charset=utf-8"), "ndjson")
+
+    def test_unknown_upload_is_rejected(self):
+        with self.assertRaises(ScheduleImportError):
+            detect_format(file_name="calls.txt", content_type="text/plain")
+
+
+class RowReaderTests(SimpleTestCase):
+    def test_csv_rows_are_numbered_like_a_spreadsheet(self):
+        rows = list(iter_csv_rows(lines(
+            "\ufeffCustomer_Number, scheduled_time\n+14155550100,2030-01-01T09:00\n,\n+14155550101,2030-01-02T09:00\n"
+        )))
+
+        self.assertEqual(rows, [
+            (2, {"customer_number": "+14155550100", "scheduled_time": "2030-01-01T09:00"}),
+            (4, {"customer_number": "+14155550101", "scheduled_time": "2030-01-02T09:00"}),
+        ])
+
+    def test_csv_without_required_columns_is_rejected(self):
+        with self.assertRaisesMessage(ScheduleImportError, "scheduled_time"):
+            list(iter_csv_rows(lines("customer_number\n+14155550100\n")))
+
+    def test_empty_csv_is_rejected(self):
+        with self.assertRaisesMessage(ScheduleImportError, "empty"):
+            list(iter_csv_rows([]))
+
+    def test_csv_that_is_not_utf8_is_rejected(self):
+        with self.assertRaisesMessage(ScheduleImportError, "UTF-8"):
+            list(iter_csv_rows([b"customer_number,scheduled_time\n", b"\xff\xfe\n"]))
+
+    def test_ndjson_lines_that_are_not_objects_come_back_as_errors(self):
+        rows = list(iter_ndjson_rows(lines('{"customer_number": "+14155550100"}\n\nnot json\n[1, 2]\n')))
+
+        self.assertEqual(rows, [
+            (1, {"customer_number": "+14155550100"}),
+            (3, "Invalid JSON"),
+            (4, "Each line must be a JSON object"),
+        ])
+
+
+class ScheduleImporterTests(TestCase):
+    def setUp(self):
+        self.user, self.assistant, self.phone_number = create_account("importer")
+
+    def run_import(self, rows, **options):
+        importer = ScheduleImporter(self.user, self.assistant, self.phone_number, **options)
+        return importer.run(enumerate(rows, start=1))
+
+    def test_valid_rows_are_scheduled(self):
+        scheduled_time = future()
+
+        report = self.run_import([
+            {"customer_number": "+1 (415) 555-0100", "scheduled_time": scheduled_time.isoformat(), "call_name": "Ada"},
+        ])
+
+        self.assertEqual(report["created"], 1)
+        scheduled_call = ScheduledCall.objects.get(user=self.user)
+        self.assertEqual(scheduled_call.customer_number, "+14155550100")
+        self.assertEqual(scheduled_call.status, "scheduled")
+        self.assertEqual(scheduled_call.scheduled_time, scheduled_time)
+        self.assertEqual(scheduled_call.next_attempt_at, scheduled_time)
+
+    def test_naive_time_is_read_in_the_row_timezone(self):
+        naive = future().replace(tzinfo=None)
+
+        self.run_import(
+            [{"customer_number": "+14155550100", "scheduled_time": naive.isoformat(), "timezone": "Asia/Tokyo"}],
+            default_timezone="America/New_York",
+        )
+
+        scheduled_call = ScheduledCall.objects.get(user=self.user)
+        self.assertEqual(scheduled_call.scheduled_time, naive.replace(tzinfo=ZoneInfo("Asia/Tokyo")))
+        self.assertEqual(scheduled_call.timezone, "Asia/Tokyo")
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        report = self.run_import([
+            {"customer_number": "555-0100", "scheduled_time": future().isoformat()},
+            {"customer_number": "+14155550100", "scheduled_time": (timezone.now() - timedelta(days=1)).isoformat()},
+            {"customer_number": "+14155550100", "scheduled_time": future().isoformat(), "timezone": "Mars/Base"},
+            "Invalid JSON",
+            {"customer_number": "+14155550100", "scheduled_time": future().isoformat()},
+        ])
+
+        self.assertEqual((report["valid"], report["invalid"], report["created"]), (1, 4, 1))
+        self.assertEqual([error["row"] for error in report["errors"]], [1, 2, 3, 4])
+        self.assertIn("customer_number", report["errors"][0]["errors"])
+        self.assertIn("scheduled_time", report["errors"][1]["errors"])
+        self.assertIn("timezone", report["errors"][2]["errors"])
+
+    def test_dry_run_creates_nothing(self):
+        report = self.run_import([{"customer_number": "+14155550100", "scheduled_time": future().isoformat()}], dry_run=True)
+
+        self.assertEqual((report["valid"], report["created"]), (1, 0))
+        self.assertFalse(ScheduledCall.objects.exists())
+
+    @override_settings(SCHEDULE_IMPORT_MAX_ROWS=2, SCHEDULE_IMPORT_BATCH_SIZE=1)
+    def test_too_many_rows_imports_nothing(self):
+        rows = [{"customer_number": "+14155550100", "scheduled_time": future().isoformat()}] * 3
+
+        with self.assertRaises(ScheduleImportError):
+            self.run_import(rows)
+
+        self.assertFalse(ScheduledCall.objects.exists())
+
+    @override_settings(SCHEDULE_IMPORT_MAX_ERRORS=2)
+    def test_error_list_is_truncated(self):
+        report = self.run_import([{"customer_number": "", "scheduled_time": ""}] * 3)
+
+        self.assertEqual(report["invalid"], 3)
+        self.assertEqual(len(report["errors"]), 2)
+        self.assertTrue(report["errors_truncated"])
+
+
+class ScheduleCallImportViewTests(TestCase):
+    def setUp(self):
+        self.user, self.assistant, self.phone_number = create_account("importer")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.options = {
+            "vapi_assistant_id": self.assistant.vapi_assistant_id,
+            "twilio_phone_number_id": self.phone_number.vapi_phone_number_id,
+        }
+
+    def test_multipart_csv_upload(self):
+        upload = SimpleUploadedFile(
+            "calls.csv", f"customer_number,scheduled_time\n+14155550100,{future().isoformat()}\n".encode()
+        )
+
+        response = self.client.post(reverse("schedule_call_import"), {**self.options, "file": upload})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["created"], 1)
+
+    def test_raw_ndjson_body(self):
+        body = json.dumps({"customer_number": "+14155550100", "scheduled_time": future().isoformat()})
+
+        response = self.client.generic(
+            "POST",
+            reverse("schedule_call_import") + "?" + "&".join(f"{k}={v}" for k, v in self.options.items()) + "&dry_run=1",
+            body,
+            content_type="application/x-ndjson",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["valid"], 1)
+        self.assertFalse(ScheduledCall.objects.exists())
+
+    def test_unknown_assistant_is_rejected(self):
+        upload = SimpleUploadedFile("calls.csv", b"customer_number,scheduled_time\n")
+
+        response = self.client.post(
+            reverse("schedule_call_import"), {**self.options, "vapi_assistant_id": "asst-other", "file": upload}
+        )
+
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,102 @@
+from datetime import timedelta
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError
+
+from api.dispatch import (
+    ScheduledCallExecutor, claim_scheduled_calls, is_retryable, jittered_retry_delay, retry_policy,
+)
+from api.models import ScheduledCall
+from api.resilience import ProviderUnavailable
+from api.tests.helpers import create_account, create_due_calls
+from api.vapi_client import VapiAPIError, _unavailable
+
+
+class IsRetryableTests(SimpleTestCase):
+    def test_ambiguous_upstream_errors_are_not_retried(self):
+        for status_code in (500, 502, 503, 504):
+            self.assertFalse(is_retryable(VapiAPIError("upstream", status_code)), status_code)
+
+    def test_connection_dropped_mid_request_is_not_retried(self):
+        reset = requests.exceptions.ConnectionError(
+            ProtocolError("Connection aborted.", ConnectionResetError(104, "Connection reset by peer"))
+        )
+        self.assertFalse(is_retryable(reset))
+        self.assertFalse(is_retryable(requests.exceptions.ReadTimeout("read timed out")))
+
+    def test_requests_that_never_reached_vapi_are_retried(self):
+        refused = requests.exceptions.ConnectionError(
+            MaxRetryError(None, "/call", NewConnectionError(None, "Connection refused"))
+        )
+        self.assertTrue(is_retryable(refused))
+        self.assertTrue(is_retryable(requests.exceptions.ConnectTimeout("connect timed out")))
+        self.assertTrue(is_retryable(VapiAPIError("rate limited", 429)))
+
+    def test_local_circuit_breaker_rejection_is_retried(self):
+        try:
+            try:
+                raise ProviderUnavailable("vapi", "circuit_open", 5)
+            except ProviderUnavailable as e:
+                raise _unavailable(e) from e
+        except VapiAPIError as e:
+            rejected = e
+        self.assertEqual(rejected.status_code, 503)
+        self.assertTrue(is_retryable(rejected))
+
+
+@override_settings(SCHEDULED_CALL_MAX_ATTEMPTS=3, SCHEDULED_CALL_RETRY_BASE_DELAY=30, SCHEDULED_CALL_RETRY_MAX_DELAY=100)
+class RetryBackoffTests(TestCase):
+    def setUp(self):
+        user, assistant, phone_number = create_account("retries")
+        create_due_calls(user, assistant, phone_number, 1)
+
+    def attempt(self, error):
+        claimed = claim_scheduled_calls()[0]
+        executor = ScheduledCallExecutor()
+        with mock.patch("api.dispatch.VapiClient") as client:
+            client.return_value.create_call.side_effect = error
+            result = executor(claimed)
+        executor.flush()
+        return result, ScheduledCall.objects.get(id=claimed.id)
+
+    def make_due(self):
+        ScheduledCall.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+
+    def test_delay_doubles_up_to_the_cap(self):
+        policy = retry_policy()
+        for attempts, upper in ((1, 30), (2, 60), (3, 100), (6, 100)):
+            delay = jittered_retry_delay(policy, attempts)
+            self.assertGreaterEqual(delay, upper / 2)
+            self.assertLessEqual(delay, upper)
+
+    def test_retry_is_not_claimed_before_it_is_due(self):
+        self.attempt(VapiAPIError("rate limited", 429))
+
+        self.assertEqual(claim_scheduled_calls(), [])
+
+    def test_retry_after_from_the_provider_is_honoured(self):
+        before = timezone.now()
+        result, row = self.attempt(VapiAPIError("rate limited", 429, {"retryAfter": 600}))
+
+        self.assertGreaterEqual(row.next_attempt_at, before + timedelta(seconds=600))
+        self.assertEqual(row.next_attempt_at, result["next_attempt_at"])
+
+    def test_call_fails_once_attempts_are_used_up(self):
+        for _ in range(2):
+            _, row = self.attempt(VapiAPIError("rate limited", 429))
+            self.assertEqual(row.status, "scheduled")
+            self.make_due()
+
+        _, row = self.attempt(VapiAPIError("rate limited", 429))
+
+        self.assertEqual(row.status, "failed")
+        self.assertEqual(row.execution_attempts, 3)
+
+    def test_non_retryable_error_fails_at_once(self):
+        _, row = self.attempt(VapiAPIError("bad number", 400))
+
+        self.assertEqual(row.status, "failed")
+        self.assertIn("bad number", row.error_message)
@@ -0,0 +1,121 @@
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from api.dispatch import ScheduledCallExecutor, claim_scheduled_calls
+from api.management.commands.run_scheduler import Command
+from api.models import ScheduledCall
+from api.scheduler import DispatchQueue, ScheduleListener
+from api.tests.helpers import create_account, create_due_calls
+from api.vapi_client import VapiAPIError
+
+
+class DispatchQueueTests(SimpleTestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.queue = DispatchQueue()
+
+    def at(self, seconds):
+        return self.now + timedelta(seconds=seconds)
+
+    def test_pops_due_entries_in_time_order(self):
+        self.queue.schedule(1, self.at(-1))
+        self.queue.schedule(2, self.at(-5))
+        self.queue.schedule(3, self.at(10))
+
+        due = self.queue.pop_due(self.now)
+
+        self.assertEqual(due, [(2, self.at(-5)), (1, self.at(-1))])
+        self.assertEqual(len(self.queue), 1)
+        self.assertEqual(self.queue.next_due(), self.at(10))
+
+    def test_moved_entry_is_due_at_its_new_time_only(self):
+        self.queue.schedule(1, self.at(-1))
+        self.queue.schedule(1, self.at(10))
+
+        self.assertEqual(self.queue.pop_due(self.now), [])
+        self.assertEqual(self.queue.next_due(), self.at(10))
+        self.assertEqual(len(self.queue), 1)
+
+    def test_discarded_entry_is_never_popped(self):
+        self.queue.schedule(1, self.at(-1))
+        self.queue.discard(1)
+
+        self.assertEqual(self.queue.pop_due(self.now), [])
+        self.assertIsNone(self.queue.next_due())
+        self.assertEqual(len(self.queue), 0)
+
+    def test_entry_moved_back_to_an_earlier_time_is_popped_once(self):
+        self.queue.schedule(1, self.at(-1))
+        self.queue.schedule(1, self.at(10))
+        self.queue.schedule(1, self.at(-1))
+
+        self.assertEqual(self.queue.pop_due(self.now), [(1, self.at(-1))])
+        self.assertIsNone(self.queue.next_due())
+
+
+class ScheduleListenerTests(SimpleTestCase):
+    def test_times_out_with_no_changes(self):
+        listener = ScheduleListener()
+
+        self.assertEqual(listener.wait(0.01), set())
+        self.assertFalse(listener.listening)
+
+    def test_wake_asks_for_a_resync(self):
+        listener = ScheduleListener()
+        threading.Timer(0.01, listener.wake).start()
+
+        self.assertEqual(listener.wait(5), {None})
+        self.assertEqual(listener.wait(0.01), set())
+
+
+class ScheduledCallTimeTests(TestCase):
+    def setUp(self):
+        self.user, self.assistant, self.phone_number = create_account("scheduler")
+        self.scheduled_call = create_due_calls(self.user, self.assistant, self.phone_number, 1)[0]
+
+    def test_moving_a_retried_call_moves_its_next_attempt(self):
+        ScheduledCall.objects.filter(id=self.scheduled_call.id).update(
+            next_attempt_at=timezone.now() + timedelta(minutes=5)
+        )
+        scheduled_call = ScheduledCall.objects.get(id=self.scheduled_call.id)
+        new_time = timezone.now() + timedelta(days=1)
+
+        scheduled_call.scheduled_time = new_time
+        scheduled_call.save(update_fields=["scheduled_time"])
+
+        self.assertEqual(ScheduledCall.objects.get(id=self.scheduled_call.id).next_attempt_at, new_time)
+
+    def test_saving_a_retried_call_keeps_its_next_attempt(self):
+        retry_at = timezone.now() + timedelta(minutes=5)
+        ScheduledCall.objects.filter(id=self.scheduled_call.id).update(next_attempt_at=retry_at)
+        scheduled_call = ScheduledCall.objects.get(id=self.scheduled_call.id)
+
+        scheduled_call.notes = "Call after lunch"
+        scheduled_call.save()
+
+        self.assertEqual(ScheduledCall.objects.get(id=self.scheduled_call.id).next_attempt_at, retry_at)
+
+
+class SchedulerDispatchTests(TestCase):
+    def setUp(self):
+        self.user, self.assistant, self.phone_number = create_account("scheduler")
+        self.command = Command()
+        self.command.executor = ScheduledCallExecutor()
+        self.command.counts = {"executed": 0, "retried": 0, "failed": 0, "skipped": 0, "deferred": 0}
+        self.command.counter_lock = threading.Lock()
+
+    def test_failure_is_written_when_the_call_finishes(self):
+        create_due_calls(self.user, self.assistant, self.phone_number, 1)
+        claimed = claim_scheduled_calls()[0]
+
+        with mock.patch("api.dispatch.VapiClient") as client:
+            client.return_value.create_call.side_effect = VapiAPIError("bad number", 400)
+            self.command.dispatch(claimed)
+
+        row = ScheduledCall.objects.get(id=claimed.id)
+        self.assertEqual(row.status, "failed")
+        self.assertEqual(self.command.counts["failed"], 1)
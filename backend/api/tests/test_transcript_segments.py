@@ -0,0 +1,70 @@
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.models import TranscriptSegment
+from api.tests.helpers import create_account, create_call
+from api.views import handle_conversation_update, handle_transcript
+
+
+def turn(role, message):
+    return {"role": role, "message": message}
+
+
+class TranscriptSegmentTests(TestCase):
+    def setUp(self):
+        self.user, self.assistant, self.phone_number = create_account("transcripts")
+        self.call = create_call(self.user, self.assistant, self.phone_number, status="in-progress")
+
+    def conversation(self):
+        return list(
+            self.call.transcript_segments.filter(source="conversation").values_list("sequence", "role", "message")
+        )
+
+    def test_final_transcripts_are_appended_in_order(self):
+        handle_transcript(self.call, {"role": "assistant", "transcriptType": "final", "transcript": "Hello"})
+        handle_transcript(self.call, {"role": "user", "transcriptType": "partial", "transcript": "Hi th"})
+        handle_transcript(self.call, {"role": "user", "transcriptType": "final", "transcript": "Hi there"})
+
+        segments = self.call.transcript_segments.filter(source="transcript")
+        self.assertEqual(list(segments.values_list("sequence", "message")), [(1, "Hello"), (2, "Hi there")])
+
+    def test_conversation_update_only_writes_new_turns(self):
+        handle_conversation_update(self.call, {"messages": [turn("assistant", "Hello")]})
+        first = TranscriptSegment.objects.get(call=self.call, source="conversation", sequence=0)
+
+        handle_conversation_update(self.call, {"messages": [turn("assistant", "Hello"), turn("user", "Hi")]})
+
+        self.assertEqual(self.conversation(), [(0, "assistant", "Hello"), (1, "user", "Hi")])
+        self.assertEqual(TranscriptSegment.objects.get(id=first.id).created_at, first.created_at)
+
+    def test_revised_turn_is_updated_in_place(self):
+        handle_conversation_update(self.call, {"messages": [turn("assistant", "Hello"), turn("user", "Hi th")]})
+
+        handle_conversation_update(self.call, {"messages": [turn("assistant", "Hello"), turn("user", "Hi there")]})
+
+        self.assertEqual(self.conversation(), [(0, "assistant", "Hello"), (1, "user", "Hi there")])
+        self.assertEqual(self.call.transcript_segments.get(sequence=1).data, turn("user", "Hi there"))
+
+    def test_conversation_wins_when_the_transcript_is_rebuilt(self):
+        handle_transcript(self.call, {"role": "user", "transcriptType": "final", "transcript": "ignored"})
+        handle_conversation_update(self.call, {"messages": [turn("assistant", "Hello"), turn("user", "Hi")]})
+
+        transcript, transcript_text = self.call.transcript_from_segments()
+
+        self.assertEqual(transcript, [turn("assistant", "Hello"), turn("user", "Hi")])
+        self.assertEqual(transcript_text, "assistant: Hello\nuser: Hi")
+
+    def test_call_list_does_not_query_per_call(self):
+        for i in range(3):
+            call = create_call(self.user, self.assistant, self.phone_number, f"call-live-{i}", status="in-progress")
+            handle_conversation_update(call, {"messages": [turn("assistant", f"Hello {i}")]})
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        with self.assertNumQueries(2):
+            response = client.get(reverse("call_list"))
+
+        self.assertEqual(response.status_code, 200)
+        texts = {call["vapi_call_id"]: call["transcript_text"] for call in response.json()}
+        self.assertEqual(texts["call-live-2"], "assistant: Hello 2")
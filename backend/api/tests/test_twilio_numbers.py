@@ -0,0 +1,128 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api import twilio_clients
+from api.models import APIConfiguration
+from api.tests.helpers import create_account
+from api.views import TwilioPhoneNumbersView
+
+NEXT_PAGE_URL = (
+    "https://api.twilio.com/2010-04-01/Accounts/AC123/IncomingPhoneNumbers.json"
+    "?PageSize=2&Page=1&PageToken=PAPN123"
+)
+
+
+class TwilioPage(list):
+    def __init__(self, numbers, next_page_url=None):
+        super().__init__(numbers)
+        self.next_page_url = next_page_url
+
+
+def twilio_number(sid):
+    return SimpleNamespace(
+        sid=sid,
+        phone_number="+14155550100",
+        friendly_name=sid,
+        capabilities={"voice": True, "sms": True, "mms": False, "fax": False},
+    )
+
+
+class PageCursorTests(SimpleTestCase):
+    def test_cursor_round_trips_to_page_arguments(self):
+        cursor = TwilioPhoneNumbersView.page_cursor(NEXT_PAGE_URL)
+
+        self.assertEqual(TwilioPhoneNumbersView.page_args(cursor), {"page_number": 1, "page_token": "PAPN123"})
+
+    def test_last_page_has_no_cursor(self):
+        self.assertIsNone(TwilioPhoneNumbersView.page_cursor(None))
+
+    def test_no_cursor_is_the_first_page(self):
+        self.assertEqual(TwilioPhoneNumbersView.page_args(None), {})
+
+    def test_cursor_without_a_token_is_malformed(self):
+        with self.assertRaises(ValueError):
+            TwilioPhoneNumbersView.page_args("Page=1")
+
+    def test_cursor_with_a_bad_page_number_is_malformed(self):
+        with self.assertRaises(ValueError):
+            TwilioPhoneNumbersView.page_args("Page=two&PageToken=PAPN123")
+
+
+class TwilioPhoneNumbersViewTests(TestCase):
+    def setUp(self):
+        self.user, _, _ = create_account("twilio")
+        APIConfiguration.objects.filter(user=self.user).update(
+            twilio_account_sid="AC123", twilio_auth_token="token"
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.twilio = mock.Mock()
+        patcher = mock.patch("api.views.twilio_client_for_config", return_value=self.twilio)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_returns_one_page_and_a_cursor_for_the_next(self):
+        self.twilio.incoming_phone_numbers.page.return_value = TwilioPage(
+            [twilio_number("PN1"), twilio_number("PN2")], NEXT_PAGE_URL
+        )
+
+        response = self.client.get(reverse("twilio_phone_numbers"), {"page_size": 2})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([n["sid"] for n in response.data["twilio_numbers"]], ["PN1", "PN2"])
+        self.twilio.incoming_phone_numbers.page.assert_called_once_with(page_size=2)
+        self.assertIsNotNone(response.data["next_page"])
+
+    def test_next_page_cursor_is_passed_back_to_twilio(self):
+        self.twilio.incoming_phone_numbers.page.return_value = TwilioPage([twilio_number("PN3")])
+        cursor = TwilioPhoneNumbersView.page_cursor(NEXT_PAGE_URL)
+
+        response = self.client.get(reverse("twilio_phone_numbers"), {"page_size": 2, "page": cursor})
+
+        self.assertEqual(response.status_code, 200)
+        self.twilio.incoming_phone_numbers.page.assert_called_once_with(
+            page_size=2, page_number=1, page_token="PAPN123"
+        )
+        self.assertIsNone(response.data["next_page"])
+
+    def test_page_size_is_capped(self):
+        self.twilio.incoming_phone_numbers.page.return_value = TwilioPage([])
+
+        response = self.client.get(reverse("twilio_phone_numbers"), {"page_size": 5000})
+
+        self.assertEqual(response.data["page_size"], 1000)
+
+    def test_malformed_cursor_is_a_bad_request(self):
+        response = self.client.get(reverse("twilio_phone_numbers"), {"page": "garbage"})
+
+        self.assertEqual(response.status_code, 400)
+        self.twilio.incoming_phone_numbers.page.assert_not_called()
+
+
+class TwilioClientCacheTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch.object(twilio_clients, "_clients", {})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_client_is_reused_for_the_same_account(self):
+        first = twilio_clients.get_twilio_client("AC1", "token")
+
+        self.assertIs(twilio_clients.get_twilio_client("AC1", "token"), first)
+
+    def test_accounts_get_their_own_clients(self):
+        first = twilio_clients.get_twilio_client("AC1", "token")
+
+        self.assertIsNot(twilio_clients.get_twilio_client("AC2", "token"), first)
+
+    def test_rotated_token_replaces_the_client(self):
+        first = twilio_clients.get_twilio_client("AC1", "old-token")
+
+        second = twilio_clients.get_twilio_client("AC1", "new-token")
+
+        self.assertIsNot(second, first)
+        self.assertEqual(len(twilio_clients._clients), 1)
@@ -0,0 +1,93 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db.models import QuerySet
+from django.test import TransactionTestCase
+
+from api.models import InterviewCall
+from api.tests.helpers import create_account, create_call
+
+
+def vapi_call(vapi_call_id, **fields):
+    return {"id": vapi_call_id, "status": "in-progress", "updatedAt": "2026-01-05T10:00:00Z", **fields}
+
+
+class UpdateCallDetailsTests(TransactionTestCase):
+    def setUp(self):
+        self.user, self.assistant, self.phone_number = create_account("sync")
+        self.calls = [
+            create_call(self.user, self.assistant, self.phone_number, f"call-{i}", status="queued") for i in range(3)
+        ]
+        patcher = mock.patch("api.management.commands.update_call_details.VapiClient")
+        self.client = patcher.start().return_value
+        self.addCleanup(patcher.stop)
+
+    def sync(self):
+        """Run the command; returns the field lists passed to bulk_update and the deferred field loads"""
+        bulk_update, refresh_from_db = QuerySet.bulk_update, InterviewCall.refresh_from_db
+        with mock.patch.object(QuerySet, "bulk_update", autospec=True, side_effect=bulk_update) as bulk_updates, \
+                mock.patch.object(InterviewCall, "refresh_from_db", autospec=True, side_effect=refresh_from_db) as loads:
+            # The sync runs on its own threads and database connections
+            call_command("update_call_details", stdout=StringIO())
+        return (
+            sorted(sorted(c.args[2]) for c in bulk_updates.call_args_list),
+            [c.kwargs.get("fields") for c in loads.call_args_list],
+        )
+
+    def test_listed_calls_are_updated(self):
+        self.client.list_calls.return_value = [vapi_call(call.vapi_call_id) for call in self.calls]
+
+        self.sync()
+
+        self.client.get_call.assert_not_called()
+        self.assertEqual(set(InterviewCall.objects.values_list("status", flat=True)), {"in-progress"})
+        self.assertEqual(set(InterviewCall.objects.values_list("version", flat=True)), {1})
+
+    def test_calls_missing_from_the_list_are_fetched(self):
+        self.client.list_calls.return_value = [vapi_call("call-0")]
+        self.client.get_call.side_effect = lambda vapi_call_id: vapi_call(vapi_call_id, status="ringing")
+
+        self.sync()
+
+        self.assertEqual(sorted(c.args[0] for c in self.client.get_call.call_args_list), ["call-1", "call-2"])
+        self.assertEqual(InterviewCall.objects.get(vapi_call_id="call-2").status, "ringing")
+
+    def test_rows_are_grouped_by_their_changed_fields(self):
+        self.client.list_calls.return_value = [
+            vapi_call("call-0"),
+            vapi_call("call-1"),
+            vapi_call("call-2", cost=0.25, costBreakdown={"total": 0.25}),
+        ]
+
+        bulk_updates, loads = self.sync()
+
+        self.assertEqual(bulk_updates, [
+            ["cost", "cost_breakdown", "outcome_status", "raw_call_data", "status", "version"],
+            ["outcome_status", "raw_call_data", "status", "version"],
+        ])
+        # Rows that did not change a deferred column never load it
+        self.assertEqual(loads, [])
+        self.assertEqual(InterviewCall.objects.get(vapi_call_id="call-2").cost_breakdown, {"total": 0.25})
+
+    def test_calls_unchanged_at_vapi_are_skipped(self):
+        self.client.list_calls.return_value = [vapi_call(call.vapi_call_id) for call in self.calls]
+        self.sync()
+
+        bulk_updates, _ = self.sync()
+
+        self.assertEqual(bulk_updates, [])
+        self.assertEqual(set(InterviewCall.objects.values_list("version", flat=True)), {1})
+
+    def test_row_changed_meanwhile_is_merged(self):
+        def webhook_arrives(**params):
+            InterviewCall.objects.filter(vapi_call_id="call-0").update(end_reason="customer-ended-call", version=7)
+            return [vapi_call(call.vapi_call_id) for call in self.calls]
+
+        self.client.list_calls.side_effect = webhook_arrives
+        self.sync()
+
+        merged = InterviewCall.objects.get(vapi_call_id="call-0")
+        self.assertEqual(merged.status, "in-progress")
+        self.assertEqual(merged.end_reason, "customer-ended-call")
+        self.assertEqual(merged.version, 8)
@@ -0,0 +1,124 @@
+from unittest import mock
+
+import requests
+from django.test import SimpleTestCase
+from urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError
+
+from api.resilience import Provider
+from api.vapi_client import VapiAPIError, VapiClient
+
+
+def response(status_code, data=None):
+    reply = mock.Mock(status_code=status_code, headers={}, content=b"{}", text="")
+    reply.json.return_value = data if data is not None else {}
+    return reply
+
+
+def refused():
+    return requests.exceptions.ConnectionError(
+        MaxRetryError(None, "/call", NewConnectionError(None, "Connection refused"))
+    )
+
+
+def reset():
+    return requests.exceptions.ConnectionError(
+        ProtocolError("Connection aborted.", ConnectionResetError(104, "Connection reset by peer"))
+    )
+
+
+class VapiClientRetryTests(SimpleTestCase):
+    def setUp(self):
+        self.session = mock.Mock()
+        for target, value in (
+            ("api.vapi_client.get_session", mock.Mock(return_value=self.session)),
+            ("api.vapi_client.provider", mock.Mock(return_value=Provider("vapi"))),
+            ("api.vapi_client.time.sleep", mock.Mock()),
+        ):
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = VapiClient("test-key", max_retries=2, backoff=0)
+
+    def test_refused_connect_is_retried_for_a_post(self):
+        self.session.request.side_effect = [refused(), response(201, {"id": "call-1"})]
+
+        self.assertEqual(self.client.create_call({}), {"id": "call-1"})
+        self.assertEqual(self.session.request.call_count, 2)
+
+    def test_connect_timeout_is_retried_for_a_post(self):
+        self.session.request.side_effect = [requests.exceptions.ConnectTimeout(), response(201, {"id": "call-1"})]
+
+        self.assertEqual(self.client.create_call({}), {"id": "call-1"})
+
+    def test_post_dropped_mid_request_is_not_resent(self):
+        self.session.request.side_effect = [reset(), response(201)]
+
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self.client.create_call({})
+        self.assertEqual(self.session.request.call_count, 1)
+
+    def test_get_dropped_mid_request_is_retried(self):
+        self.session.request.side_effect = [reset(), response(200, {"id": "call-1"})]
+
+        self.assertEqual(self.client.get_call("call-1"), {"id": "call-1"})
+
+    def test_post_upstream_error_is_not_resent(self):
+        self.session.request.side_effect = [response(502), response(201)]
+
+        with self.assertRaises(VapiAPIError) as raised:
+            self.client.create_call({})
+        self.assertEqual(raised.exception.status_code, 502)
+        self.assertEqual(self.session.request.call_count, 1)
+
+    def test_rate_limited_post_is_retried(self):
+        self.session.request.side_effect = [response(429), response(201, {"id": "call-1"})]
+
+        self.assertEqual(self.client.create_call({}), {"id": "call-1"})
+
+    def test_last_error_is_raised_when_retries_run_out(self):
+        self.session.request.side_effect = [refused(), refused(), refused()]
+
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self.client.create_call({})
+        self.assertEqual(self.session.request.call_count, 3)
+
+
+class VapiCircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.session = mock.Mock()
+        self.vapi = Provider("vapi", min_calls=4, window=4, failure_rate=0.5)
+        for target, value in (
+            ("api.vapi_client.get_session", mock.Mock(return_value=self.session)),
+            ("api.vapi_client.provider", mock.Mock(return_value=self.vapi)),
+        ):
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = VapiClient("test-key", max_retries=0)
+
+    def send(self, reply):
+        self.session.request.side_effect = [reply]
+        try:
+            self.client.get_call("call-1")
+        except (VapiAPIError, requests.exceptions.RequestException):
+            pass
+
+    def test_rate_limits_do_not_open_the_breaker(self):
+        for _ in range(4):
+            self.send(response(429))
+
+        self.assertEqual(self.vapi.breaker.state, "closed")
+
+    def test_client_errors_do_not_open_the_breaker(self):
+        for _ in range(4):
+            self.send(response(404))
+
+        self.assertEqual(self.vapi.breaker.state, "closed")
+
+    def test_upstream_and_network_errors_open_the_breaker(self):
+        self.send(response(502))
+        self.send(response(500))
+        self.send(reset())
+        self.send(response(200))
+
+        self.assertEqual(self.vapi.breaker.state, "open")
@@ -0,0 +1,33 @@
+from django.test import TestCase
+
+from api.models import WebhookDelivery
+from api.webhook_dedup import DeliveryDeduplicator, delivery_key
+
+
+class WebhookDedupTests(TestCase):
+    message = {"type": "status-update", "timestamp": 1700000000000, "call": {"id": "call-1"}}
+
+    def test_delivery_key_identifies_the_delivery(self):
+        self.assertEqual(delivery_key("status-update", dict(self.message)), delivery_key("status-update", self.message))
+        later = dict(self.message, timestamp=1700000000001)
+        self.assertNotEqual(delivery_key("status-update", later), delivery_key("status-update", self.message))
+        self.assertNotEqual(delivery_key("end-of-call-report", self.message), delivery_key("status-update", self.message))
+
+    def test_repeated_delivery_is_dropped(self):
+        key = delivery_key("status-update", self.message)
+        deduplicator = DeliveryDeduplicator()
+
+        self.assertTrue(deduplicator.claim(key, "call-1", "status-update"))
+        self.assertFalse(deduplicator.claim(key, "call-1", "status-update"))
+        # Another worker has not seen the key in memory; the unique index catches it
+        self.assertFalse(DeliveryDeduplicator().claim(key, "call-1", "status-update"))
+        self.assertEqual(WebhookDelivery.objects.filter(delivery_key=key).count(), 1)
+
+    def test_released_delivery_is_accepted_again(self):
+        key = delivery_key("status-update", self.message)
+        deduplicator = DeliveryDeduplicator()
+        deduplicator.claim(key)
+
+        deduplicator.release(key)
+
+        self.assertTrue(deduplicator.claim(key))
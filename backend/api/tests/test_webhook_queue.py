@@ -0,0 +1,92 @@
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+
+from api.models import WebhookEvent
+from api.webhook_queue import (
+    claim_webhook_events,
+    enqueue_webhook_event,
+    process_webhook_event,
+    release_webhook_event,
+)
+
+
+def status_update(vapi_call_id, status="in-progress"):
+    return {"message": {"type": "status-update", "status": status, "call": {"id": vapi_call_id}}}
+
+
+@override_settings(WEBHOOK_QUEUE_MAX_ATTEMPTS=2)
+@mock.patch("api.views.save_webhook_event")
+class WebhookQueueTests(TestCase):
+    def enqueue(self, vapi_call_id="call-1"):
+        return enqueue_webhook_event("status-update", vapi_call_id, status_update(vapi_call_id))
+
+    def test_claims_are_disjoint_and_oldest_first(self, save_webhook_event):
+        events = [self.enqueue(f"call-{i}") for i in range(5)]
+
+        first = claim_webhook_events(batch_size=3)
+        second = claim_webhook_events(batch_size=3)
+
+        self.assertEqual([e.id for e in first], [e.id for e in events[:3]])
+        self.assertEqual([e.id for e in second], [e.id for e in events[3:]])
+        self.assertEqual(claim_webhook_events(), [])
+        self.assertTrue(all(e.status == "processing" and e.attempts == 1 for e in first + second))
+
+    def test_claim_only_takes_the_given_shards(self, save_webhook_event):
+        event = self.enqueue()
+
+        self.assertEqual(claim_webhook_events(shards=[event.shard + 1]), [])
+        self.assertEqual([e.id for e in claim_webhook_events(shards=[event.shard])], [event.id])
+
+    def test_released_event_is_claimed_again_without_using_an_attempt(self, save_webhook_event):
+        self.enqueue()
+        event = claim_webhook_events()[0]
+
+        release_webhook_event(event)
+
+        self.assertEqual(claim_webhook_events()[0].attempts, 1)
+
+    def test_transient_error_is_retried_until_attempts_run_out(self, save_webhook_event):
+        self.enqueue()
+        with mock.patch("api.views.process_call_event", side_effect=OperationalError("database is locked")):
+            event = claim_webhook_events()[0]
+            self.assertFalse(process_webhook_event(event))
+            self.assertEqual(WebhookEvent.objects.get(id=event.id).status, "pending")
+
+            event = claim_webhook_events()[0]
+            self.assertFalse(process_webhook_event(event))
+
+        row = WebhookEvent.objects.get(id=event.id)
+        self.assertEqual(row.status, "failed")
+        self.assertEqual(row.attempts, 2)
+
+    def test_unknown_call_fails_without_retry(self, save_webhook_event):
+        self.enqueue("call-nobody-knows")
+        event = claim_webhook_events()[0]
+
+        self.assertFalse(process_webhook_event(event))
+
+        self.assertEqual(event.status, "failed")
+        self.assertEqual(WebhookEvent.objects.get(id=event.id).status, "failed")
+
+    def test_malformed_payload_fails_without_retry(self, save_webhook_event):
+        enqueue_webhook_event("status-update", "call-1", {"message": "not an object"})
+        event = claim_webhook_events()[0]
+
+        self.assertFalse(process_webhook_event(event))
+
+        self.assertEqual(WebhookEvent.objects.get(id=event.id).status, "failed")
+
+    def test_processed_event_is_marked_processed(self, save_webhook_event):
+        self.enqueue()
+        event = claim_webhook_events()[0]
+
+        with mock.patch("api.views.process_call_event") as process_call_event:
+            self.assertTrue(process_webhook_event(event))
+
+        process_call_event.assert_called_once_with("status-update", status_update("call-1")["message"])
+        row = WebhookEvent.objects.get(id=event.id)
+        self.assertEqual(row.status, "processed")
+        self.assertIsNotNone(row.processed_at)
+        self.assertIsNone(row.locked_by)
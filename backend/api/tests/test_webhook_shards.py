@@ -0,0 +1,111 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from api.models import WebhookEvent, WebhookShardLease
+from api.webhook_queue import (
+    acquire_shard_leases,
+    claim_webhook_events,
+    enqueue_webhook_event,
+    release_shard_leases,
+    release_stale_events,
+    reshard_pending_events,
+    shard_for_call,
+)
+
+
+def enqueue(vapi_call_id):
+    return enqueue_webhook_event("status-update", vapi_call_id, {"message": {"call": {"id": vapi_call_id}}})
+
+
+def call_moving_to_another_shard(old_count, new_count):
+    """A call id whose hash shard differs between the two shard counts"""
+    for i in range(1000):
+        vapi_call_id = f"call-{i}"
+        if shard_for_call(vapi_call_id, old_count) >= new_count:
+            return vapi_call_id
+    raise AssertionError("no call id found")
+
+
+class ShardAssignmentTests(TestCase):
+    def test_call_keeps_its_shard_while_it_has_unfinished_events(self):
+        vapi_call_id = call_moving_to_another_shard(8, 2)
+        with override_settings(WEBHOOK_SHARD_COUNT=8):
+            first = enqueue(vapi_call_id)
+
+        with override_settings(WEBHOOK_SHARD_COUNT=2):
+            second = enqueue(vapi_call_id)
+            WebhookEvent.objects.filter(vapi_call_id=vapi_call_id).update(status="processed")
+            third = enqueue(vapi_call_id)
+
+        self.assertEqual(second.shard, first.shard)
+        self.assertEqual(third.shard, shard_for_call(vapi_call_id, 2))
+
+    def test_reshard_moves_a_stranded_call_with_all_its_events(self):
+        vapi_call_id = call_moving_to_another_shard(8, 2)
+        with override_settings(WEBHOOK_SHARD_COUNT=8):
+            events = [enqueue(vapi_call_id) for _ in range(3)]
+
+        moved = reshard_pending_events(2)
+
+        self.assertEqual(moved, 3)
+        shards = set(WebhookEvent.objects.filter(id__in=[e.id for e in events]).values_list("shard", flat=True))
+        self.assertEqual(shards, {shard_for_call(vapi_call_id, 2)})
+
+    def test_reshard_leaves_a_call_that_is_being_processed(self):
+        vapi_call_id = call_moving_to_another_shard(8, 2)
+        with override_settings(WEBHOOK_SHARD_COUNT=8):
+            first = enqueue(vapi_call_id)
+            enqueue(vapi_call_id)
+        WebhookEvent.objects.filter(id=first.id).update(status="processing")
+
+        self.assertEqual(reshard_pending_events(2), 0)
+
+        WebhookEvent.objects.filter(id=first.id).update(status="processed")
+        self.assertEqual(reshard_pending_events(2), 1)
+
+
+class ShardLeaseTests(TestCase):
+    def test_two_processes_split_the_shards(self):
+        first = acquire_shard_leases("host-a:1", [0, 1, 2, 3])
+        second = acquire_shard_leases("host-b:1", [0, 1, 2, 3, 4, 5])
+
+        self.assertEqual(first, [0, 1, 2, 3])
+        self.assertEqual(second, [4, 5])
+        self.assertEqual(acquire_shard_leases("host-a:1", [0, 1, 2, 3]), [0, 1, 2, 3])
+
+    def test_expired_and_released_leases_are_taken_over(self):
+        acquire_shard_leases("host-a:1", [0, 1])
+        WebhookShardLease.objects.filter(shard=0).update(expires_at=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(acquire_shard_leases("host-b:1", [0, 1]), [0])
+
+        release_shard_leases("host-a:1")
+        self.assertEqual(acquire_shard_leases("host-b:1", [0, 1]), [0, 1])
+
+    def test_only_leased_shards_are_claimed(self):
+        events = {shard_for_call(f"call-{i}"): enqueue(f"call-{i}") for i in range(50)}
+        owned, other = sorted(events)[:2]
+        acquire_shard_leases("host-a:1", [owned])
+
+        claimed = claim_webhook_events(batch_size=100, owner="host-a:1")
+
+        self.assertTrue(claimed)
+        self.assertEqual({event.shard for event in claimed}, {owned})
+        self.assertNotIn(events[other].id, [event.id for event in claimed])
+
+    def test_renewal_keeps_in_flight_events_from_being_released(self):
+        acquire_shard_leases("host-a:1", list(range(8)))
+        enqueue("call-1")
+        enqueue("call-2")
+        running, abandoned = claim_webhook_events(owner="host-a:1")
+        long_ago = timezone.now() - timedelta(hours=1)
+        WebhookEvent.objects.update(locked_at=long_ago)
+        WebhookEvent.objects.filter(id=abandoned.id).update(locked_by="crashed-host:1/abc")
+
+        acquire_shard_leases("host-a:1", list(range(8)))
+
+        self.assertEqual(release_stale_events(300), 1)
+        self.assertEqual(WebhookEvent.objects.get(id=running.id).status, "processing")
+        self.assertEqual(WebhookEvent.objects.get(id=abandoned.id).status, "pending")
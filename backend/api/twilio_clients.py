@@ -0,0 +1,44 @@
+"""
+Shared Twilio REST clients.
+
+Building a twilio.rest.Client per request also builds a new HTTP session,
+so every request paid for a fresh TLS connection. Clients are cached per
+account SID (and auth token, so a rotated token gets a new client) with a
+pooled TwilioHttpClient whose keep-alive connections are reused.
+"""
+
+import hashlib
+import os
+import threading
+
+from django.conf import settings
+from twilio.http.http_client import TwilioHttpClient
+from twilio.rest import Client
+
+_clients = {}
+_clients_lock = threading.Lock()
+_clients_pid = None
+
+
+def get_twilio_client(account_sid, auth_token):
+    """Cached client for a Twilio account"""
+    global _clients, _clients_pid
+    key = (account_sid, hashlib.sha256(auth_token.encode()).hexdigest())
+    with _clients_lock:
+        if _clients_pid != os.getpid():
+            # Sockets must not be shared with a parent process after fork
+            _clients, _clients_pid = {}, os.getpid()
+        client = _clients.get(key)
+        if client is None:
+            # Drop the client for a previous token of the same account
+            for stale in [k for k in _clients if k[0] == account_sid]:
+                del _clients[stale]
+            http_client = TwilioHttpClient(pool_connections=True, timeout=settings.TWILIO_TIMEOUT)
+            client = Client(account_sid, auth_token, http_client=http_client)
+            _clients[key] = client
+        return client
+
+
+def client_for_config(config):
+    """Cached client for an APIConfiguration with Twilio credentials"""
+    return get_twilio_client(config.twilio_account_sid, config.twilio_auth_token)
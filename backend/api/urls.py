@@ -1,5 +1,6 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
 
 from rest_framework_simplejwt.views import (
     TokenRefreshView,
@@ -26,7 +27,9 @@ urlpatterns = [
     # Phone number endpoints
     path(
         "phone-numbers/",
-        views.VapiPhoneNumbersView.as_view(),
+        async_views.phone_numbers_view
+        if settings.ASYNC_PROVIDER_VIEWS
+        else views.VapiPhoneNumbersView.as_view(),
         name="vapi_phone_numbers",
     ),
     path(
@@ -50,11 +53,24 @@ urlpatterns = [
         name="phone_number_detail",
     ),
     # Call endpoints
-    path("make-call/", views.MakeCallView.as_view(), name="make_call"),
-    path("call/<str:call_id>/", views.CallDetailView.as_view(), name="call_detail"),
+    path(
+        "make-call/",
+        async_views.make_call_view
+        if settings.ASYNC_PROVIDER_VIEWS
+        else views.MakeCallView.as_view(),
+        name="make_call",
+    ),
+    path(
+        "call/<str:call_id>/",
+        async_views.call_detail_view
+        if settings.ASYNC_PROVIDER_VIEWS
+        else views.CallDetailView.as_view(),
+        name="call_detail",
+    ),
     path("calls/", views.CallListView.as_view(), name="call_list"),
     # Scheduled call endpoints
     path("schedule-call/", views.ScheduleCallView.as_view(), name="schedule_call"),
+    path("schedule-call/import/", views.ScheduleCallImportView.as_view(), name="schedule_call_import"),
     path("scheduled-calls/", views.ScheduledCallListView.as_view(), name="scheduled_call_list"),
     path("scheduled-call/<int:call_id>/", views.ScheduledCallDetailView.as_view(), name="scheduled_call_detail"),
     path("execute-scheduled-calls/", views.ExecuteScheduledCallsView.as_view(), name="execute_scheduled_calls"),
@@ -66,6 +82,8 @@ urlpatterns = [
     path("process-transcript/", views.ProcessTranscriptView.as_view(), name="process_transcript"),
     # VAPI webhook endpoint
     path("webhook/vapi/", views.vapi_webhook_view, name="vapi_webhook"),
+    # Metrics endpoint
+    path("metrics/", views.MetricsView.as_view(), name="metrics"),
     # Routes listing
     path("", views.getRoutes, name="routes"),
 ]
@@ -0,0 +1,365 @@
+"""
+Shared client for the Vapi REST API.
+
+One pooled requests.Session is kept per API key, so keep-alive connections
+are reused across requests instead of paying a TCP+TLS handshake each time.
+Every request has connect/read timeouts (VAPI_CONNECT_TIMEOUT,
+VAPI_READ_TIMEOUT). Rate limits (429) and transient upstream failures are
+retried with exponential backoff:
+
+- GET and PATCH retry on 429, 5xx, timeouts and connection errors.
+- POST creates things (calls, assistants, numbers), so it only retries when
+  the request provably did not go through: 429 or a failed connect.
+
+Non-2xx responses raise VapiAPIError carrying Vapi's status code and message.
+Each attempt runs under the "vapi" circuit breaker and bulkhead
+(api.resilience). Only 5xx responses and network failures count against
+the breaker: a 429 is one account's rate limit, and the breaker is shared
+by every account. A rejected attempt raises VapiAPIError with status 503,
+chained from the ProviderUnavailable so callers can tell it from a 503
+sent by Vapi.
+Network failures that survive the retries propagate as requests exceptions.
+
+The phone number list is cached per API key for VAPI_PHONE_NUMBERS_CACHE_TTL
+seconds in Django's cache; creating or updating a number through the client
+drops the cached list.
+
+AsyncVapiClient has the same interface and retry rules with awaitable
+methods, for async views running under ASGI. It uses one httpx.AsyncClient
+per API key and event loop (pool size VAPI_ASYNC_POOL_SIZE); its network
+failures propagate as httpx exceptions.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import threading
+import time
+import weakref
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from api.resilience import ProviderUnavailable, provider
+
+logger = logging.getLogger(__name__)
+
+VAPI_BASE_URL = "https://api.vapi.ai"
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "PATCH", "PUT", "DELETE"}
+MAX_RETRY_AFTER_SECONDS = 30
+
+
+class VapiAPIError(requests.exceptions.RequestException):
+    """Vapi answered with an error status or an unreadable body"""
+
+    def __init__(self, message, status_code=None, response_data=None):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.response_data = response_data
+
+    def __str__(self):
+        if self.status_code:
+            return f"{self.message} (HTTP {self.status_code})"
+        return str(self.message)
+
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+_sessions_pid = None
+
+
+def get_session(api_key):
+    """Pooled session for an API key, shared by every client using that key"""
+    global _sessions, _sessions_pid
+    with _sessions_lock:
+        if _sessions_pid != os.getpid():
+            # Sockets must not be shared with a parent process after fork
+            _sessions, _sessions_pid = {}, os.getpid()
+        session = _sessions.get(api_key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=4, pool_maxsize=settings.VAPI_POOL_SIZE, max_retries=0
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update(
+                {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+            )
+            _sessions[api_key] = session
+        return session
+
+
+_async_sessions = weakref.WeakKeyDictionary()
+
+
+def get_async_session(api_key):
+    """Pooled httpx.AsyncClient for an API key on the running event loop"""
+    import httpx
+
+    loop = asyncio.get_running_loop()
+    clients = _async_sessions.setdefault(loop, {})
+    client = clients.get(api_key)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            headers={"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"},
+            limits=httpx.Limits(
+                max_connections=settings.VAPI_ASYNC_POOL_SIZE,
+                max_keepalive_connections=settings.VAPI_ASYNC_POOL_SIZE,
+            ),
+        )
+        clients[api_key] = client
+    return client
+
+
+PHONE_NUMBERS_CACHE_PREFIX = "vapi-phone-numbers:"
+
+
+def _phone_numbers_cache_key(api_key):
+    # Never put the key itself in a cache key
+    return PHONE_NUMBERS_CACHE_PREFIX + hashlib.sha256(api_key.encode()).hexdigest()[:32]
+
+
+def get_cached_phone_numbers(api_key):
+    try:
+        return cache.get(_phone_numbers_cache_key(api_key))
+    except Exception as e:
+        logger.warning("Phone number cache unavailable: %s", e)
+        return None
+
+
+def cache_phone_numbers(api_key, phone_numbers):
+    if settings.VAPI_PHONE_NUMBERS_CACHE_TTL <= 0:
+        return
+    try:
+        cache.set(_phone_numbers_cache_key(api_key), phone_numbers, settings.VAPI_PHONE_NUMBERS_CACHE_TTL)
+    except Exception as e:
+        logger.warning("Phone number cache unavailable: %s", e)
+
+
+def invalidate_phone_numbers(api_key):
+    try:
+        cache.delete(_phone_numbers_cache_key(api_key))
+    except Exception as e:
+        logger.warning("Phone number cache unavailable: %s", e)
+
+
+def connect_failed(exc):
+    """Whether a requests exception means no connection was made, so nothing was sent"""
+    if isinstance(exc, requests.exceptions.ConnectTimeout):
+        return True
+    # requests wraps urllib3's MaxRetryError, whose reason is the underlying error
+    reason = getattr(exc.args[0], "reason", None) if exc.args else None
+    return isinstance(exc, requests.exceptions.ConnectionError) and isinstance(reason, NewConnectionError)
+
+
+def _unavailable(error):
+    """VapiAPIError for a call rejected by the Vapi circuit breaker or bulkhead"""
+    return VapiAPIError(str(error), 503, {"retryAfter": error.retry_after})
+
+
+def _error_message(response, data):
+    if isinstance(data, dict) and data.get("message"):
+        return data["message"]
+    return response.text
+
+
+class VapiClient:
+    def __init__(self, api_key, timeout=None, max_retries=None, backoff=None, base_url=VAPI_BASE_URL):
+        if not api_key:
+            raise ValueError("A Vapi API key is required")
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = timeout or (settings.VAPI_CONNECT_TIMEOUT, settings.VAPI_READ_TIMEOUT)
+        self.max_retries = settings.VAPI_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff = settings.VAPI_RETRY_BACKOFF if backoff is None else backoff
+
+    @property
+    def session(self):
+        return get_session(self.api_key)
+
+    def _retry_delay(self, attempt, response=None):
+        if response is not None and response.headers.get("Retry-After"):
+            try:
+                return min(float(response.headers["Retry-After"]), MAX_RETRY_AFTER_SECONDS)
+            except ValueError:
+                pass
+        return self.backoff * 2 ** attempt * (1 + random.random() / 2)
+
+    def request(self, method, path, json=None, params=None):
+        """Send a request and return the decoded JSON body"""
+        method = method.upper()
+        url = f"{self.base_url}{path}"
+        idempotent = method in IDEMPOTENT_METHODS
+
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                with provider("vapi").guard() as call:
+                    response = self.session.request(
+                        method, url, json=json, params=params, timeout=self.timeout
+                    )
+                    call.failed = response.status_code >= 500
+            except ProviderUnavailable as e:
+                raise _unavailable(e) from e
+            except requests.exceptions.ConnectTimeout as e:
+                retry, error = True, e
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError) as e:
+                # Unless the connect itself failed, the request may have reached
+                # Vapi; only safe to resend if idempotent
+                retry, error = idempotent or connect_failed(e), e
+            else:
+                if response.status_code in RETRYABLE_STATUS_CODES and not last_attempt:
+                    if response.status_code == 429 or idempotent:
+                        delay = self._retry_delay(attempt, response)
+                        logger.warning(
+                            "Vapi %s %s returned %s, retrying in %.1fs",
+                            method, path, response.status_code, delay,
+                        )
+                        time.sleep(delay)
+                        continue
+                return self._parse(response, method, path)
+
+            if not retry or last_attempt:
+                raise error
+            delay = self._retry_delay(attempt)
+            logger.warning("Vapi %s %s failed (%s), retrying in %.1fs", method, path, error, delay)
+            time.sleep(delay)
+
+    def _parse(self, response, method, path):
+        logger.debug("Vapi %s %s -> %s", method, path, response.status_code)
+        # Works for both requests and httpx responses
+        ok = 200 <= response.status_code < 300
+        try:
+            data = response.json() if response.content else None
+        except ValueError:
+            if ok:
+                raise VapiAPIError(f"Invalid JSON response from Vapi API: {response.text[:500]}")
+            data = None
+        if not ok:
+            raise VapiAPIError(_error_message(response, data), response.status_code, data)
+        return data
+
+    # Calls
+
+    def create_call(self, payload):
+        return self.request("POST", "/call", json=payload)
+
+    def get_call(self, call_id):
+        return self.request("GET", f"/call/{call_id}")
+
+    def list_calls(self, **params):
+        return self.request("GET", "/call", params=params or None)
+
+    # Assistants
+
+    def create_assistant(self, payload):
+        return self.request("POST", "/assistant", json=payload)
+
+    # Phone numbers
+
+    def list_phone_numbers(self, use_cache=False):
+        if use_cache:
+            phone_numbers = get_cached_phone_numbers(self.api_key)
+            if phone_numbers is not None:
+                return phone_numbers
+        phone_numbers = self.request("GET", "/phone-number")
+        cache_phone_numbers(self.api_key, phone_numbers)
+        return phone_numbers
+
+    def create_phone_number(self, payload):
+        try:
+            return self.request("POST", "/phone-number", json=payload)
+        finally:
+            invalidate_phone_numbers(self.api_key)
+
+    def update_phone_number(self, phone_number_id, payload):
+        try:
+            return self.request("PATCH", f"/phone-number/{phone_number_id}", json=payload)
+        finally:
+            invalidate_phone_numbers(self.api_key)
+
+
+class AsyncVapiClient(VapiClient):
+    """VapiClient for async code; every API method is a coroutine"""
+
+    @property
+    def session(self):
+        return get_async_session(self.api_key)
+
+    async def request(self, method, path, json=None, params=None):
+        """Send a request and return the decoded JSON body"""
+        import httpx
+
+        method = method.upper()
+        url = f"{self.base_url}{path}"
+        idempotent = method in IDEMPOTENT_METHODS
+        connect_timeout, read_timeout = self.timeout
+        timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                async with provider("vapi").guard_async() as call:
+                    response = await self.session.request(
+                        method, url, json=json, params=params, timeout=timeout
+                    )
+                    call.failed = response.status_code >= 500
+            except ProviderUnavailable as e:
+                raise _unavailable(e) from e
+            except (httpx.ConnectTimeout, httpx.ConnectError) as e:
+                retry, error = True, e
+            except (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError) as e:
+                # The request may have reached Vapi; only safe to resend if idempotent
+                retry, error = idempotent, e
+            else:
+                if response.status_code in RETRYABLE_STATUS_CODES and not last_attempt:
+                    if response.status_code == 429 or idempotent:
+                        delay = self._retry_delay(attempt, response)
+                        logger.warning(
+                            "Vapi %s %s returned %s, retrying in %.1fs",
+                            method, path, response.status_code, delay,
+                        )
+                        await asyncio.sleep(delay)
+                        continue
+                return self._parse(response, method, path)
+
+            if not retry or last_attempt:
+                raise error
+            delay = self._retry_delay(attempt)
+            logger.warning("Vapi %s %s failed (%s), retrying in %.1fs", method, path, error, delay)
+            await asyncio.sleep(delay)
+
+    # The inherited call and assistant helpers return the request()
+    # coroutine, so `await client.get_call(call_id)` works as is. The phone
+    # number helpers touch the cache around the request and are redefined.
+
+    async def list_phone_numbers(self, use_cache=False):
+        if use_cache:
+            phone_numbers = await sync_to_async(get_cached_phone_numbers)(self.api_key)
+            if phone_numbers is not None:
+                return phone_numbers
+        phone_numbers = await self.request("GET", "/phone-number")
+        await sync_to_async(cache_phone_numbers)(self.api_key, phone_numbers)
+        return phone_numbers
+
+    async def create_phone_number(self, payload):
+        try:
+            return await self.request("POST", "/phone-number", json=payload)
+        finally:
+            await sync_to_async(invalidate_phone_numbers)(self.api_key)
+
+    async def update_phone_number(self, phone_number_id, payload):
+        try:
+            return await self.request("PATCH", f"/phone-number/{phone_number_id}", json=payload)
+        finally:
+            await sync_to_async(invalidate_phone_numbers)(self.api_key)
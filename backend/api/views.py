@@ -1,12 +1,15 @@
 from django.shortcuts import render
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
+from django.utils import timezone
 from django.contrib.auth.models import User
 from django.http import JsonResponse
+from django.db import IntegrityError, transaction
+from django.db.models import Max, Prefetch, Q
 from rest_framework import status, generics
 from rest_framework.decorators import api_view, permission_classes, authentication_classes
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.authentication import SessionAuthentication
 from rest_framework_simplejwt.authentication import JWTAuthentication
@@ -33,14 +36,27 @@ from .models import (
     PhoneNumber,
     InterviewCall,
     ScheduledCall,
+    TranscriptSegment,
 )
+from . import call_detail_cache, schedule_import
+from .call_cache import CallRoute, call_route_cache
+from .dispatch import dispatch_due_calls
+from .event_log import SegmentedEventLog
+from .log_utils import log_payload
+from .metrics import metrics
+from .post_call_jobs import enqueue_post_call_job
+from .resilience import ProviderUnavailable, provider
+from .twilio_clients import client_for_config as twilio_client_for_config
+from .vapi_client import VapiAPIError, VapiClient
+from .webhook_dedup import delivery_key, webhook_deduplicator
+from .webhook_queue import enqueue_webhook_event
 import json
 import logging
 import requests
 import os
 import time
 from dotenv import load_dotenv
-from twilio.rest import Client
+from urllib.parse import parse_qs, urlencode, urlparse
 from datetime import datetime
 
 # Custom authentication class that disables CSRF for webhooks
@@ -65,37 +81,70 @@ WEBHOOK_LOG_FOLDER = os.path.join(settings.BASE_DIR, 'webhook_logs')
 if not os.path.exists(WEBHOOK_LOG_FOLDER):
     os.makedirs(WEBHOOK_LOG_FOLDER, exist_ok=True)
 
+webhook_event_log = SegmentedEventLog(
+    WEBHOOK_LOG_FOLDER,
+    max_segment_bytes=settings.WEBHOOK_LOG_SEGMENT_BYTES,
+    flush_events=settings.WEBHOOK_LOG_FLUSH_EVENTS,
+    flush_interval=settings.WEBHOOK_LOG_FLUSH_INTERVAL,
+)
+
 
 def save_webhook_event(event_type, event):
     """
-    Save webhook event data to a JSON file for debugging and auditing
+    Append webhook event data to the segmented event log for debugging and auditing.
+    Use `python manage.py webhook_log --call-id <id>` to read a call's events back.
     """
     try:
-        os.makedirs(WEBHOOK_LOG_FOLDER, exist_ok=True)
-        
-        # Use event id or timestamp to create a unique filename
-        event_name = event_type.replace('.', '_')
-        event_id = event.get('id', 'no_event_id')
-        
-        # Add timestamp to make the filename even more unique
-        timestamp = time.strftime('%Y%m%d_%H%M%S')
-        
-        # Construct filename
-        filename = f"{event_name}_{event_id}_{timestamp}.json"
-        filepath = os.path.join(WEBHOOK_LOG_FOLDER, filename)
-        
-        # Write the event data to the file
-        with open(filepath, 'w') as f:
-            json.dump(event, f, indent=4)
-
-        logger.info(f"Webhook event saved to: {filepath}")
-        return filepath
-        
+        return webhook_event_log.append(event_type, event)
     except Exception as e:
-        logger.error(f"Failed to save webhook event: {str(e)}")
+        logger.error("Failed to save webhook event: %s", e)
         return None
 
 
+def vapi_error_body(e, prefix="Vapi API error"):
+    """Error body and status for a VapiAPIError, passing Vapi's status code through"""
+    if e.status_code:
+        return {"error": f"{prefix} ({e.status_code}): {e.message}"}, e.status_code
+    return {"error": f"{prefix}: {e.message}"}, status.HTTP_502_BAD_GATEWAY
+
+
+def vapi_error_response(e, prefix="Vapi API error"):
+    """Response for a VapiAPIError, passing Vapi's status code through"""
+    body, status_code = vapi_error_body(e, prefix)
+    response = Response(body, status=status_code)
+    if isinstance(e.response_data, dict) and e.response_data.get("retryAfter"):
+        response["Retry-After"] = str(e.response_data["retryAfter"])
+    return response
+
+
+def provider_unavailable_response(e):
+    """503 for a provider call rejected by its circuit breaker or bulkhead"""
+    response = Response({"error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    if e.retry_after:
+        response["Retry-After"] = str(e.retry_after)
+    return response
+
+
+class ProxyRequestError(Exception):
+    """A request to a provider-proxy view that is rejected before calling the provider"""
+
+    def __init__(self, body, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(body)
+        self.body = body
+        self.status_code = status_code
+
+
+def enqueue_post_call_jobs(call):
+    """Queue the recording download and transcript processing a call still needs"""
+    if call.recording_url and not call.recording_file:
+        enqueue_post_call_job(call, "download_recording", {"recording_url": call.recording_url})
+    if (call.transcript_text and
+        call.assistant and
+        call.assistant.knowledge_text and
+        not call.processed_transcript):
+        enqueue_post_call_job(call, "process_transcript")
+
+
 class MyTokenObtainPairView(TokenObtainPairView):
     serializer_class = MyTokenObtainPairSerializer
 
@@ -132,10 +181,19 @@ def getRoutes(request):
         "/api/elevenlabs-voices/",
         "/api/process-transcript/",
         "/api/webhook/vapi/",
+        "/api/metrics/",
     ]
     return Response(routes)
 
 
+class MetricsView(APIView):
+    """In-process counters and gauges for this worker (admin only)"""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(metrics.snapshot())
+
+
 # Campaign view
 @api_view(["GET", "POST"])
 @permission_classes([IsAuthenticated])
@@ -229,10 +287,9 @@ class APIConfigurationView(APIView):
             # Test Twilio configuration
             if config.is_twilio_configured:
                 try:
-                    twilio_client = Client(
-                        config.twilio_account_sid, config.twilio_auth_token
-                    )
-                    account = twilio_client.api.account.fetch()
+                    twilio_client = twilio_client_for_config(config)
+                    with provider("twilio").guard():
+                        account = twilio_client.api.account.fetch()
                     result["twilio_status"] = (
                         f"Connected to Twilio account: {account.friendly_name}"
                     )
@@ -292,7 +349,6 @@ class CreateAssistantView(APIView):
                 return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
             data = serializer.validated_data
-            print(f"Received data: {data}")
             assistant_name = data.get("name", "AI Assistant").strip() or "AI Assistant"
             voice_provider = data.get("voice_provider", "openai").strip() or "openai"
             voice_id = data.get("voice_id", "nova").strip() or "nova"
@@ -320,14 +376,10 @@ class CreateAssistantView(APIView):
                     )
 
             logger.info(
-                f"Received data: name='{assistant_name}', voice_provider='{voice_provider}', voice_id='{voice_id}', model_provider='{model_provider}', model='{model}', first_message='{first_message}'"
+                "Creating assistant name=%r voice=%s/%s model=%s/%s",
+                assistant_name, voice_provider, voice_id, model_provider, model,
             )
 
-            headers = {
-                "Authorization": f"Bearer {vapi_key}",
-                "Content-Type": "application/json",
-            }
-
             # Use custom system prompt if provided, otherwise use default
             if system_prompt.strip():
                 system_message = system_prompt
@@ -394,39 +446,9 @@ class CreateAssistantView(APIView):
                     }
                 )
 
-            logger.info(f"Creating assistant with payload: {payload}")
-            response = requests.post(
-                "https://api.vapi.ai/assistant", headers=headers, json=payload
-            )
-
-            logger.info(f"Vapi API response status: {response.status_code}")
-
-            try:
-                response_data = response.json()
-                logger.info(f"Vapi API response body: {response_data}")
-            except ValueError as e:
-                logger.error(f"Failed to parse JSON response: {e}")
-                logger.error(f"Raw response text: {response.text}")
-                return Response(
-                    {"error": f"Invalid JSON response from Vapi API: {response.text}"},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                )
-
-            if not response.ok:
-                error_message = (
-                    response_data.get("message", response.text)
-                    if response_data
-                    else response.text
-                )
-                logger.error(
-                    f"Vapi API error: {response.status_code} - {error_message}"
-                )
-                return Response(
-                    {
-                        "error": f"Vapi API error ({response.status_code}): {error_message}"
-                    },
-                    status=response.status_code,
-                )
+            log_payload(logger, "vapi", "Create assistant payload", payload)
+            response_data = VapiClient(vapi_key).create_assistant(payload)
+            log_payload(logger, "vapi", "Vapi create assistant response", response_data)
 
             # Save assistant to database
             assistant = InterviewAssistant.objects.create(
@@ -444,9 +466,7 @@ class CreateAssistantView(APIView):
                 configuration=payload,
             )
 
-            logger.info(
-                f"Assistant created successfully. Response keys: {list(response_data.keys()) if response_data else 'None'}"
-            )
+            logger.info("Assistant %s created (vapi id %s)", assistant.id, assistant.vapi_assistant_id)
 
             return Response(
                 {
@@ -454,20 +474,23 @@ class CreateAssistantView(APIView):
                     "assistant_data": response_data,
                     "assistant": InterviewAssistantSerializer(assistant).data,
                     "response_debug": {
-                        "status": response.status_code,
+                        "status": status.HTTP_201_CREATED,
                         "keys": list(response_data.keys()) if response_data else [],
                     },
                 }
             )
 
+        except VapiAPIError as e:
+            logger.error("Error creating assistant: %s", e)
+            return vapi_error_response(e)
         except requests.exceptions.RequestException as e:
-            logger.error(f"Error creating assistant: {e}")
+            logger.error("Error creating assistant: %s", e)
             return Response(
                 {"error": f"Vapi API error: {e}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
         except Exception as e:
-            logger.error(f"Error creating assistant: {str(e)}")
+            logger.error("Error creating assistant: %s", e)
             return Response(
                 {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
@@ -638,14 +661,15 @@ IMPORTANT INSTRUCTIONS:
                 timeout=30.0
             )
             
-            response = client.chat.completions.create(
-                model="gpt-4",
-                messages=[
-                    {"role": "system", "content": "You are a professional transcript analysis agent."},
-                    {"role": "user", "content": processing_prompt}
-                ],
-                temperature=0.3
-            )
+            with provider("openai").guard():
+                response = client.chat.completions.create(
+                    model="gpt-4",
+                    messages=[
+                        {"role": "system", "content": "You are a professional transcript analysis agent."},
+                        {"role": "user", "content": processing_prompt}
+                    ],
+                    temperature=0.3
+                )
             
             return {
                 "success": True,
@@ -791,6 +815,76 @@ class AssistantListView(generics.ListAPIView):
 class VapiPhoneNumbersView(APIView):
     permission_classes = [IsAuthenticated]
 
+    SYNCED_FIELDS = ("phone_number", "friendly_name", "capabilities", "is_active")
+
+    def sync_phone_numbers(self, user, phone_numbers):
+        """
+        Upsert the user's PhoneNumber rows from Vapi's list and add assistant
+        info: one query for the existing rows, then at most one bulk_create
+        (plus a check for numbers it skipped) and one bulk_update.
+        """
+        vapi_ids = [number_data.get("id") for number_data in phone_numbers if number_data.get("id")]
+        existing = {
+            phone_number.vapi_phone_number_id: phone_number
+            for phone_number in PhoneNumber.objects.filter(
+                user=user, vapi_phone_number_id__in=vapi_ids
+            ).select_related("assistant")
+        }
+
+        to_create, to_update = [], []
+        now = timezone.now()
+        for number_data in phone_numbers:
+            values = {
+                "phone_number": number_data.get("number", ""),
+                "friendly_name": number_data.get("name", ""),
+                "capabilities": number_data,
+                "is_active": True,
+            }
+            phone_number_obj = existing.get(number_data.get("id"))
+            if phone_number_obj is None:
+                to_create.append(
+                    PhoneNumber(user=user, vapi_phone_number_id=number_data.get("id"), **values)
+                )
+            elif any(getattr(phone_number_obj, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(phone_number_obj, field, value)
+                phone_number_obj.updated_at = now
+                to_update.append(phone_number_obj)
+
+        if to_create:
+            # A concurrent page load may insert the same numbers first. A
+            # number still registered to another user conflicts too; it is
+            # skipped rather than overwritten, and reported
+            PhoneNumber.objects.bulk_create(to_create, ignore_conflicts=True)
+            skipped = list(
+                PhoneNumber.objects.filter(
+                    vapi_phone_number_id__in=[phone_number.vapi_phone_number_id for phone_number in to_create]
+                ).exclude(user=user).values_list("vapi_phone_number_id", flat=True)
+            )
+            if skipped:
+                metrics.increment("phone_number_sync_skipped", len(skipped))
+                logger.warning(
+                    "Skipped %s Vapi phone numbers for user %s that belong to another user: %s",
+                    len(skipped), user.id, ", ".join(skipped),
+                )
+        if to_update:
+            PhoneNumber.objects.bulk_update(to_update, [*self.SYNCED_FIELDS, "updated_at"])
+
+        # Enrich with assistant information (new rows have no assistant yet)
+        enriched_phone_numbers = []
+        for number_data in phone_numbers:
+            enriched_number = number_data.copy()
+            phone_number_obj = existing.get(number_data.get("id"))
+            if phone_number_obj is not None and phone_number_obj.assistant:
+                enriched_number['assistant'] = phone_number_obj.assistant.vapi_assistant_id
+                enriched_number['assistant_name'] = phone_number_obj.assistant.name
+            else:
+                enriched_number['assistant'] = None
+                enriched_number['assistant_name'] = None
+
+            enriched_phone_numbers.append(enriched_number)
+        return enriched_phone_numbers
+
     def get(self, request):
         try:
             # Get user's API configuration
@@ -808,58 +902,22 @@ class VapiPhoneNumbersView(APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            headers = {
-                "Authorization": f"Bearer {vapi_key}",
-                "Content-Type": "application/json",
-            }
-
-            response = requests.get("https://api.vapi.ai/phone-number", headers=headers)
-            response.raise_for_status()
-
-            phone_numbers = response.json()
-
-            # Create or update PhoneNumber objects for the user and enrich with assistant info
-            enriched_phone_numbers = []
-            for number_data in phone_numbers:
-                phone_number_obj, created = PhoneNumber.objects.get_or_create(
-                    user=request.user,
-                    vapi_phone_number_id=number_data.get("id"),
-                    defaults={
-                        "phone_number": number_data.get("number", ""),
-                        "friendly_name": number_data.get("name", ""),
-                        "capabilities": number_data,
-                        "is_active": True,
-                    }
-                )
-                # Update existing records if needed
-                if not created:
-                    phone_number_obj.phone_number = number_data.get("number", "")
-                    phone_number_obj.friendly_name = number_data.get("name", "")
-                    phone_number_obj.capabilities = number_data
-                    phone_number_obj.is_active = True
-                    phone_number_obj.save()
-
-                # Enrich with assistant information
-                enriched_number = number_data.copy()
-                if phone_number_obj.assistant:
-                    enriched_number['assistant'] = phone_number_obj.assistant.vapi_assistant_id
-                    enriched_number['assistant_name'] = phone_number_obj.assistant.name
-                else:
-                    enriched_number['assistant'] = None
-                    enriched_number['assistant_name'] = None
-                    
-                enriched_phone_numbers.append(enriched_number)
+            phone_numbers = VapiClient(vapi_key).list_phone_numbers(use_cache=True)
 
+            enriched_phone_numbers = self.sync_phone_numbers(request.user, phone_numbers)
             return Response({"success": True, "phone_numbers": enriched_phone_numbers})
 
+        except VapiAPIError as e:
+            logger.error("Error fetching phone numbers: %s", e)
+            return vapi_error_response(e)
         except requests.exceptions.RequestException as e:
-            logger.error(f"Error fetching phone numbers: {e}")
+            logger.error("Error fetching phone numbers: %s", e)
             return Response(
                 {"error": f"Vapi API error: {e}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
         except Exception as e:
-            logger.error(f"Error fetching phone numbers: {str(e)}")
+            logger.error("Error fetching phone numbers: %s", e)
             return Response(
                 {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
@@ -868,6 +926,24 @@ class VapiPhoneNumbersView(APIView):
 class TwilioPhoneNumbersView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @staticmethod
+    def page_cursor(next_page_url):
+        """Opaque cursor for the next page: Twilio's page number and token"""
+        if not next_page_url:
+            return None
+        query = parse_qs(urlparse(next_page_url).query)
+        return urlencode({key: query[key][0] for key in ("Page", "PageToken") if key in query})
+
+    @staticmethod
+    def page_args(cursor):
+        """page() arguments for a cursor from page_cursor(); raises ValueError if malformed"""
+        if not cursor:
+            return {}
+        query = parse_qs(cursor)
+        if "Page" not in query or "PageToken" not in query:
+            raise ValueError("Malformed page cursor")
+        return {"page_number": int(query["Page"][0]), "page_token": query["PageToken"][0]}
+
     def get(self, request):
         try:
             # Get user's API configuration
@@ -878,19 +954,25 @@ class TwilioPhoneNumbersView(APIView):
                         {"error": "Twilio credentials not configured"},
                         status=status.HTTP_400_BAD_REQUEST,
                     )
-                twilio_client = Client(
-                    config.twilio_account_sid, config.twilio_auth_token
-                )
+                twilio_client = twilio_client_for_config(config)
             except APIConfiguration.DoesNotExist:
                 return Response(
                     {"error": "Twilio credentials not configured"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            numbers = twilio_client.incoming_phone_numbers.list()
+            try:
+                page_size = min(max(int(request.query_params.get("page_size", settings.TWILIO_NUMBERS_PAGE_SIZE)), 1), 1000)
+                page_args = self.page_args(request.query_params.get("page"))
+            except ValueError:
+                return Response({"error": "Invalid page or page_size"}, status=status.HTTP_400_BAD_REQUEST)
+
+            # One Twilio page per request; the frontend follows next_page
+            with provider("twilio").guard():
+                page = twilio_client.incoming_phone_numbers.page(page_size=page_size, **page_args)
 
             twilio_numbers = []
-            for number in numbers:
+            for number in page:
                 twilio_numbers.append(
                     {
                         "sid": number.sid,
@@ -905,10 +987,20 @@ class TwilioPhoneNumbersView(APIView):
                     }
                 )
 
-            return Response({"success": True, "twilio_numbers": twilio_numbers})
+            return Response(
+                {
+                    "success": True,
+                    "twilio_numbers": twilio_numbers,
+                    "page_size": page_size,
+                    "next_page": self.page_cursor(page.next_page_url),
+                }
+            )
 
+        except ProviderUnavailable as e:
+            logger.warning("Error fetching Twilio numbers: %s", e)
+            return provider_unavailable_response(e)
         except Exception as e:
-            logger.error(f"Error fetching Twilio numbers: {str(e)}")
+            logger.error("Error fetching Twilio numbers: %s", e)
             return Response(
                 {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
@@ -930,9 +1022,7 @@ class RegisterPhoneNumberView(APIView):
                         status=status.HTTP_400_BAD_REQUEST,
                     )
                 vapi_key = config.vapi_api_key
-                twilio_client = Client(
-                    config.twilio_account_sid, config.twilio_auth_token
-                )
+                twilio_client = twilio_client_for_config(config)
             except APIConfiguration.DoesNotExist:
                 return Response(
                     {"error": "API configuration not found"},
@@ -957,11 +1047,6 @@ class RegisterPhoneNumberView(APIView):
                         status=status.HTTP_400_BAD_REQUEST,
                     )
 
-            headers = {
-                "Authorization": f"Bearer {vapi_key}",
-                "Content-Type": "application/json",
-            }
-
             payload = {
                 "provider": "twilio",
                 "number": phone_number,
@@ -969,40 +1054,10 @@ class RegisterPhoneNumberView(APIView):
                 "twilioAuthToken": config.twilio_auth_token,
             }
 
-            logger.info(f"Registering phone number with Vapi: {payload}")
-            response = requests.post(
-                "https://api.vapi.ai/phone-number", headers=headers, json=payload
-            )
-
-            logger.info(
-                f"Vapi phone number registration response: {response.status_code}"
-            )
-
-            try:
-                response_data = response.json()
-                logger.info(f"Vapi phone number response body: {response_data}")
-            except ValueError as e:
-                logger.error(f"Failed to parse JSON response: {e}")
-                return Response(
-                    {"error": f"Invalid JSON response from Vapi API: {response.text}"},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                )
-
-            if not response.ok:
-                error_message = (
-                    response_data.get("message", response.text)
-                    if response_data
-                    else response.text
-                )
-                logger.error(
-                    f"Vapi API error: {response.status_code} - {error_message}"
-                )
-                return Response(
-                    {
-                        "error": f"Vapi API error ({response.status_code}): {error_message}"
-                    },
-                    status=response.status_code,
-                )
+            # The payload carries the Twilio auth token, so only the number is logged
+            logger.info("Registering phone number %s with Vapi", phone_number)
+            response_data = VapiClient(vapi_key).create_phone_number(payload)
+            log_payload(logger, "vapi", "Vapi phone number response", response_data)
 
             # Save phone number to database
             phone_number_obj = PhoneNumber.objects.create(
@@ -1013,9 +1068,7 @@ class RegisterPhoneNumberView(APIView):
                 friendly_name=response_data.get("name", phone_number),
             )
 
-            logger.info(
-                f"Phone number registered successfully: {response_data.get('id')}"
-            )
+            logger.info("Phone number registered successfully: %s", response_data.get("id"))
 
             return Response(
                 {
@@ -1025,14 +1078,17 @@ class RegisterPhoneNumberView(APIView):
                 }
             )
 
+        except VapiAPIError as e:
+            logger.error("Error registering phone number: %s", e)
+            return vapi_error_response(e)
         except requests.exceptions.RequestException as e:
-            logger.error(f"Error registering phone number: {e}")
+            logger.error("Error registering phone number: %s", e)
             return Response(
                 {"error": f"Vapi API error: {e}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
         except Exception as e:
-            logger.error(f"Error registering phone number: {str(e)}")
+            logger.error("Error registering phone number: %s", e)
             return Response(
                 {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
@@ -1106,11 +1162,6 @@ class PhoneNumberDetailView(APIView):
                     )
 
             # Update VAPI phone number with assistant assignment
-            headers = {
-                "Authorization": f"Bearer {vapi_key}",
-                "Content-Type": "application/json",
-            }
-
             payload = {}
             if assistant:
                 payload["assistantId"] = assistant.vapi_assistant_id
@@ -1118,43 +1169,21 @@ class PhoneNumberDetailView(APIView):
                 # Remove assistant assignment
                 payload["assistantId"] = None
 
-            logger.info(f"Updating VAPI phone number {phone_number.vapi_phone_number_id} with assistant: {payload}")
+            logger.info(
+                "Updating Vapi phone number %s with assistant %s",
+                phone_number.vapi_phone_number_id, payload["assistantId"],
+            )
             
-            response = requests.patch(
-                f"https://api.vapi.ai/phone-number/{phone_number.vapi_phone_number_id}",
-                headers=headers,
-                json=payload
+            response_data = VapiClient(vapi_key).update_phone_number(
+                phone_number.vapi_phone_number_id, payload
             )
-
-            logger.info(f"VAPI phone number update response: {response.status_code}")
-
-            try:
-                response_data = response.json()
-                logger.info(f"VAPI phone number update response body: {response_data}")
-            except ValueError as e:
-                logger.error(f"Failed to parse JSON response: {e}")
-                return Response(
-                    {"error": f"Invalid JSON response from Vapi API: {response.text}"},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                )
-
-            if not response.ok:
-                error_message = (
-                    response_data.get("message", response.text)
-                    if response_data
-                    else response.text
-                )
-                logger.error(f"Vapi API error: {response.status_code} - {error_message}")
-                return Response(
-                    {"error": f"Vapi API error ({response.status_code}): {error_message}"},
-                    status=response.status_code,
-                )
+            log_payload(logger, "vapi", "Vapi phone number update response", response_data)
 
             # Update local phone number record
             phone_number.assistant = assistant
             phone_number.save()
 
-            logger.info(f"Phone number {phone_number.phone_number} assistant assignment updated")
+            logger.info("Phone number %s assistant assignment updated", phone_number.phone_number)
 
             return Response(
                 {
@@ -1164,14 +1193,17 @@ class PhoneNumberDetailView(APIView):
                 }
             )
 
+        except VapiAPIError as e:
+            logger.error("Error updating phone number assistant: %s", e)
+            return vapi_error_response(e)
         except requests.exceptions.RequestException as e:
-            logger.error(f"Error updating phone number assistant: {e}")
+            logger.error("Error updating phone number assistant: %s", e)
             return Response(
                 {"error": f"Vapi API error: {e}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
         except Exception as e:
-            logger.error(f"Error updating phone number assistant: {str(e)}")
+            logger.error("Error updating phone number assistant: %s", e)
             return Response(
                 {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
@@ -1180,6 +1212,68 @@ class PhoneNumberDetailView(APIView):
 class MakeCallView(APIView):
     permission_classes = [IsAuthenticated]
 
+    def prepare_call(self, user, request_data):
+        """Validate the request and build the Vapi payload; raises ProxyRequestError"""
+        serializer = MakeCallSerializer(data=request_data)
+        if not serializer.is_valid():
+            raise ProxyRequestError(serializer.errors)
+
+        data = serializer.validated_data
+        customer_number = data["customer_number"]
+        twilio_phone_number_id = data["twilio_phone_number_id"]
+        vapi_assistant_id = data["vapi_assistant_id"]
+
+        # Verify assistant and phone number belong to user
+        try:
+            assistant = InterviewAssistant.objects.select_related("campaign").get(
+                user=user, vapi_assistant_id=vapi_assistant_id
+            )
+            phone_number = PhoneNumber.objects.select_related("campaign").get(
+                user=user, vapi_phone_number_id=twilio_phone_number_id
+            )
+        except (InterviewAssistant.DoesNotExist, PhoneNumber.DoesNotExist):
+            raise ProxyRequestError(
+                {"error": "Assistant or phone number not found or does not belong to user"}
+            )
+
+        return {
+            "assistant": assistant,
+            "phone_number": phone_number,
+            "customer_number": customer_number,
+            "payload": {
+                "phoneNumberId": twilio_phone_number_id,
+                "assistantId": vapi_assistant_id,
+                "customer": {"number": customer_number},
+            },
+        }
+
+    def record_call(self, user, prepared, response_data):
+        """Save the call Vapi created and build the response body"""
+        assistant = prepared["assistant"]
+        phone_number = prepared["phone_number"]
+        # Use campaign from assistant or phone number (prefer assistant)
+        campaign = assistant.campaign or phone_number.campaign
+        call = InterviewCall.objects.create(
+            user=user,
+            campaign=campaign,
+            vapi_call_id=response_data.get("id"),
+            assistant=assistant,
+            phone_number=phone_number,
+            customer_number=prepared["customer_number"],
+            status=response_data.get("status", "queued"),
+            raw_call_data=response_data,
+        )
+
+        logger.info("Outbound call initiated via Vapi: %s", response_data.get("id"))
+
+        return {
+            "success": True,
+            "call_id": response_data.get("id"),
+            "status": "initiated",
+            "call_data": response_data,
+            "call": InterviewCallSerializer(call).data,
+        }
+
     def post(self, request):
         try:
             # Get user's API configuration
@@ -1199,110 +1293,28 @@ class MakeCallView(APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            serializer = MakeCallSerializer(data=request.data)
-            if not serializer.is_valid():
-                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-            data = serializer.validated_data
-            customer_number = data["customer_number"]
-            twilio_phone_number_id = data["twilio_phone_number_id"]
-            vapi_assistant_id = data["vapi_assistant_id"]
-
-            # Verify assistant and phone number belong to user
             try:
-                assistant = InterviewAssistant.objects.get(
-                    user=request.user, vapi_assistant_id=vapi_assistant_id
-                )
-                phone_number = PhoneNumber.objects.get(
-                    user=request.user, vapi_phone_number_id=twilio_phone_number_id
-                )
-            except (InterviewAssistant.DoesNotExist, PhoneNumber.DoesNotExist):
-                return Response(
-                    {
-                        "error": "Assistant or phone number not found or does not belong to user"
-                    },
-                    status=status.HTTP_400_BAD_REQUEST,
-                )
-
-            headers = {
-                "Authorization": f"Bearer {vapi_key}",
-                "Content-Type": "application/json",
-            }
-
-            payload = {
-                "phoneNumberId": twilio_phone_number_id,
-                "assistantId": vapi_assistant_id,
-                "customer": {"number": customer_number},
-            }
-
-            logger.info(f"Making call with payload: {payload}")
-            response = requests.post(
-                "https://api.vapi.ai/call", headers=headers, json=payload
-            )
+                prepared = self.prepare_call(request.user, request.data)
+            except ProxyRequestError as e:
+                return Response(e.body, status=e.status_code)
 
-            logger.info(f"Vapi call API response status: {response.status_code}")
+            log_payload(logger, "vapi", "Make call payload", prepared["payload"])
+            response_data = VapiClient(vapi_key).create_call(prepared["payload"])
+            log_payload(logger, "vapi", "Vapi call API response", response_data)
 
-            try:
-                response_data = response.json()
-                logger.info(f"Vapi call API response body: {response_data}")
-            except ValueError as e:
-                logger.error(f"Failed to parse JSON response: {e}")
-                logger.error(f"Raw response text: {response.text}")
-                return Response(
-                    {"error": f"Invalid JSON response from Vapi API: {response.text}"},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                )
-
-            if not response.ok:
-                error_message = (
-                    response_data.get("message", response.text)
-                    if response_data
-                    else response.text
-                )
-                logger.error(
-                    f"Vapi call API error: {response.status_code} - {error_message}"
-                )
-                return Response(
-                    {
-                        "error": f"Vapi call API error ({response.status_code}): {error_message}"
-                    },
-                    status=response.status_code,
-                )
-
-            # Save call to database
-            # Use campaign from assistant or phone number (prefer assistant)
-            campaign = assistant.campaign or phone_number.campaign
-            call = InterviewCall.objects.create(
-                user=request.user,
-                campaign=campaign,
-                vapi_call_id=response_data.get("id"),
-                assistant=assistant,
-                phone_number=phone_number,
-                customer_number=customer_number,
-                status=response_data.get("status", "queued"),
-                raw_call_data=response_data,
-            )
-
-            logger.info(f"Outbound call initiated via Vapi: {response_data.get('id')}")
-
-            return Response(
-                {
-                    "success": True,
-                    "call_id": response_data.get("id"),
-                    "status": "initiated",
-                    "call_data": response_data,
-                    "call": InterviewCallSerializer(call).data,
-                }
-            )
+            return Response(self.record_call(request.user, prepared, response_data))
 
+        except VapiAPIError as e:
+            logger.error("Error making Vapi call: %s", e)
+            return vapi_error_response(e, "Vapi call API error")
         except requests.exceptions.RequestException as e:
-            logger.error(f"Error making Vapi call: {e}")
+            logger.error("Error making Vapi call: %s", e)
             return Response(
                 {"error": f"Vapi API error: {e}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
         except Exception as e:
-            logger.error(f"Error making call: {str(e)}")
+            logger.error("Error making call: %s", e)
             return Response(
                 {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
@@ -1328,80 +1340,107 @@ class CallDetailView(APIView):
                     status=status.HTTP_400_BAD_REQUEST,
                 )
 
-            headers = {
-                "Authorization": f"Bearer {vapi_key}",
-                "Content-Type": "application/json",
-            }
+            response_data = self.cached_response(request.user, call_id, vapi_key)
+            if response_data is not None:
+                return Response(response_data)
 
-            logger.info(f"Fetching call details for call ID: {call_id}")
-            response = requests.get(
-                f"https://api.vapi.ai/call/{call_id}", headers=headers
-            )
+            logger.debug("Fetching call details for call ID: %s", call_id)
+            call_data = VapiClient(vapi_key).get_call(call_id)
+            log_payload(logger, "vapi", "Vapi call data", call_data)
 
-            logger.info(f"Vapi get call response status: {response.status_code}")
-
-            try:
-                call_data = response.json()
-                logger.info(
-                    f"Vapi call data keys: {list(call_data.keys()) if call_data else 'None'}"
-                )
-            except ValueError as e:
-                logger.error(f"Failed to parse JSON response: {e}")
-                return Response(
-                    {"error": f"Invalid JSON response from Vapi API: {response.text}"},
-                    status=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                )
-
-            if not response.ok:
-                error_message = (
-                    call_data.get("message", response.text)
-                    if call_data
-                    else response.text
-                )
-                logger.error(
-                    f"Vapi get call API error: {response.status_code} - {error_message}"
-                )
-                return Response(
-                    {
-                        "error": f"Vapi API error ({response.status_code}): {error_message}"
-                    },
-                    status=response.status_code,
-                )
-
-            # Update local call record
-            try:
-                call = InterviewCall.objects.get(
-                    vapi_call_id=call_id, user=request.user
-                )
-                call = self.update_call_from_vapi_data(call, call_data)
-            except InterviewCall.DoesNotExist:
-                call = None
-
-            call_outcome = self.determine_call_outcome(call_data)
-
-            call_info = self.format_call_info(call_data, call_outcome)
-
-            response_data = {"success": True, "call": call_info, "raw_data": call_data}
-
-            if call:
-                response_data["call_db"] = InterviewCallSerializer(call).data
-
-            return Response(response_data)
+            return Response(self.build_response(request.user, call_id, call_data))
 
+        except VapiAPIError as e:
+            logger.error("Error fetching call details: %s", e)
+            return vapi_error_response(e)
         except requests.exceptions.RequestException as e:
-            logger.error(f"Error fetching call details: {e}")
+            logger.error("Error fetching call details: %s", e)
             return Response(
                 {"error": f"Vapi API error: {e}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
         except Exception as e:
-            logger.error(f"Error fetching call details: {str(e)}")
+            logger.error("Error fetching call details: %s", e)
             return Response(
                 {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-    def update_call_from_vapi_data(self, call, call_data):
-        """Update local call record with data from Vapi API"""
+    def is_settled(self, call):
+        """
+        True for a finished call whose final Vapi data is already stored
+        locally. The end-of-call report always stores the ended reason along
+        with the call data; cost and transcript are missing from many reports
+        (an unanswered call has no transcript), so they are not required.
+        """
+        if call.status not in InterviewCall.FINISHED_STATUSES or not call.raw_call_data:
+            return False
+        return call.status == "failed" or bool(call.end_reason)
+
+    def cached_response(self, user, call_id, vapi_key):
+        """
+        Response body that does not need to wait on Vapi, or None. Settled
+        calls are answered from the database; calls in progress from the
+        short-lived call detail cache, refreshed in the background once stale.
+        """
+        if not settings.CALL_DETAIL_LOCAL_FIRST:
+            return None
+        # One query for the ownership check, the settled check and the
+        # serializer's related names
+        call = (
+            InterviewCall.objects.select_related("assistant", "phone_number", "campaign")
+            .filter(vapi_call_id=call_id, user=user)
+            .first()
+        )
+        if call is not None and self.is_settled(call):
+            return self.response_body(call, call.raw_call_data)
+
+        call_data, fresh = call_detail_cache.get(user.id, call_id)
+        if call_data is None:
+            return None
+        if not fresh:
+            call_detail_cache.refresh_in_background(
+                user.id,
+                call_id,
+                lambda: self.build_response(user, call_id, VapiClient(vapi_key).get_call(call_id)),
+            )
+        return self.response_body(call, call_data)
+
+    def build_response(self, user, call_id, call_data):
+        """Sync the local call record with Vapi's data and build the response body"""
+        # Update local call record
+        try:
+            call = InterviewCall.objects.get(vapi_call_id=call_id, user=user)
+            call = self.update_call_from_vapi_data(call, call_data)
+        except InterviewCall.DoesNotExist:
+            call = None
+
+        if settings.CALL_DETAIL_LOCAL_FIRST:
+            call_detail_cache.put(user.id, call_id, call_data)
+        return self.response_body(call, call_data)
+
+    def response_body(self, call, call_data):
+        if call is not None and call.raw_call_data is call_data and call.outcome_status:
+            # Outcome was stored when the call was last synced
+            call_outcome = {"status": call.outcome_status, "description": call.outcome_description}
+        else:
+            call_outcome = self.determine_call_outcome(call_data)
+
+        call_info = self.format_call_info(call_data, call_outcome)
+
+        response_data = {"success": True, "call": call_info, "raw_data": call_data}
+
+        if call:
+            response_data["call_db"] = InterviewCallSerializer(call).data
+
+        return response_data
+
+    def update_call_from_vapi_data(self, call, call_data, enqueue_jobs=True):
+        """
+        Update local call record with data from Vapi API. Recording download
+        and transcript processing are queued as post-call jobs; callers that
+        keep modifying the call pass enqueue_jobs=False and queue them after
+        their own save.
+        """
         call.status = call_data.get("status", call.status)
         call.raw_call_data = call_data
 
@@ -1482,19 +1521,13 @@ class CallDetailView(APIView):
             
         call.save()
         
-        # Download recording file if URL is provided and not already downloaded
-        if call_data.get("recordingUrl") and not call.recording_file:
-            self.download_call_recording(call, call_data["recordingUrl"])
-        
-        # Automatically process transcript with OpenAI if transcript was updated and not already processed
-        if (call_data.get("transcript") and call.transcript_text and 
-            not call.processed_transcript):
-            self.auto_process_transcript(call)
+        if enqueue_jobs:
+            enqueue_post_call_jobs(call)
         
         return call
 
     def auto_process_transcript(self, call):
-        """Automatically process transcript with OpenAI in the background"""
+        """Process the transcript with OpenAI now (post-call jobs normally do this)"""
         try:
             # Get the assistant's knowledge text for processing
             knowledge_text = ""
@@ -1515,50 +1548,21 @@ class CallDetailView(APIView):
                 if result.get("success") and "structured_output" in result:
                     call.processed_transcript = result["structured_output"]
                     call.save()
-                    logger.info(f"Successfully auto-processed transcript for call {call.id}")
+                    logger.info("Successfully auto-processed transcript for call %s", call.id)
                 else:
                     # Log the error but don't fail the call update
                     error_msg = result.get("error", "Unknown error")
-                    logger.warning(f"Auto-processing failed for call {call.id}: {error_msg}")
+                    logger.warning("Auto-processing failed for call %s: %s", call.id, error_msg)
             else:
-                logger.debug(f"Skipping auto-processing for call {call.id}: missing knowledge_text or transcript_text")
+                logger.debug("Skipping auto-processing for call %s: missing knowledge_text or transcript_text", call.id)
                 
         except Exception as e:
             # Log the error but don't fail the call update
-            logger.error(f"Exception during auto-processing for call {call.id}: {str(e)}")
+            logger.error("Exception during auto-processing for call %s: %s", call.id, e)
 
     def download_call_recording(self, call, recording_url):
-        """Download call recording from VAPI URL and store it locally"""
-        import requests
-        import os
-        from django.core.files.base import ContentFile
-        from urllib.parse import urlparse
-        
-        try:
-            logger.info(f"Downloading recording for call {call.id} from {recording_url}")
-            
-            # Make request to download the recording
-            response = requests.get(recording_url, timeout=30)
-            response.raise_for_status()
-            
-            # Get file extension from URL or use .mp3 as default
-            parsed_url = urlparse(recording_url)
-            file_extension = os.path.splitext(parsed_url.path)[1] or '.mp3'
-            
-            # Generate filename: call_<id>_<timestamp><extension>
-            from django.utils import timezone
-            timestamp = timezone.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"call_{call.id}_{timestamp}{file_extension}"
-            
-            # Save the file
-            file_content = ContentFile(response.content, name=filename)
-            call.recording_file.save(filename, file_content)
-            call.save()
-            
-            logger.info(f"Successfully downloaded recording for call {call.id}: {filename}")
-            
-        except Exception as e:
-            logger.error(f"Failed to download recording for call {call.id}: {str(e)}")
+        """Queue a download of the call recording (see api.post_call_jobs)"""
+        return enqueue_post_call_job(call, "download_recording", {"recording_url": recording_url})
 
     def determine_call_outcome(self, call_data):
         """Determine call outcome based on Vapi data"""
@@ -1574,7 +1578,8 @@ class CallDetailView(APIView):
         transcript = call_data.get("transcript")
 
         logger.info(
-            f"Call outcome analysis - Status: {status}, EndReason: {end_reason}, Cost: {cost}, HasTranscript: {bool(transcript)}"
+            "Call outcome analysis - Status: %s, EndReason: %s, Cost: %s, HasTranscript: %s",
+            status, end_reason, cost, bool(transcript),
         )
 
         if status == "failed":
@@ -1603,9 +1608,7 @@ class CallDetailView(APIView):
                     end_time = datetime.fromisoformat(ended_at.replace("Z", "+00:00"))
                     duration_seconds = (end_time - start_time).total_seconds()
                 except Exception as e:
-                    logger.warning(
-                        f"Could not calculate call duration for outcome: {e}"
-                    )
+                    logger.warning("Could not calculate call duration for outcome: %s", e)
 
             if transcript and len(transcript) > 0:
                 transcript_text = ""
@@ -1787,7 +1790,7 @@ class CallDetailView(APIView):
                     f"{int(duration_seconds // 60)}:{int(duration_seconds % 60):02d}"
                 )
             except Exception as e:
-                logger.warning(f"Could not calculate call duration: {e}")
+                logger.warning("Could not calculate call duration: %s", e)
 
         return call_info
 
@@ -1797,7 +1800,15 @@ class CallListView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        queryset = InterviewCall.objects.filter(user=self.request.user)
+        queryset = InterviewCall.objects.filter(user=self.request.user).select_related(
+            'assistant', 'phone_number', 'campaign'
+        ).prefetch_related(
+            # The serializer rebuilds live calls' transcripts from their segments
+            Prefetch(
+                'transcript_segments',
+                queryset=TranscriptSegment.objects.exclude(call__status__in=InterviewCall.FINISHED_STATUSES),
+            )
+        )
         campaign_id = self.request.query_params.get('campaign_id')
         if campaign_id:
             queryset = queryset.filter(campaign_id=campaign_id)
@@ -1809,14 +1820,11 @@ class ScheduleCallView(APIView):
 
     def post(self, request):
         try:
-            print(f"ScheduleCallView: POST request received")
-            print(f"User: {request.user}")
-            print(f"Is authenticated: {request.user.is_authenticated}")
-            print(f"Request headers: {dict(request.headers)}")
-            print(f"Received schedule call data: {request.data}")
+            # Request headers carry the JWT, so only the body is logged
+            log_payload(logger, "default", "Schedule call request", request.data, user_id=request.user.id)
             serializer = CreateScheduledCallSerializer(data=request.data)
             if not serializer.is_valid():
-                print(f"Serializer validation errors: {serializer.errors}")
+                logger.info("Schedule call validation errors: %s", serializer.errors)
                 return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
             data = serializer.validated_data
@@ -1872,7 +1880,101 @@ class ScheduleCallView(APIView):
             )
 
         except Exception as e:
-            logger.error(f"Error scheduling call: {str(e)}")
+            logger.error("Error scheduling call: %s", e)
+            return Response(
+                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class ScheduleCallImportView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        """
+        Schedule many calls from a CSV or NDJSON file, sent either as the
+        "file" field of a multipart form or as the raw request body
+        (Content-Type text/csv or application/x-ndjson, options in the query
+        string). Options: vapi_assistant_id, twilio_phone_number_id, and
+        optionally timezone, file_format and dry_run.
+        """
+        try:
+            multipart = request.content_type.startswith("multipart/form-data")
+            if multipart:
+                params = request.data
+                upload = request.FILES.get("file")
+                if upload is None:
+                    return Response({"error": "No file uploaded"}, status=status.HTTP_400_BAD_REQUEST)
+                lines = upload
+                file_name, content_type = upload.name, upload.content_type
+            else:
+                params = request.query_params
+                lines = request.stream
+                if lines is None:
+                    return Response({"error": "The request body is empty"}, status=status.HTTP_400_BAD_REQUEST)
+                file_name, content_type = None, request.content_type
+
+            missing = [name for name in ("vapi_assistant_id", "twilio_phone_number_id") if not params.get(name)]
+            if missing:
+                return Response(
+                    {name: ["This field is required."] for name in missing},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            default_timezone = params.get("timezone", "").strip()
+            if default_timezone and schedule_import.zone_for_name(default_timezone) is None:
+                return Response(
+                    {"error": f"Unknown timezone: {default_timezone}"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            # Resolved once for the whole file
+            try:
+                assistant = InterviewAssistant.objects.select_related('campaign').get(
+                    vapi_assistant_id=params['vapi_assistant_id'],
+                    user=request.user
+                )
+            except InterviewAssistant.DoesNotExist:
+                return Response(
+                    {"error": "Assistant not found"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            try:
+                phone_number = PhoneNumber.objects.select_related('campaign').get(
+                    vapi_phone_number_id=params['twilio_phone_number_id'],
+                    user=request.user,
+                    is_active=True
+                )
+            except PhoneNumber.DoesNotExist:
+                return Response(
+                    {"error": "Phone number not found"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+            try:
+                file_format = schedule_import.detect_format(params.get("file_format"), file_name, content_type)
+                rows = (
+                    schedule_import.iter_csv_rows(lines) if file_format == "csv"
+                    else schedule_import.iter_ndjson_rows(lines)
+                )
+                importer = schedule_import.ScheduleImporter(
+                    request.user,
+                    assistant,
+                    phone_number,
+                    default_timezone=default_timezone,
+                    dry_run=str(params.get("dry_run", "")).lower() in ("1", "true", "yes"),
+                )
+                report = importer.run(rows)
+            except schedule_import.ScheduleImportError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            return Response(
+                {"success": True, **report},
+                status=status.HTTP_200_OK if report["dry_run"] else status.HTTP_201_CREATED
+            )
+
+        except Exception as e:
+            logger.error("Error importing scheduled calls: %s", e)
             return Response(
                 {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
@@ -1953,133 +2055,23 @@ class ExecuteScheduledCallsView(APIView):
     def post(self, request):
         """Manually trigger execution of due scheduled calls (for testing/manual trigger)"""
         try:
-            from django.utils import timezone
-            
-            # Get all due scheduled calls for this user
-            due_calls = ScheduledCall.objects.filter(
-                user=request.user,
-                status='scheduled',
-                scheduled_time__lte=timezone.now()
-            )
-
-            executed_count = 0
-            results = []
-
-            for scheduled_call in due_calls:
-                try:
-                    result = self.execute_scheduled_call(scheduled_call)
-                    results.append(result)
-                    if result['success']:
-                        executed_count += 1
-                except Exception as e:
-                    logger.error(f"Error executing scheduled call {scheduled_call.id}: {str(e)}")
-                    results.append({
-                        'scheduled_call_id': scheduled_call.id,
-                        'success': False,
-                        'error': str(e)
-                    })
+            # Claim and start this user's due calls within the dispatch caps
+            outcome = dispatch_due_calls(user_id=request.user.id)
 
             return Response({
                 "success": True,
-                "executed_count": executed_count,
-                "total_due": len(due_calls),
-                "results": results
+                "executed_count": sum(1 for result in outcome.results if result['success']),
+                "deferred_count": len(outcome.deferred),
+                "total_due": len(outcome.results) + len(outcome.deferred),
+                "results": outcome.results
             })
 
         except Exception as e:
-            logger.error(f"Error executing scheduled calls: {str(e)}")
+            logger.error("Error executing scheduled calls: %s", e)
             return Response(
                 {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-    def execute_scheduled_call(self, scheduled_call):
-        """Execute a single scheduled call"""
-        from django.utils import timezone
-        
-        try:
-            # Update status and attempt tracking
-            scheduled_call.status = 'in_progress'
-            scheduled_call.execution_attempts += 1
-            scheduled_call.last_attempt_at = timezone.now()
-            scheduled_call.save()
-
-            # Get user's API configuration
-            try:
-                api_config = APIConfiguration.objects.get(user=scheduled_call.user)
-                vapi_key = api_config.vapi_api_key
-            except APIConfiguration.DoesNotExist:
-                raise Exception("API configuration not found")
-
-            if not api_config.is_vapi_configured:
-                raise Exception("Vapi API not configured")
-
-            # Prepare call payload (similar to MakeCallView)
-            headers = {
-                "Authorization": f"Bearer {vapi_key}",
-                "Content-Type": "application/json",
-            }
-
-            payload = {
-                "assistantId": scheduled_call.assistant.vapi_assistant_id,
-                "phoneNumberId": scheduled_call.phone_number.vapi_phone_number_id,
-                "customer": {"number": scheduled_call.customer_number},
-            }
-
-            # Make the call via Vapi API
-            response = requests.post(
-                "https://api.vapi.ai/call", headers=headers, json=payload
-            )
-
-            response.raise_for_status()
-            call_data = response.json()
-
-            # Create InterviewCall record
-            interview_call = InterviewCall.objects.create(
-                user=scheduled_call.user,
-                campaign=scheduled_call.campaign,
-                vapi_call_id=call_data.get("id"),
-                assistant=scheduled_call.assistant,
-                phone_number=scheduled_call.phone_number,
-                customer_number=scheduled_call.customer_number,
-                status="queued",
-                raw_call_data=call_data,
-            )
-
-            # Link the scheduled call to the actual call
-            scheduled_call.actual_call = interview_call
-            scheduled_call.status = 'completed'
-            scheduled_call.save()
-
-            return {
-                'scheduled_call_id': scheduled_call.id,
-                'success': True,
-                'call_id': interview_call.id,
-                'vapi_call_id': call_data.get("id"),
-                'message': 'Call initiated successfully'
-            }
-
-        except requests.exceptions.RequestException as e:
-            scheduled_call.status = 'failed'
-            scheduled_call.error_message = f"Vapi API error: {str(e)}"
-            scheduled_call.save()
-            
-            return {
-                'scheduled_call_id': scheduled_call.id,
-                'success': False,
-                'error': f"Vapi API error: {str(e)}"
-            }
-
-        except Exception as e:
-            scheduled_call.status = 'failed'
-            scheduled_call.error_message = str(e)
-            scheduled_call.save()
-            
-            return {
-                'scheduled_call_id': scheduled_call.id,
-                'success': False,
-                'error': str(e)
-            }
-
 
 class AnalyzeWebsiteView(APIView):
     permission_classes = [IsAuthenticated]
@@ -2098,7 +2090,7 @@ class AnalyzeWebsiteView(APIView):
             if not website_url.startswith(('http://', 'https://')):
                 website_url = 'https://' + website_url
 
-            logger.info(f"Analyzing website: {website_url}")
+            logger.info("Analyzing website: %s", website_url)
             
             # For testing, return mock data first
             if website_url == "https://example.com":
@@ -2151,7 +2143,7 @@ class AnalyzeWebsiteView(APIView):
             })
 
         except Exception as e:
-            logger.error(f"Error analyzing website: {str(e)}")
+            logger.error("Error analyzing website: %s", e)
             return Response(
                 {"error": f"Website analysis failed: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -2173,14 +2165,14 @@ class AnalyzeWebsiteView(APIView):
             urls_to_visit = [url]
             max_pages = 5  # Limit to 5 pages to avoid too long processing
             
-            logger.info(f"Starting comprehensive website crawling for: {url}")
+            logger.info("Starting comprehensive website crawling for: %s", url)
             
             for i, current_url in enumerate(urls_to_visit[:max_pages]):
                 if current_url in visited_urls:
                     continue
                     
                 try:
-                    logger.info(f"Crawling page {i+1}: {current_url}")
+                    logger.info("Crawling page %s: %s", i + 1, current_url)
                     response = requests.get(current_url, headers=headers, timeout=10)
                     response.raise_for_status()
                     visited_urls.add(current_url)
@@ -2231,7 +2223,7 @@ class AnalyzeWebsiteView(APIView):
                                         break
                 
                 except Exception as e:
-                    logger.warning(f"Error crawling {current_url}: {str(e)}")
+                    logger.warning("Error crawling %s: %s", current_url, e)
                     continue
             
             # Combine all content
@@ -2253,18 +2245,18 @@ class AnalyzeWebsiteView(APIView):
             if len(content) > 12000:
                 content = content[:12000] + "..."
                 
-            logger.info(f"Successfully crawled {len(visited_urls)} pages, extracted {len(content)} characters")
+            logger.info("Successfully crawled %s pages, extracted %s characters", len(visited_urls), len(content))
             return content
             
         except Exception as e:
-            logger.error(f"Error in comprehensive website scraping {url}: {str(e)}")
+            logger.error("Error in comprehensive website scraping %s: %s", url, e)
             return None
 
     def analyze_with_openai(self, content, url):
         """Analyze website content using enhanced content extraction"""
         try:
-            logger.info(f"Starting enhanced content analysis for {url}")
-            logger.info(f"Content length: {len(content)} characters")
+            logger.info("Starting enhanced content analysis for %s", url)
+            logger.info("Content length: %s characters", len(content))
             
             # Enhanced content analysis using the crawled data
             company_name = self.extract_company_name(content, url)
@@ -2293,7 +2285,7 @@ class AnalyzeWebsiteView(APIView):
             }
             
         except Exception as e:
-            logger.error(f"Error with enhanced content analysis: {str(e)}")
+            logger.error("Error with enhanced content analysis: %s", e)
             # Return basic fallback
             return self.get_fallback_analysis()
 
@@ -2644,7 +2636,7 @@ class ElevenLabsVoicesView(APIView):
             })
             
         except Exception as e:
-            logger.error(f"Error fetching ElevenLabs voices: {str(e)}")
+            logger.error("Error fetching ElevenLabs voices: %s", e)
             return Response(
                 {"error": "Failed to fetch ElevenLabs voices"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -2700,7 +2692,7 @@ class ProcessTranscriptView(APIView):
             }, status=status.HTTP_200_OK)
 
         except Exception as e:
-            logger.error(f"Error processing transcript: {str(e)}")
+            logger.error("Error processing transcript: %s", e)
             return Response(
                 {"error": f"Failed to process transcript: {str(e)}"}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -2728,21 +2720,8 @@ def vapi_webhook_view(request):
             logger.warning("Invalid webhook signature")
             return JsonResponse({"error": "Invalid signature"}, status=401)
         
-        # Log the entire request for debugging
-        logger.info(f"=== WEBHOOK REQUEST DEBUG ===")
-        logger.info(f"Method: {request.method}")
-        logger.info(f"Path: {request.path}")
-        logger.info(f"Headers: {dict(request.META)}")
-        logger.info(f"Raw Body: {request.body.decode('utf-8', errors='ignore')}")
-        logger.info(f"Content Type: {request.content_type}")
-        logger.info(f"=== END WEBHOOK REQUEST DEBUG ===")
-        # print(f"=== WEBHOOK REQUEST DEBUG ===")
-        # print(f"Method: {request.method}")
-        # print(f"Path: {request.path}")
-        # print(f"Headers: {dict(request.META)}")
-        # print(f"Raw Body: {request.body.decode('utf-8', errors='ignore')}")
-        # print(f"Content Type: {request.content_type}")
-        # print(f"=== END WEBHOOK REQUEST DEBUG ===")
+        # Sampled, truncated body dump (see LOG_PAYLOAD_SAMPLE_RATES["webhook"])
+        log_payload(logger, "webhook", "Webhook body", request.body)
 
         # Parse JSON body
         try:
@@ -2762,84 +2741,152 @@ def vapi_webhook_view(request):
         call_data = message.get('call', {})
         vapi_call_id = call_data.get('id')
         
-        logger.info(f"Received VAPI webhook: {event_type} for call {vapi_call_id}")
+        logger.debug(
+            "Received VAPI webhook: %s for call %s", event_type, vapi_call_id,
+            extra={"event_type": event_type, "vapi_call_id": vapi_call_id},
+        )
         
-        # Save webhook event to file for debugging and auditing
-        save_webhook_event(event_type or 'unknown_event', webhook_data)
+        route, handler = WEBHOOK_EVENT_ROUTES.get(event_type, ('informational', None))
+        metrics.increment('webhook_events_total', event_type=event_type or 'unknown', route=route)
         
         # Handle events that don't require a call lookup
-        if event_type in ['assistant-request', 'tool-calls', 'transfer-destination-request', 'knowledge-base-request']:
-            return handle_special_events(event_type, message)
+        if route == 'special':
+            save_webhook_event(event_type, webhook_data)
+            return handler(message)
         
         # For other events, we need a call ID
         if not vapi_call_id:
+            save_webhook_event(event_type or 'unknown_event', webhook_data)
             logger.warning("Webhook received without call ID")
             return JsonResponse({"error": "Missing call ID"}, status=400)
         
-        # Find the call in our database with security validation
+        # Informational events only log: no dedup, call lookup or ownership check
+        if route == 'informational':
+            handle_informational_event(event_type, handler, vapi_call_id, message, webhook_data)
+            return JsonResponse({"status": "success"}, status=200)
+        
+        # Drop Vapi retries of deliveries we already accepted, before any call lookup
+        dedup_key = delivery_key(event_type, message)
+        if not webhook_deduplicator.claim(dedup_key, vapi_call_id, event_type):
+            logger.info("Dropping duplicate %s delivery for call %s", event_type, vapi_call_id)
+            return JsonResponse({"status": "duplicate"}, status=200)
+        
         try:
-            call = InterviewCall.objects.select_related('user', 'assistant', 'phone_number').get(
-                vapi_call_id=vapi_call_id
-            )
+            # Acknowledge-then-process: call events are stored for the queue workers,
+            # which also write the audit log once they handle them
+            if settings.VAPI_WEBHOOK_MODE == 'queue':
+                enqueue_webhook_event(event_type, vapi_call_id, webhook_data)
+                return JsonResponse({"status": "accepted"}, status=200)
             
-            # Security validation: Verify call ownership and assistant relationship
-            if not validate_call_ownership(call, call_data):
-                logger.error(f"Security violation: Invalid call ownership for {vapi_call_id}")
-                return JsonResponse({"error": "Unauthorized"}, status=401)
-                
-        except InterviewCall.DoesNotExist:
-            # This might be an inbound call - try to create InterviewCall record
-            call = create_inbound_call_record(call_data, vapi_call_id)
-            if call is None:
-                logger.warning(f"Could not create call record for {vapi_call_id}")
-                return JsonResponse({"error": "Call not found and could not create inbound call record"}, status=404)
-        
-        # Handle different webhook events
-        if event_type == 'status-update':
-            handle_status_update(call, message)
-        elif event_type == 'end-of-call-report':
-            handle_end_of_call_report(call, message)
-        elif event_type == 'transcript':
-            handle_transcript(call, message)
-        elif event_type == 'conversation-update':
-            handle_conversation_update(call, message)
-        elif event_type == 'hang':
-            handle_hang(call, message)
-        elif event_type == 'speech-update':
-            handle_speech_update(call, message)
-        elif event_type == 'model-output':
-            handle_model_output(call, message)
-        elif event_type == 'transfer-update':
-            handle_transfer_update(call, message)
-        elif event_type == 'user-interrupted':
-            handle_user_interrupted(call, message)
-        elif event_type == 'language-change-detected':
-            handle_language_change_detected(call, message)
-        else:
-            logger.info(f"Unhandled webhook event type: {event_type}")
+            # Save webhook event to file for debugging and auditing
+            save_webhook_event(event_type or 'unknown_event', webhook_data)
+            process_call_event(event_type, message)
+        except WebhookProcessingError as e:
+            webhook_deduplicator.release(dedup_key)
+            return JsonResponse({"error": str(e)}, status=e.status_code)
+        except Exception:
+            # Let Vapi's retry through since this delivery was not applied
+            webhook_deduplicator.release(dedup_key)
+            raise
         
         return JsonResponse({"status": "success"}, status=200)
         
     except Exception as e:
-        logger.error(f"Error processing VAPI webhook: {str(e)}")
+        logger.error("Error processing VAPI webhook: %s", e, exc_info=True)
         return JsonResponse(
             {"error": "Webhook processing failed"}, 
             status=500
         )
 
-def handle_special_events(event_type, message):
-    """Handle special events that don't require a call lookup"""
-    if event_type == 'assistant-request':
-        return handle_assistant_request(message)
-    elif event_type == 'tool-calls':
-        return handle_tool_calls(message)
-    elif event_type == 'transfer-destination-request':
-        return handle_transfer_destination_request(message)
-    elif event_type == 'knowledge-base-request':
-        return handle_knowledge_base_request(message)
+class WebhookProcessingError(Exception):
+    """Raised when a call event cannot be applied to our records"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+def process_call_event(event_type, message):
+    """
+    Apply a call-bound webhook event to the matching InterviewCall.
+    Shared by the webhook view (sync mode) and the webhook queue workers.
+    """
+    call_data = message.get('call', {})
+    vapi_call_id = call_data.get('id')
+    
+    route, handler = WEBHOOK_EVENT_ROUTES.get(event_type, ('informational', None))
+    if route == 'informational':
+        handle_informational_event(event_type, handler, vapi_call_id, message)
+        return None
+    
+    call = resolve_webhook_call(vapi_call_id, call_data)
+    
+    handler(call, message)
+    
+    # Terminal calls get few further events; free their routing entry
+    if not call.is_live:
+        call_route_cache.invalidate(vapi_call_id)
+    
+    return call
+
+def resolve_webhook_call(vapi_call_id, call_data):
+    """
+    Find the InterviewCall for a webhook event and verify its ownership.
+    Calls seen before are served from the routing cache: a primary-key
+    lookup without joins, validated against the cached fingerprint.
+    """
+    route = call_route_cache.get(vapi_call_id)
+    if route is not None and route.matches(call_data):
+        try:
+            call = InterviewCall.objects.get(pk=route.call_id)
+            metrics.increment('webhook_call_cache_total', result='hit')
+            return call
+        except InterviewCall.DoesNotExist:
+            call_route_cache.invalidate(vapi_call_id)
+    metrics.increment('webhook_call_cache_total', result='miss')
+    
+    # Find the call in our database with security validation
+    try:
+        call = InterviewCall.objects.select_related('user', 'assistant', 'phone_number').get(
+            vapi_call_id=vapi_call_id
+        )
+        
+        # Security validation: Verify call ownership and assistant relationship
+        if not validate_call_ownership(call, call_data):
+            logger.error("Security violation: Invalid call ownership for %s", vapi_call_id)
+            raise WebhookProcessingError("Unauthorized", status_code=401)
+            
+    except InterviewCall.DoesNotExist:
+        # This might be an inbound call - try to create InterviewCall record
+        call = create_inbound_call_record(call_data, vapi_call_id)
+        if call is None:
+            logger.warning("Could not create call record for %s", vapi_call_id)
+            raise WebhookProcessingError(
+                "Call not found and could not create inbound call record", status_code=404
+            )
+    
+    if call.is_live:
+        call_route_cache.put(vapi_call_id, CallRoute.for_call(call))
+    return call
+
+def handle_informational_event(event_type, handler, vapi_call_id, message, webhook_data=None):
+    """
+    Handle an event that only needs logging, without any database access.
+    Only every WEBHOOK_INFO_EVENT_LOG_EVERY-th event of a type is written to
+    the webhook event log; the rest are just counted.
+    """
+    event_type = event_type or 'unknown'
+    metrics.increment('webhook_db_lookups_skipped_total', event_type=event_type)
+    
+    sample_every = settings.WEBHOOK_INFO_EVENT_LOG_EVERY
+    if webhook_data is not None and sample_every > 0:
+        seen = metrics.counter_value('webhook_db_lookups_skipped_total', event_type=event_type)
+        if (seen - 1) % sample_every == 0:
+            save_webhook_event(event_type, webhook_data)
+    
+    if handler:
+        handler(vapi_call_id, message)
     else:
-        logger.info(f"Unhandled special event type: {event_type}")
-        return JsonResponse({"status": "success"}, status=200)
+        logger.debug("Unhandled webhook event type: %s", event_type)
 
 def handle_assistant_request(message):
     """Handle assistant-request webhook event"""
@@ -2860,7 +2907,7 @@ def handle_tool_calls(message):
         tool_id = tool_call.get('id')
         parameters = tool_call.get('parameters', {})
         
-        logger.info(f"Processing tool call: {tool_name} with ID: {tool_id}")
+        logger.info("Processing tool call: %s with ID: %s", tool_name, tool_id)
         
         # Add your tool handling logic here
         # For now, return a generic success response
@@ -2895,7 +2942,17 @@ def handle_status_update(call, message):
     status_value = message.get('status')
     call_data = message.get('call', {})
     
-    logger.info(f"Call {call.vapi_call_id} status update: {status_value}")
+    logger.info("Call %s status update: %s", call.vapi_call_id, status_value)
+
+    # Webhooks can arrive late or out of order (e.g. "in-progress" after "ended")
+    current_rank = InterviewCall.STATUS_ORDER.get(call.status)
+    new_rank = InterviewCall.STATUS_ORDER.get(status_value)
+    if current_rank is not None and new_rank is not None and new_rank <= current_rank:
+        logger.info(
+            "Ignoring stale status update %s for call %s (already %s)",
+            status_value, call.vapi_call_id, call.status
+        )
+        return
     
     if status_value == "scheduled":
         call.status = "scheduled"
@@ -2916,6 +2973,8 @@ def handle_status_update(call, message):
         call.status = "forwarding"
     elif status_value == "ended":
         call.status = "ended"
+        # Persist the live transcript segments in case no end-of-call report follows
+        call.materialize_transcript()
         if call_data.get("endedAt"):
             try:
                 call.ended_at = datetime.fromisoformat(
@@ -2925,19 +2984,34 @@ def handle_status_update(call, message):
                 pass
     
     call.raw_call_data = call_data
-    call.save()
+    if new_rank is None:
+        call.save()
+        return
+    
+    # The check above used the status we read; another worker may have moved
+    # the call on since, so the write only matches a status ranked below ours
+    later_statuses = [name for name, rank in InterviewCall.STATUS_ORDER.items() if rank >= new_rank]
+    if not call.save_if(~Q(status__in=later_statuses)):
+        logger.info(
+            "Ignoring stale status update %s for call %s (now %s)",
+            status_value, call.vapi_call_id, call.status
+        )
 
 def handle_end_of_call_report(call, message):
     """Handle end-of-call-report webhook event"""
-    logger.info(f"End of call report for call {call.vapi_call_id}")
+    logger.info("End of call report for call %s", call.vapi_call_id)
     
     call_data = message.get('call', {})
     artifact = message.get('artifact', {})
     ended_reason = message.get('endedReason')
     
+    # Start from the transcript collected during the call; the report's own
+    # transcript and artifact (when present) take precedence below
+    call.materialize_transcript()
+    
     # Use existing method to update call data
     call_detail_view = CallDetailView()
-    call = call_detail_view.update_call_from_vapi_data(call, call_data)
+    call = call_detail_view.update_call_from_vapi_data(call, call_data, enqueue_jobs=False)
     
     # Update with artifact data
     if artifact.get('transcript'):
@@ -2958,12 +3032,8 @@ def handle_end_of_call_report(call, message):
     
     call.save()
     
-    # Trigger automatic transcript processing if conditions are met
-    if (call.transcript_text and 
-        call.assistant and 
-        call.assistant.knowledge_text and
-        not call.processed_transcript):
-        call_detail_view.auto_process_transcript(call)
+    # Recording download and transcript processing run in the post-call workers
+    enqueue_post_call_jobs(call)
 
 def handle_transcript(call, message):
     """Handle transcript webhook event"""
@@ -2971,74 +3041,126 @@ def handle_transcript(call, message):
     transcript_type = message.get('transcriptType')
     transcript_text = message.get('transcript')
     
-    logger.info(f"Transcript update for call {call.vapi_call_id}: {role} - {transcript_type}")
+    logger.debug("Transcript update for call %s: %s - %s", call.vapi_call_id, role, transcript_type)
     
-    # Only process final transcripts to avoid too many updates
+    # Only process final transcripts to avoid too many updates. Each one is a
+    # single insert; transcript_text is materialized at the end of the call.
     if transcript_type == 'final' and transcript_text:
-        # Append to existing transcript or create new
-        if call.transcript_text:
-            call.transcript_text += f"\n{role}: {transcript_text}"
+        for _ in range(3):
+            last = call.transcript_segments.filter(source='transcript').aggregate(
+                last=Max('sequence')
+            )['last']
+            try:
+                with transaction.atomic():
+                    TranscriptSegment.objects.create(
+                        call=call,
+                        source='transcript',
+                        sequence=(last or 0) + 1,
+                        role=role,
+                        message=transcript_text,
+                    )
+                break
+            except IntegrityError:
+                # Another worker took this sequence number, read the new tail and retry
+                continue
         else:
-            call.transcript_text = f"{role}: {transcript_text}"
-        
-        call.save()
+            logger.error("Could not store transcript segment for call %s", call.vapi_call_id)
 
 def handle_conversation_update(call, message):
     """Handle conversation-update webhook event"""
     messages = message.get('messages', [])
-    logger.info(f"Conversation update for call {call.vapi_call_id}: {len(messages)} messages")
+    logger.debug("Conversation update for call %s: %s messages", call.vapi_call_id, len(messages))
     
     if messages:
-        call.transcript = messages
-        # Also update transcript_text for easier reading
-        call.transcript_text = "\n".join([
-            f"{msg.get('role', 'unknown')}: {msg.get('message', '')}"
-            for msg in messages
-        ])
-        call.save()
+        # Every update repeats the whole conversation, and may revise earlier
+        # turns; write only the messages that are new or differ from ours
+        stored = dict(
+            call.transcript_segments.filter(source='conversation').values_list('sequence', 'data')
+        )
+        changed_segments = [
+            TranscriptSegment(
+                call=call,
+                source='conversation',
+                sequence=index,
+                role=msg.get('role', 'unknown'),
+                message=msg.get('message', '') or '',
+                data=msg,
+            )
+            for index, msg in enumerate(messages)
+            if stored.get(index) != msg
+        ]
+        if changed_segments:
+            TranscriptSegment.objects.bulk_create(
+                changed_segments,
+                update_conflicts=True,
+                unique_fields=['call', 'source', 'sequence'],
+                update_fields=['role', 'message', 'data'],
+            )
 
-def handle_hang(call, message):
+def handle_hang(vapi_call_id, message):
     """Handle hang webhook event"""
-    logger.info(f"Hang detected for call {call.vapi_call_id}")
+    logger.info("Hang detected for call %s", vapi_call_id)
     # This is an informational event, you might want to log it or notify your team
     # No specific action required
 
-def handle_speech_update(call, message):
+def handle_speech_update(vapi_call_id, message):
     """Handle speech-update webhook event"""
     status_value = message.get('status')
     role = message.get('role')
     turn = message.get('turn')
     
-    logger.info(f"Speech update for call {call.vapi_call_id}: {role} - {status_value} (turn {turn})")
+    logger.debug("Speech update for call %s: %s - %s (turn %s)", vapi_call_id, role, status_value, turn)
     # This is informational - you can use it for real-time UI updates if needed
 
-def handle_model_output(call, message):
+def handle_model_output(vapi_call_id, message):
     """Handle model-output webhook event"""
     output = message.get('output', {})
-    logger.info(f"Model output for call {call.vapi_call_id}")
+    logger.debug("Model output for call %s", vapi_call_id)
     # This contains token-level outputs - useful for real-time streaming if needed
 
 def handle_transfer_update(call, message):
     """Handle transfer-update webhook event"""
     destination = message.get('destination', {})
-    logger.info(f"Transfer update for call {call.vapi_call_id} to {destination.get('type')}")
+    logger.info("Transfer update for call %s to %s", call.vapi_call_id, destination.get('type'))
     
     # Update call status to indicate transfer
     call.status = "transferred"
     call.raw_call_data.update({"transfer_destination": destination})
     call.save()
 
-def handle_user_interrupted(call, message):
+def handle_user_interrupted(vapi_call_id, message):
     """Handle user-interrupted webhook event"""
-    logger.info(f"User interrupted for call {call.vapi_call_id}")
+    logger.debug("User interrupted for call %s", vapi_call_id)
     # Informational event - user interrupted the assistant
 
-def handle_language_change_detected(call, message):
+def handle_language_change_detected(vapi_call_id, message):
     """Handle language-change-detected webhook event"""
     language = message.get('language')
-    logger.info(f"Language change detected for call {call.vapi_call_id}: {language}")
+    logger.info("Language change detected for call %s: %s", vapi_call_id, language)
     # Update call with detected language if needed
     
+# How each webhook event type is routed:
+#   special       - answered inline without a call lookup (Vapi waits for the response)
+#   informational - only logged; handled without touching the database
+#   stateful      - mutates InterviewCall; goes through dedup, call lookup and ownership checks
+# Unknown event types are treated as informational.
+WEBHOOK_EVENT_ROUTES = {
+    'assistant-request': ('special', handle_assistant_request),
+    'tool-calls': ('special', handle_tool_calls),
+    'transfer-destination-request': ('special', handle_transfer_destination_request),
+    'knowledge-base-request': ('special', handle_knowledge_base_request),
+    'status-update': ('stateful', handle_status_update),
+    'end-of-call-report': ('stateful', handle_end_of_call_report),
+    'transcript': ('stateful', handle_transcript),
+    'conversation-update': ('stateful', handle_conversation_update),
+    'transfer-update': ('stateful', handle_transfer_update),
+    'hang': ('informational', handle_hang),
+    'speech-update': ('informational', handle_speech_update),
+    'model-output': ('informational', handle_model_output),
+    'user-interrupted': ('informational', handle_user_interrupted),
+    'language-change-detected': ('informational', handle_language_change_detected),
+}
+
 def validate_webhook_signature(request):
     """
     Validate VAPI webhook signature for security using serverUrlSecret
@@ -3062,9 +3184,9 @@ def validate_webhook_signature(request):
     is_valid = hmac.compare_digest(signature, webhook_secret)
     
     if is_valid:
-        logger.info("Webhook signature validated successfully")
+        logger.debug("Webhook signature validated successfully")
     else:
-        logger.error(f"Webhook signature validation failed. Expected secret: {webhook_secret}, Got: {signature}")
+        logger.warning("Webhook signature validation failed: X-Vapi-Secret does not match")
     
     return is_valid
 
@@ -3080,30 +3202,30 @@ def validate_call_ownership(call, call_data):
         
         # Security Check 1: Verify assistant belongs to the same user as the call
         if call.assistant.vapi_assistant_id != vapi_assistant_id:
-            logger.error(f"Assistant ID mismatch: DB={call.assistant.vapi_assistant_id}, VAPI={vapi_assistant_id}")
+            logger.error("Assistant ID mismatch: DB=%s, VAPI=%s", call.assistant.vapi_assistant_id, vapi_assistant_id)
             return False
         
         # Security Check 2: Verify assistant belongs to the call's user  
         if call.assistant.user_id != call.user_id:
-            logger.error(f"User mismatch: Call user={call.user_id}, Assistant user={call.assistant.user_id}")
+            logger.error("User mismatch: Call user=%s, Assistant user=%s", call.user_id, call.assistant.user_id)
             return False
         
         # Security Check 3: Verify phone number ownership (if provided)
         if vapi_phone_number_id and call.phone_number.vapi_phone_number_id != vapi_phone_number_id:
-            logger.error(f"Phone number mismatch: DB={call.phone_number.vapi_phone_number_id}, VAPI={vapi_phone_number_id}")
+            logger.error("Phone number mismatch: DB=%s, VAPI=%s", call.phone_number.vapi_phone_number_id, vapi_phone_number_id)
             return False
         
         # Security Check 4: Verify phone number belongs to same user
         if call.phone_number.user_id != call.user_id:
-            logger.error(f"Phone user mismatch: Call user={call.user_id}, Phone user={call.phone_number.user_id}")
+            logger.error("Phone user mismatch: Call user=%s, Phone user=%s", call.user_id, call.phone_number.user_id)
             return False
         
         # All checks passed
-        logger.info(f"Call ownership validated for user {call.user.username} (ID: {call.user_id})")
+        logger.debug("Call ownership validated for user %s (ID: %s)", call.user.username, call.user_id)
         return True
         
     except Exception as e:
-        logger.error(f"Error validating call ownership: {str(e)}")
+        logger.error("Error validating call ownership: %s", e)
         return False
 
 def create_inbound_call_record(call_data, vapi_call_id):
@@ -3112,7 +3234,7 @@ def create_inbound_call_record(call_data, vapi_call_id):
     This handles inbound calls where someone calls a phone number with an assigned assistant
     """
     try:
-        logger.info(f"Attempting to create inbound call record for {vapi_call_id}")
+        logger.info("Attempting to create inbound call record for %s", vapi_call_id)
         
         # Extract phone number and assistant information from call data
         phone_number_id = call_data.get('phoneNumberId')
@@ -3121,7 +3243,7 @@ def create_inbound_call_record(call_data, vapi_call_id):
         call_type = call_data.get('type', 'inbound')
         
         if not phone_number_id:
-            logger.error(f"No phone number ID in call data for {vapi_call_id}")
+            logger.error("No phone number ID in call data for %s", vapi_call_id)
             return None
         
         # Find the phone number in our database
@@ -3129,16 +3251,16 @@ def create_inbound_call_record(call_data, vapi_call_id):
             phone_number = PhoneNumber.objects.select_related('user', 'assistant', 'campaign').get(
                 vapi_phone_number_id=phone_number_id
             )
-            logger.info(f"Found phone number: {phone_number.phone_number} for user: {phone_number.user.username}")
+            logger.info("Found phone number: %s for user: %s", phone_number.phone_number, phone_number.user.username)
         except PhoneNumber.DoesNotExist:
-            logger.error(f"Phone number with VAPI ID {phone_number_id} not found in database")
+            logger.error("Phone number with VAPI ID %s not found in database", phone_number_id)
             return None
         
         # Get the assistant (either from call data or from phone number assignment)
         assistant = None
         if phone_number.assistant:
             assistant = phone_number.assistant
-            logger.info(f"Using assigned assistant: {assistant.name}")
+            logger.info("Using assigned assistant: %s", assistant.name)
         elif assistant_id:
             # Try to find assistant by VAPI ID
             try:
@@ -3146,12 +3268,12 @@ def create_inbound_call_record(call_data, vapi_call_id):
                     vapi_assistant_id=assistant_id,
                     user=phone_number.user
                 )
-                logger.info(f"Found assistant by VAPI ID: {assistant.name}")
+                logger.info("Found assistant by VAPI ID: %s", assistant.name)
             except InterviewAssistant.DoesNotExist:
-                logger.warning(f"Assistant with VAPI ID {assistant_id} not found for user {phone_number.user.username}")
+                logger.warning("Assistant with VAPI ID %s not found for user %s", assistant_id, phone_number.user.username)
         
         if not assistant:
-            logger.error(f"No assistant found for inbound call to {phone_number.phone_number}")
+            logger.error("No assistant found for inbound call to %s", phone_number.phone_number)
             return None
         
         # Create the InterviewCall record
@@ -3167,9 +3289,9 @@ def create_inbound_call_record(call_data, vapi_call_id):
             call_type='inbound'  # Mark as inbound call
         )
         
-        logger.info(f"Created inbound call record {call.id} for {vapi_call_id}")
+        logger.info("Created inbound call record %s for %s", call.id, vapi_call_id)
         return call
         
     except Exception as e:
-        logger.error(f"Error creating inbound call record: {str(e)}")
+        logger.error("Error creating inbound call record: %s", e)
         return None
@@ -0,0 +1,106 @@
+"""
+De-duplication of Vapi webhook deliveries.
+
+Vapi retries a webhook when our response times out, so the same event can
+arrive several times. Each delivery gets a key built from the call id, the
+event type and the event timestamp (or a digest of the message when Vapi
+sends no timestamp). A bounded in-memory window answers repeats seen by this
+process in O(1); the unique index on WebhookDelivery catches repeats that
+landed on another worker.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from api.models import WebhookDelivery
+
+logger = logging.getLogger(__name__)
+
+# Prune expired keys after this many new deliveries
+PRUNE_EVERY = 5000
+
+
+def delivery_key(event_type, message):
+    """Stable key identifying one webhook delivery"""
+    vapi_call_id = (message.get("call") or {}).get("id")
+    sequence = message.get("timestamp")
+    if sequence is None:
+        body = json.dumps(message, sort_keys=True, separators=(",", ":"), default=str)
+        sequence = hashlib.sha1(body.encode("utf-8")).hexdigest()
+    raw = f"{vapi_call_id}|{event_type}|{sequence}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class DeliveryDeduplicator:
+    """Bounded in-memory window of seen delivery keys backed by WebhookDelivery"""
+
+    def __init__(self, window_size=10000):
+        self.window_size = window_size
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+        self._since_prune = 0
+
+    def _remember(self, key):
+        self._seen[key] = True
+        self._seen.move_to_end(key)
+        while len(self._seen) > self.window_size:
+            self._seen.popitem(last=False)
+
+    def claim(self, key, vapi_call_id=None, event_type=None):
+        """
+        Record a delivery. Returns True the first time a key is seen and
+        False for duplicates.
+        """
+        with self._lock:
+            if key in self._seen:
+                self._seen.move_to_end(key)
+                return False
+
+        try:
+            with transaction.atomic():
+                WebhookDelivery.objects.create(
+                    delivery_key=key, vapi_call_id=vapi_call_id, event_type=event_type
+                )
+        except IntegrityError:
+            with self._lock:
+                self._remember(key)
+            return False
+
+        with self._lock:
+            self._remember(key)
+            self._since_prune += 1
+            prune = self._since_prune >= PRUNE_EVERY
+            if prune:
+                self._since_prune = 0
+        if prune:
+            self.prune()
+        return True
+
+    def release(self, key):
+        """Forget a delivery that could not be processed so Vapi's retry is accepted"""
+        with self._lock:
+            self._seen.pop(key, None)
+        WebhookDelivery.objects.filter(delivery_key=key).delete()
+
+    def prune(self, retention_hours=None):
+        """Delete keys older than the retention window"""
+        if retention_hours is None:
+            retention_hours = settings.WEBHOOK_DEDUP_RETENTION_HOURS
+        cutoff = timezone.now() - timedelta(hours=retention_hours)
+        try:
+            deleted, _ = WebhookDelivery.objects.filter(received_at__lt=cutoff).delete()
+            return deleted
+        except Exception as e:
+            logger.error("Failed to prune webhook delivery keys: %s", e)
+            return 0
+
+
+webhook_deduplicator = DeliveryDeduplicator(settings.WEBHOOK_DEDUP_WINDOW)
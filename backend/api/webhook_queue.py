@@ -0,0 +1,268 @@
+"""
+Durable queue for Vapi webhook events.
+
+With VAPI_WEBHOOK_MODE = "queue" the webhook endpoint only validates the
+secret, stores the raw payload as a WebhookEvent row and returns 200. The
+`process_webhook_events` management command runs a pool of workers that
+claim pending rows and apply them with the regular webhook handlers.
+
+Every event is assigned a shard from its vapi_call_id (WEBHOOK_SHARD_COUNT
+shards). Each shard is owned by exactly one worker, which applies its events
+in arrival order, so the events of one call never race each other while
+different calls are processed in parallel.
+
+A call keeps its shard while it has unfinished events: a new event joins the
+shard of the call's pending or processing events instead of hashing on the
+current shard count. Changing WEBHOOK_SHARD_COUNT therefore never splits a
+call's backlog across two workers. When the count is lowered,
+reshard_pending_events() moves calls stranded on shards that no longer have
+a worker, all of a call's events together and only once none of them is
+being processed. The shard lookup and the insert run under a row lock on the
+call's oldest unfinished event, so a reshard cannot move the call in between.
+
+Shard ownership is a WebhookShardLease row per shard. A worker process takes
+the leases of free or expired shards, renews them every third of
+WEBHOOK_SHARD_LEASE_SECONDS and only claims events from shards it holds, so
+two processes started over the same shards split them rather than both
+draining all of them. Each renewal also refreshes locked_at on the process's
+in-flight events: release_stale_events() only requeues events whose process
+stopped renewing, never one whose handler is still running.
+"""
+
+import logging
+import os
+import socket
+import uuid
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from api.metrics import metrics
+from api.models import WebhookEvent, WebhookShardLease
+
+logger = logging.getLogger(__name__)
+
+UNFINISHED_STATUSES = ("pending", "processing")
+
+# Errors from a payload that is not shaped like a Vapi event. Applying the
+# same payload again fails the same way, as does the WebhookProcessingError
+# the handlers raise for an unknown or foreign call.
+PERMANENT_ERRORS = (AttributeError, KeyError, TypeError, ValueError)
+
+
+def shard_for_call(vapi_call_id, shard_count=None):
+    """Stable shard number for a call id"""
+    if shard_count is None:
+        shard_count = settings.WEBHOOK_SHARD_COUNT
+    if not vapi_call_id or shard_count <= 1:
+        return 0
+    return zlib.crc32(vapi_call_id.encode("utf-8")) % shard_count
+
+
+def worker_id():
+    """Identifies this process in WebhookShardLease.owner and WebhookEvent.locked_by"""
+    return f"{socket.gethostname()}:{os.getpid()}"[:48]
+
+
+def shard_for_new_event(vapi_call_id):
+    """
+    The shard of the call's unfinished events, or its hash shard if it has
+    none. Locks the call's oldest unfinished event; call inside a transaction
+    that also inserts the new event.
+    """
+    if vapi_call_id:
+        shard = (
+            WebhookEvent.objects.select_for_update()
+            .filter(vapi_call_id=vapi_call_id, status__in=UNFINISHED_STATUSES)
+            .order_by("id").values_list("shard", flat=True).first()
+        )
+        if shard is not None:
+            return shard
+    return shard_for_call(vapi_call_id)
+
+
+def enqueue_webhook_event(event_type, vapi_call_id, payload):
+    """Durably store a webhook payload for background processing"""
+    with transaction.atomic():
+        return WebhookEvent.objects.create(
+            event_type=event_type,
+            vapi_call_id=vapi_call_id,
+            shard=shard_for_new_event(vapi_call_id),
+            payload=payload,
+        )
+
+
+def acquire_shard_leases(owner, shards, lease_seconds=None):
+    """
+    Take the leases of the given shards that are free or expired and renew
+    the ones owner already holds. Also refreshes locked_at on owner's
+    in-flight events. Returns the shards owner holds, sorted.
+    """
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=lease_seconds or settings.WEBHOOK_SHARD_LEASE_SECONDS)
+    WebhookShardLease.objects.bulk_create(
+        [WebhookShardLease(shard=shard) for shard in shards], ignore_conflicts=True
+    )
+    # Conditional UPDATE: of two processes racing for a free shard, only the
+    # first one's write still matches
+    WebhookShardLease.objects.filter(shard__in=shards).filter(
+        Q(owner=owner) | Q(owner__isnull=True) | Q(expires_at__lt=now)
+    ).update(owner=owner, expires_at=expires_at)
+    WebhookEvent.objects.filter(status="processing", locked_by__startswith=f"{owner}/").update(locked_at=now)
+    return sorted(WebhookShardLease.objects.filter(shard__in=shards, owner=owner).values_list("shard", flat=True))
+
+
+def release_shard_leases(owner):
+    """Give up owner's shards so another process can take them at once"""
+    return WebhookShardLease.objects.filter(owner=owner).update(owner=None, expires_at=None)
+
+
+def claim_webhook_events(batch_size=20, shards=None, owner=None):
+    """
+    Claim up to batch_size pending events (optionally only from the given
+    shards) for the calling worker, oldest first. With an owner, only shards
+    whose lease that owner holds are claimed from.
+
+    The claim is a single conditional UPDATE, so concurrent workers (threads
+    or processes) never receive the same row.
+    """
+    pending = WebhookEvent.objects.filter(status="pending")
+    if shards is not None:
+        pending = pending.filter(shard__in=shards)
+    if owner is not None:
+        pending = pending.filter(
+            shard__in=WebhookShardLease.objects.filter(owner=owner, expires_at__gt=timezone.now()).values("shard")
+        )
+    candidate_ids = list(pending.order_by("id").values_list("id", flat=True)[:batch_size])
+    if not candidate_ids:
+        return []
+
+    claim_token = f"{owner}/{uuid.uuid4().hex[:12]}" if owner else uuid.uuid4().hex
+    WebhookEvent.objects.filter(id__in=candidate_ids, status="pending").update(
+        status="processing",
+        locked_by=claim_token,
+        locked_at=timezone.now(),
+        attempts=F("attempts") + 1,
+    )
+    return list(
+        WebhookEvent.objects.filter(locked_by=claim_token, status="processing").order_by("id")
+    )
+
+
+def process_webhook_event(event):
+    """
+    Run the webhook handlers for a claimed event. Returns True on success.
+    A failed event goes back to pending for another attempt unless retrying
+    cannot help (see PERMANENT_ERRORS) or its attempts are used up;
+    event.status is left set to the outcome.
+    """
+    from api.views import WebhookProcessingError, process_call_event, save_webhook_event
+
+    try:
+        message = event.payload.get("message", {})
+        if not isinstance(message, dict):
+            raise ValueError("Webhook payload message is not an object")
+        save_webhook_event(event.event_type or "unknown_event", event.payload)
+        process_call_event(event.event_type, message)
+    except Exception as e:
+        max_attempts = settings.WEBHOOK_QUEUE_MAX_ATTEMPTS
+        permanent = isinstance(e, (WebhookProcessingError, *PERMANENT_ERRORS))
+        event.status = "failed" if permanent or event.attempts >= max_attempts else "pending"
+        logger.error(
+            "Error processing queued webhook %s (%s) attempt %s/%s%s: %s",
+            event.id, event.event_type, event.attempts, max_attempts, ", not retrying" if permanent else "", e,
+        )
+        metrics.increment("webhook_queue_failures_total", outcome="retry" if event.status == "pending" else "failed")
+        WebhookEvent.objects.filter(id=event.id).update(
+            status=event.status,
+            locked_by=None,
+            locked_at=None,
+            error_message=str(e),
+        )
+        return False
+
+    event.status = "processed"
+    WebhookEvent.objects.filter(id=event.id).update(
+        status="processed",
+        locked_by=None,
+        locked_at=None,
+        processed_at=timezone.now(),
+    )
+    return True
+
+
+def release_webhook_event(event):
+    """Return a claimed event to the queue without counting the attempt"""
+    WebhookEvent.objects.filter(id=event.id, status="processing").update(
+        status="pending", locked_by=None, locked_at=None, attempts=F("attempts") - 1
+    )
+
+
+def release_stale_events(stale_after_seconds=300):
+    """
+    Return events held by a crashed worker to the pending state. Workers
+    refresh locked_at on every lease renewal, so stale_after_seconds only
+    has to be comfortably longer than WEBHOOK_SHARD_LEASE_SECONDS.
+    """
+    cutoff = timezone.now() - timedelta(seconds=stale_after_seconds)
+    return WebhookEvent.objects.filter(status="processing", locked_at__lt=cutoff).update(
+        status="pending", locked_by=None, locked_at=None
+    )
+
+
+def purge_processed_events(retention_hours=None):
+    """Delete processed events older than the retention window"""
+    if retention_hours is None:
+        retention_hours = settings.WEBHOOK_QUEUE_RETENTION_HOURS
+    cutoff = timezone.now() - timedelta(hours=retention_hours)
+    deleted, _ = WebhookEvent.objects.filter(
+        status="processed", processed_at__lt=cutoff
+    ).delete()
+    return deleted
+
+
+def reshard_pending_events(shard_count=None):
+    """
+    Move the pending events of calls stranded on shards outside the current
+    shard count (after WEBHOOK_SHARD_COUNT was lowered) to the shard their
+    call maps to now. Calls with an event still being processed are left for
+    a later pass, so their events are never applied by two workers at once.
+    """
+    if shard_count is None:
+        shard_count = settings.WEBHOOK_SHARD_COUNT
+    stranded = set(
+        WebhookEvent.objects.filter(status="pending", shard__gte=shard_count)
+        .values_list("vapi_call_id", flat=True).distinct()
+    )
+    if not stranded:
+        return 0
+    busy = set(
+        WebhookEvent.objects.filter(status="processing", vapi_call_id__in=stranded - {None})
+        .values_list("vapi_call_id", flat=True)
+    )
+    moved = 0
+    for vapi_call_id in stranded - busy:
+        moved += WebhookEvent.objects.filter(
+            vapi_call_id=vapi_call_id, status="pending", shard__gte=shard_count
+        ).update(shard=shard_for_call(vapi_call_id, shard_count))
+    return moved
+
+
+def shard_depths():
+    """Pending and in-flight event counts per shard"""
+    rows = (
+        WebhookEvent.objects.filter(status__in=["pending", "processing"])
+        .values("shard", "status")
+        .annotate(count=Count("id"))
+    )
+    depths = {}
+    for row in rows:
+        depths.setdefault(str(row["shard"]), {"pending": 0, "processing": 0})[row["status"]] = row["count"]
+    return dict(sorted(depths.items(), key=lambda item: int(item[0])))
+
+
+metrics.register_collector("webhook_queue_depth", shard_depths)
@@ -221,3 +221,178 @@ RONJOBS = [
     ("*/1 * * * *", "execute_scheduled_calls"),
 ]
 
+
+# Vapi webhook processing
+# "sync" handles every event inside the request, "queue" stores the payload
+# and acknowledges immediately; run `python manage.py process_webhook_events`
+# to drain the queue.
+VAPI_WEBHOOK_MODE = os.getenv("VAPI_WEBHOOK_MODE", "sync").lower()
+WEBHOOK_QUEUE_WORKERS = int(os.getenv("WEBHOOK_QUEUE_WORKERS", "4"))
+WEBHOOK_QUEUE_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_QUEUE_MAX_ATTEMPTS", "3"))
+WEBHOOK_QUEUE_RETENTION_HOURS = int(os.getenv("WEBHOOK_QUEUE_RETENTION_HOURS", "24"))
+# Queued events are sharded by Vapi call id; each shard is drained in order
+# by a single worker
+WEBHOOK_SHARD_COUNT = int(os.getenv("WEBHOOK_SHARD_COUNT", "8"))
+# A worker process holds a renewable lease on each shard it drains; a crashed
+# process's shards are taken over once its leases expire
+WEBHOOK_SHARD_LEASE_SECONDS = int(os.getenv("WEBHOOK_SHARD_LEASE_SECONDS", "60"))
+
+# Webhook event log (append-only gzip segments under webhook_logs/segments)
+WEBHOOK_LOG_SEGMENT_BYTES = int(os.getenv("WEBHOOK_LOG_SEGMENT_BYTES", str(16 * 1024 * 1024)))
+WEBHOOK_LOG_FLUSH_EVENTS = int(os.getenv("WEBHOOK_LOG_FLUSH_EVENTS", "100"))
+WEBHOOK_LOG_FLUSH_INTERVAL = float(os.getenv("WEBHOOK_LOG_FLUSH_INTERVAL", "2.0"))
+
+# Webhook delivery de-duplication (drops Vapi retries of already accepted events)
+WEBHOOK_DEDUP_WINDOW = int(os.getenv("WEBHOOK_DEDUP_WINDOW", "10000"))
+WEBHOOK_DEDUP_RETENTION_HOURS = int(os.getenv("WEBHOOK_DEDUP_RETENTION_HOURS", "48"))
+
+# Informational webhook events (speech-update, model-output, ...) skip the
+# database; only every Nth event per type is written to the event log (0 = never)
+WEBHOOK_INFO_EVENT_LOG_EVERY = int(os.getenv("WEBHOOK_INFO_EVENT_LOG_EVERY", "20"))
+
+# Webhook call routing cache (vapi_call_id -> call pk + ownership fingerprint).
+# Set CALL_ROUTE_CACHE_SHARED=true to also store entries in the Django cache.
+CALL_ROUTE_CACHE_SIZE = int(os.getenv("CALL_ROUTE_CACHE_SIZE", "5000"))
+CALL_ROUTE_CACHE_SHARED = os.getenv("CALL_ROUTE_CACHE_SHARED", "False").lower() == "true"
+
+# Vapi API client (api/vapi_client.py): timeouts in seconds, retries with
+# exponential backoff on 429/5xx, pooled connections per API key
+VAPI_CONNECT_TIMEOUT = float(os.getenv("VAPI_CONNECT_TIMEOUT", "5"))
+VAPI_READ_TIMEOUT = float(os.getenv("VAPI_READ_TIMEOUT", "30"))
+VAPI_MAX_RETRIES = int(os.getenv("VAPI_MAX_RETRIES", "3"))
+VAPI_RETRY_BACKOFF = float(os.getenv("VAPI_RETRY_BACKOFF", "0.5"))
+VAPI_POOL_SIZE = int(os.getenv("VAPI_POOL_SIZE", "20"))
+# Seconds the Vapi phone number list is cached per API key (0 disables)
+VAPI_PHONE_NUMBERS_CACHE_TTL = int(os.getenv("VAPI_PHONE_NUMBERS_CACHE_TTL", "30"))
+
+# Twilio REST clients are cached per account with pooled connections;
+# request timeout in seconds and numbers per page for the number listing
+TWILIO_TIMEOUT = float(os.getenv("TWILIO_TIMEOUT", "15"))
+TWILIO_NUMBERS_PAGE_SIZE = int(os.getenv("TWILIO_NUMBERS_PAGE_SIZE", "50"))
+
+# Circuit breakers and bulkheads per outbound provider (api/resilience.py).
+# A breaker opens for open_seconds once failure_rate of the last `window`
+# calls (at least min_calls) failed or took longer than slow_call_seconds.
+# max_concurrent caps in-flight calls per process (Vapi defaults to its
+# connection pool size); callers wait up to max_wait seconds for a slot
+# before getting a 503.
+PROVIDER_RESILIENCE_DEFAULTS = {
+    "failure_rate": float(os.getenv("BREAKER_FAILURE_RATE", "0.5")),
+    "min_calls": int(os.getenv("BREAKER_MIN_CALLS", "10")),
+    "window": int(os.getenv("BREAKER_WINDOW", "20")),
+    "open_seconds": float(os.getenv("BREAKER_OPEN_SECONDS", "30")),
+    "half_open_calls": 1,
+    "max_wait": float(os.getenv("BULKHEAD_MAX_WAIT", "0.5")),
+}
+PROVIDER_RESILIENCE = {
+    "vapi": {
+        "max_concurrent": int(os.getenv("VAPI_MAX_CONCURRENT", str(VAPI_POOL_SIZE))),
+        "slow_call_seconds": float(os.getenv("VAPI_SLOW_CALL_SECONDS", "10")),
+    },
+    "twilio": {
+        "max_concurrent": int(os.getenv("TWILIO_MAX_CONCURRENT", "10")),
+        "slow_call_seconds": float(os.getenv("TWILIO_SLOW_CALL_SECONDS", "10")),
+    },
+    "openai": {
+        "max_concurrent": int(os.getenv("OPENAI_MAX_CONCURRENT", "4")),
+        "slow_call_seconds": float(os.getenv("OPENAI_SLOW_CALL_SECONDS", "25")),
+    },
+}
+
+# Serve the phone-number, make-call and call-detail endpoints with the async
+# views in api/async_views.py. Run under ASGI for the benefit:
+#   gunicorn backend.asgi:application -k uvicorn.workers.UvicornWorker
+# and raise VAPI_MAX_CONCURRENT to match VAPI_ASYNC_POOL_SIZE.
+ASYNC_PROVIDER_VIEWS = os.getenv("ASYNC_PROVIDER_VIEWS", "False").lower() in ("true", "1", "yes")
+VAPI_ASYNC_POOL_SIZE = int(os.getenv("VAPI_ASYNC_POOL_SIZE", "200"))
+
+# Call detail endpoint: settled (ended) calls are answered from the database;
+# Vapi data for calls in progress is cached for CALL_DETAIL_CACHE_TTL seconds
+# and served stale, with a background refresh, up to CALL_DETAIL_STALE_TTL
+CALL_DETAIL_LOCAL_FIRST = os.getenv("CALL_DETAIL_LOCAL_FIRST", "True").lower() == "true"
+CALL_DETAIL_CACHE_TTL = float(os.getenv("CALL_DETAIL_CACHE_TTL", "5"))
+CALL_DETAIL_STALE_TTL = int(os.getenv("CALL_DETAIL_STALE_TTL", "60"))
+
+# update_call_details: page size for Vapi's call list, the number of
+# concurrent per-call fetches per user for calls the list did not return,
+# and how many users are synced in parallel (each with their own key)
+CALL_SYNC_PAGE_SIZE = int(os.getenv("CALL_SYNC_PAGE_SIZE", "500"))
+CALL_SYNC_CONCURRENCY = int(os.getenv("CALL_SYNC_CONCURRENCY", "8"))
+CALL_SYNC_TENANT_WORKERS = int(os.getenv("CALL_SYNC_TENANT_WORKERS", "4"))
+
+# Scheduler daemon (`python manage.py run_scheduler`): seconds between checks
+# for schedule changes (on PostgreSQL changes also arrive by LISTEN/NOTIFY on
+# SCHEDULER_NOTIFY_CHANNEL, so this is only a safety net there) and seconds
+# between update_call_details runs (0 = never)
+SCHEDULER_RESYNC_SECONDS = float(os.getenv("SCHEDULER_RESYNC_SECONDS", "5"))
+SCHEDULER_NOTIFY_CHANNEL = os.getenv("SCHEDULER_NOTIFY_CHANNEL", "scheduled_calls")
+SCHEDULER_CALL_SYNC_INTERVAL = int(os.getenv("SCHEDULER_CALL_SYNC_INTERVAL", "30"))
+
+# Dispatch of due scheduled calls (api/dispatch.py): calls started
+# concurrently, caps on live calls per phone number and per Vapi account
+# (0 = no cap), calls started per second (0 = unpaced), calls started per
+# execute run (0 = all due), minutes a queued/ringing/in-progress call counts
+# as live, seconds before the scheduler retries a call held back by a cap, and
+# seconds a dispatcher's claim on a call lasts before another may take it over
+DISPATCH_WORKERS = int(os.getenv("DISPATCH_WORKERS", "8"))
+DISPATCH_MAX_PER_NUMBER = int(os.getenv("DISPATCH_MAX_PER_NUMBER", "5"))
+DISPATCH_MAX_PER_ACCOUNT = int(os.getenv("DISPATCH_MAX_PER_ACCOUNT", "10"))
+DISPATCH_MAX_STARTS_PER_SECOND = float(os.getenv("DISPATCH_MAX_STARTS_PER_SECOND", "0"))
+DISPATCH_MAX_PER_RUN = int(os.getenv("DISPATCH_MAX_PER_RUN", "0"))
+DISPATCH_ACTIVE_WINDOW = int(os.getenv("DISPATCH_ACTIVE_WINDOW", "60"))
+DISPATCH_DEFER_SECONDS = float(os.getenv("DISPATCH_DEFER_SECONDS", "5"))
+DISPATCH_LEASE_SECONDS = int(os.getenv("DISPATCH_LEASE_SECONDS", "300"))
+
+# Retries of scheduled calls that failed before the call was placed (429,
+# refused or timed-out connects, local circuit breaker rejections): total
+# attempts, and the exponential backoff base and cap in seconds (each delay is randomised over its upper half)
+SCHEDULED_CALL_MAX_ATTEMPTS = int(os.getenv("SCHEDULED_CALL_MAX_ATTEMPTS", "4"))
+SCHEDULED_CALL_RETRY_BASE_DELAY = int(os.getenv("SCHEDULED_CALL_RETRY_BASE_DELAY", "30"))
+SCHEDULED_CALL_RETRY_MAX_DELAY = int(os.getenv("SCHEDULED_CALL_RETRY_MAX_DELAY", "900"))
+
+# Bulk scheduled call imports (POST schedule-call/import/): rows validated and
+# inserted per batch, most rows per file (0 = no limit) and most invalid rows
+# listed in the error report
+SCHEDULE_IMPORT_BATCH_SIZE = int(os.getenv("SCHEDULE_IMPORT_BATCH_SIZE", "1000"))
+SCHEDULE_IMPORT_MAX_ROWS = int(os.getenv("SCHEDULE_IMPORT_MAX_ROWS", "100000"))
+SCHEDULE_IMPORT_MAX_ERRORS = int(os.getenv("SCHEDULE_IMPORT_MAX_ERRORS", "1000"))
+
+# Post-call jobs (recording download, transcript processing) run in
+# `python manage.py process_post_call_jobs`, with one worker pool per kind
+POST_CALL_DOWNLOAD_WORKERS = int(os.getenv("POST_CALL_DOWNLOAD_WORKERS", "4"))
+POST_CALL_TRANSCRIPT_WORKERS = int(os.getenv("POST_CALL_TRANSCRIPT_WORKERS", "2"))
+
+# Logging: records are queued and written by a background thread as JSON lines
+# (LOG_FORMAT=text for plain lines). Payload dumps are DEBUG-level and sampled
+# per category; bodies and messages are truncated.
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_PAYLOAD_MAX_CHARS = int(os.getenv("LOG_PAYLOAD_MAX_CHARS", "2000"))
+LOG_MAX_MESSAGE_CHARS = int(os.getenv("LOG_MAX_MESSAGE_CHARS", "8000"))
+LOG_PAYLOAD_SAMPLE_RATES = {
+    "webhook": float(os.getenv("LOG_SAMPLE_WEBHOOK", "0.01")),
+    "vapi": float(os.getenv("LOG_SAMPLE_VAPI", "0.1")),
+    "default": 1.0,
+}
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "json": {"()": "api.log_utils.StructuredFormatter"},
+        "text": {"format": "%(asctime)s %(levelname)s %(name)s: %(message)s"},
+    },
+    "handlers": {
+        "queue": {
+            "()": "api.log_utils.QueueLogHandler",
+            "maxsize": LOG_QUEUE_SIZE,
+            "formatter": LOG_FORMAT if LOG_FORMAT in ("json", "text") else "json",
+        },
+    },
+    "root": {"handlers": ["queue"], "level": "WARNING"},
+    "loggers": {
+        "api": {"level": LOG_LEVEL},
+        "django": {"level": os.getenv("DJANGO_LOG_LEVEL", "INFO")},
+    },
+}
@@ -6,6 +6,7 @@ echo "🚀 Starting Agentic Interviewer Services..."
 # Kill any existing processes
 pkill -f "run_scheduler.py"
 pkill -f "manage.py runserver"
+pkill -f "manage.py process_post_call_jobs"
 
 # Start Django server
 echo "📡 Starting Django backend server..."
@@ -18,6 +19,11 @@ echo "⏰ Starting call scheduler..."
 python3 run_scheduler.py > scheduler.log 2>&1 &
 SCHEDULER_PID=$!
 
+# Start post-call workers (recording downloads, transcript processing)
+echo "🎧 Starting post-call workers..."
+python3 manage.py process_post_call_jobs > post_call_jobs.log 2>&1 &
+POST_CALL_PID=$!
+
 # Start frontend (if needed)
 echo "🌐 Starting frontend..."
 cd /Users/apple/Desktop/David2/Agentic-Interviewer/frontend
@@ -28,9 +34,10 @@ echo "✅ All services started!"
 echo "📡 Backend: http://localhost:8000 (PID: $SERVER_PID)"
 echo "🌐 Frontend: http://localhost:5174 (PID: $FRONTEND_PID)"
 echo "⏰ Scheduler: Running (PID: $SCHEDULER_PID)"
+echo "🎧 Post-call workers: Running (PID: $POST_CALL_PID)"
 echo ""
 echo "📋 To stop all services:"
-echo "   kill $SERVER_PID $SCHEDULER_PID $FRONTEND_PID"
+echo "   kill $SERVER_PID $SCHEDULER_PID $POST_CALL_PID $FRONTEND_PID"
 echo ""
 echo "📊 To check scheduler logs:"
 echo "   tail -f /Users/apple/Desktop/David2/Agentic-Interviewer/backend/scheduler.log"
\ No newline at end of file
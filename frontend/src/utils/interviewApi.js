@@ -31,9 +31,10 @@ export const getVapiPhoneNumbers = () => {
     const api = useAxios();
     return api.get('phone-numbers/');
 };
-export const getTwilioPhoneNumbers = () => {
+export const getTwilioPhoneNumbers = (page = null) => {
     const api = useAxios();
-    return api.get('twilio-numbers/');
+    const params = page ? { page } : {};
+    return api.get('twilio-numbers/', { params });
 };
 export const registerPhoneNumber = (phoneNumber, campaignId = null) => {
     const api = useAxios();
@@ -151,6 +151,7 @@ For EACH article, follow these steps IN ORDER:
 
   // Phone Numbers State
   const [twilioNumbers, setTwilioNumbers] = useState([]);
+  const [twilioNextPage, setTwilioNextPage] = useState(null);
   const [vapiNumbers, setVapiNumbers] = useState([]);
   const [phoneLoading, setPhoneLoading] = useState(false);
   const [phoneMessage, setPhoneMessage] = useState('');
@@ -470,14 +471,15 @@ For EACH article, follow these steps IN ORDER:
   };
 
   // Phone Number Functions
-  const loadTwilioNumbers = async () => {
+  const loadTwilioNumbers = async (page = null) => {
     setPhoneLoading(true);
     setPhoneMessage('');
     
     try {
-      const response = await getTwilioPhoneNumbers();
+      const response = await getTwilioPhoneNumbers(page);
       if (response.data.success) {
-        setTwilioNumbers(response.data.twilio_numbers);
+        setTwilioNumbers(prev => page ? [...prev, ...response.data.twilio_numbers] : response.data.twilio_numbers);
+        setTwilioNextPage(response.data.next_page || null);
       } else {
         setPhoneMessage(`Error: ${response.data.error}`);
       }
@@ -1809,7 +1811,7 @@ Maintain high energy and evaluate both sales acumen and phone presence.`
                   List Vapi Phone Numbers
                 </Button>
                 <Button 
-                  onClick={loadTwilioNumbers}
+                  onClick={() => loadTwilioNumbers()}
                   disabled={phoneLoading}
                 >
                   {phoneLoading && <Loader2 className="mr-2 h-4 w-4 animate-spin" />}
@@ -1920,6 +1922,15 @@ Maintain high energy and evaluate both sales acumen and phone presence.`
                       </div>
                     ))}
                   </div>
+                  {twilioNextPage && (
+                    <Button
+                      variant="outline"
+                      disabled={phoneLoading}
+                      onClick={() => loadTwilioNumbers(twilioNextPage)}
+                    >
+                      Load More Numbers
+                    </Button>
+                  )}
                 </div>
               )}
             </CardContent>